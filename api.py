@@ -0,0 +1,360 @@
+"""
+South Asia Inequality Analytics API
+Optional headless JSON API over the curated dataset, served alongside the
+Streamlit app. Exposes the same computations the pages use (cube slices,
+rankings, THEN/NOW comparisons, correlations, simulator scoring, quality
+audit) without paying for a page render.
+
+Run with:
+    uvicorn api:app --workers 4 --port 8000
+
+Requires the optional ``starlette`` and ``uvicorn`` packages. All endpoints
+share the per-dataset-version cube (utils.search_query) and cache their
+encoded JSON responses, so repeated requests are served from memory.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from utils.loaders import data_version, load_quality_audit
+from utils.profiling import profiled, prometheus_metrics
+from utils.search_query import DEFAULT_TOP_K, get_query_compiler
+from utils.simulator_engine import PROFILE_FIELDS, score_profiles
+from utils.temporal_engine import period_matrices, significance_tests
+
+# The shared loaders are st.cache_* functions; outside a Streamlit run they
+# fall back to in-memory caches and log a warning on every call
+for _name in list(logging.root.manager.loggerDict):
+    if _name.startswith('streamlit'):
+        logging.getLogger(_name).setLevel(logging.ERROR)
+
+# Encoded responses kept in memory (across all endpoints), bounded by count and bytes
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_BYTES = 64 * 1024 * 1024
+# /simulate bodies larger than this are scored but not cached
+MAX_CACHED_REQUEST_BYTES = 16 * 1024
+# Largest slice returned in one response
+MAX_SLICE_ROWS = 50_000
+# Most profiles scored per /simulate request
+MAX_PROFILES = 10_000
+# Bounds of /compare's 'resamples' (bootstrap and permutation draws)
+MIN_RESAMPLES, MAX_RESAMPLES = 100, 50_000
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════════════════════════════════
+
+def _records(df):
+    """DataFrame as JSON-safe records (NaN -> null, NumPy scalars -> Python)"""
+    return json.loads(df.to_json(orient='records'))
+
+
+def _encode(payload):
+    return json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+
+
+def _list_param(request, name):
+    """Comma-separated query parameter as a list (empty list when absent)"""
+    value = request.query_params.get(name, '')
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def _int_param(request, name, default=None, minimum=None, maximum=None):
+    """Integer query parameter; 400 when malformed or outside [minimum, maximum]"""
+    value = request.query_params.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPException(400, f"'{name}' must be an integer")
+    if (minimum is not None and number < minimum) or (maximum is not None and number > maximum):
+        bounds = f">= {minimum}" if maximum is None else f"between {minimum} and {maximum}"
+        raise HTTPException(400, f"'{name}' must be {bounds}")
+    return number
+
+
+def _period_param(request, name):
+    """A year ('2010') or an inclusive range ('2005-2010')"""
+    value = request.query_params.get(name)
+    if not value:
+        raise HTTPException(400, f"'{name}' is required (a year or a start-end range)")
+    try:
+        parts = [int(p) for p in value.split('-')]
+    except ValueError:
+        raise HTTPException(400, f"'{name}' must be a year or a start-end range")
+    if len(parts) > 2 or parts[0] > parts[-1]:
+        raise HTTPException(400, f"'{name}' must be a year or a start-end range with start <= end")
+    return parts[0] if len(parts) == 1 else (parts[0], parts[1])
+
+
+def _period_bounds(period):
+    return (period, period) if isinstance(period, int) else period
+
+
+def _is_number(value):
+    """JSON number or null (bools are not numbers here)"""
+    return value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+
+
+def _check_profiles(profiles):
+    """400 naming the first PROFILE_FIELDS column holding a value of the wrong type"""
+    def bad(field, test):
+        return not profiles[field].map(test).all()
+
+    for field in ('edu', 'digital', 'gender', 'urban'):  # gender / urban: 0/1 flags or booleans
+        if bad(field, lambda v: _is_number(v) or isinstance(v, bool)):
+            raise HTTPException(400, f"Profile field '{field}' must be a number")
+    if bad('credit', lambda v: isinstance(v, bool)):
+        raise HTTPException(400, "Profile field 'credit' must be true or false")
+    for field in ('country', 'occupation', 'age'):
+        if bad(field, lambda v: isinstance(v, str)):
+            raise HTTPException(400, f"Profile field '{field}' must be a string")
+
+
+def _check_live_context(context):
+    """live_context must be an object of numbers (or null), sector_shares an object of numbers"""
+    if context is None:
+        return
+    if not isinstance(context, dict):
+        raise HTTPException(400, "'live_context' must be an object")
+    for key, value in context.items():
+        if key == 'sector_shares':
+            if value is not None and not (isinstance(value, dict) and all(map(_is_number, value.values()))):
+                raise HTTPException(400, "'live_context.sector_shares' must be an object of numbers")
+        elif not _is_number(value):
+            raise HTTPException(400, f"'live_context.{key}' must be a number")
+
+
+def _require_indicator(compiler, indicator):
+    if not indicator:
+        raise HTTPException(400, "'indicator' is required")
+    if indicator not in compiler.service.indicators:
+        raise HTTPException(404, f"Unknown indicator: {indicator}")
+    return indicator
+
+
+class ResponseCache:
+    """
+    LRU of encoded response bodies keyed by (data version, endpoint, parameters),
+    bounded by entry count and by the bytes of the bodies plus their keys
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, max_bytes=RESPONSE_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._cache = OrderedDict()  # key -> (body, cost)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cost(key, body):
+        return len(body) + sum(len(part) for part in key if isinstance(part, (str, bytes)))
+
+    def get(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key][0]
+        return None
+
+    def put(self, key, body):
+        cost = self.cost(key, body)
+        if cost > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                self.size -= self._cache.pop(key)[1]
+            self._cache[key] = (body, cost)
+            self.size += cost
+            while len(self._cache) > self.max_entries or self.size > self.max_bytes:
+                self.size -= self._cache.popitem(last=False)[1][1]
+
+
+response_cache = ResponseCache()
+
+
+def cached_endpoint(compute):
+    """
+    Wrap ``compute(request, compiler) -> payload`` as an async endpoint.
+    The computation runs in the worker thread pool so the event loop stays
+    free; encoded results are cached per dataset version and query string.
+    """
+    timed = profiled(f"api.{compute.__name__}")(compute)
+
+    async def endpoint(request):
+        key = (data_version(), request.url.path, str(request.query_params))
+        body = response_cache.get(key)
+        if body is None:
+            compiler = await run_in_threadpool(get_query_compiler)
+            payload = await run_in_threadpool(timed, request, compiler)
+            body = _encode(payload)
+            response_cache.put(key, body)
+        return Response(body, media_type='application/json')
+    return endpoint
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ENDPOINTS
+# ═══════════════════════════════════════════════════════════════════
+
+def meta(request, compiler):
+    service = compiler.service
+    return {
+        'version': data_version(),
+        'countries': service.countries,
+        'indicators': service.indicators,
+        'years': [service.min_year, service.max_year],
+        'records': service.stats['records'],
+    }
+
+
+def data_slice(request, compiler):
+    indicators = _list_param(request, 'indicators') or [compiler.service.gini_indicator]
+    for indicator in indicators:
+        _require_indicator(compiler, indicator)
+    start = _int_param(request, 'start', compiler.service.min_year)
+    end = _int_param(request, 'end', compiler.service.max_year)
+    values = compiler.select(indicators, _list_param(request, 'countries'), (start, end))
+    if len(values) > MAX_SLICE_ROWS:
+        raise HTTPException(413, f"Slice has {len(values):,} rows; narrow it below {MAX_SLICE_ROWS:,}")
+    return {'rows': _records(values.reset_index())}
+
+
+def rankings(request, compiler):
+    indicator = _require_indicator(
+        compiler, request.query_params.get('indicator', compiler.service.gini_indicator))
+    order = request.query_params.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise HTTPException(400, "'order' must be 'asc' or 'desc'")
+    table = compiler.rank(
+        indicator,
+        countries=_list_param(request, 'countries'),
+        year=_int_param(request, 'year'),
+        ascending=(order == 'asc'),
+        k=_int_param(request, 'k', DEFAULT_TOP_K, minimum=1),
+    )
+    return {'indicator': indicator, 'order': order, 'rankings': _records(table)}
+
+
+def compare(request, compiler):
+    indicators = _list_param(request, 'indicators') or [compiler.service.gini_indicator]
+    for indicator in indicators:
+        _require_indicator(compiler, indicator)
+    then, now = _period_param(request, 'then'), _period_param(request, 'now')
+    if _period_bounds(then) >= _period_bounds(now):
+        raise HTTPException(400, "'then' must come before 'now'")
+
+    then_m, now_m, delta = period_matrices(compiler.service.df, indicators, then=then, now=now)
+    countries = _list_param(request, 'countries')
+    if countries:
+        then_m, now_m, delta = (m.reindex(countries) for m in (then_m, now_m, delta))
+    n_resamples = _int_param(request, 'resamples', 10000, minimum=MIN_RESAMPLES, maximum=MAX_RESAMPLES)
+    tests = significance_tests(then_m, now_m, n_resamples=n_resamples)
+
+    def by_country(matrix):
+        return {ind: _records(matrix[[ind]].rename(columns={ind: 'value'}).reset_index())
+                for ind in indicators}
+
+    return {
+        'then': by_country(then_m),
+        'now': by_country(now_m),
+        'change': by_country(delta),
+        'significance': _records(tests.rename_axis('indicator').reset_index()),
+    }
+
+
+def correlation(request, compiler):
+    from scipy.stats import pearsonr
+
+    x = _require_indicator(compiler, request.query_params.get('x'))
+    y = _require_indicator(compiler, request.query_params.get('y'))
+    if x == y:
+        raise HTTPException(400, "'x' and 'y' must be different indicators")
+    values = compiler.select([x, y], _list_param(request, 'countries'))
+    wide = values.groupby(level=['country', 'year', 'indicator']).mean().unstack('indicator')
+    pairs = wide.reindex(columns=[x, y]).dropna()
+    if len(pairs) < 3:
+        return {'x': x, 'y': y, 'n': len(pairs), 'r': None, 'p_value': None}
+    r, p = pearsonr(pairs[x].to_numpy(), pairs[y].to_numpy())
+    return {
+        'x': x, 'y': y, 'n': len(pairs), 'r': float(r), 'p_value': float(p),
+        'countries': sorted(pairs.index.get_level_values('country').unique()),
+    }
+
+
+def quality(request, compiler):
+    audit = load_quality_audit()
+    countries = _list_param(request, 'countries')
+    if countries and not audit.empty:
+        audit = audit[audit['country'].isin(countries)]
+    return {'audit': _records(audit)}
+
+
+async def simulate(request):
+    """Score simulator profiles: POST {"profiles": [{country, edu, digital, ...}, ...]}"""
+    raw = await request.body()
+    key = (data_version(), request.url.path, raw) if len(raw) <= MAX_CACHED_REQUEST_BYTES else None
+    cached = response_cache.get(key) if key else None
+    if cached is not None:
+        return Response(cached, media_type='application/json')
+
+    try:
+        body = json.loads(raw)
+        profiles = pd.DataFrame(body['profiles'])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(400, "Body must be JSON with a 'profiles' list")
+    missing = [f for f in PROFILE_FIELDS if f not in profiles.columns]
+    if missing:
+        raise HTTPException(400, f"Profiles are missing fields: {missing}")
+    if len(profiles) > MAX_PROFILES:
+        raise HTTPException(413, f"At most {MAX_PROFILES:,} profiles per request")
+    _check_profiles(profiles)
+    _check_live_context(body.get('live_context'))
+
+    scores = await run_in_threadpool(score_profiles, profiles, body.get('live_context'))
+    scores = scores.replace([np.inf, -np.inf], np.nan)
+    encoded = _encode({'scores': _records(scores)})
+    if key:
+        response_cache.put(key, encoded)
+    return Response(encoded, media_type='application/json')
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'version': data_version()})
+
+
+async def metrics(request):
+    """Stage timings (utils.profiling) in Prometheus text format; empty unless PROFILE_STAGES is set"""
+    return Response(prometheus_metrics(), media_type='text/plain; version=0.0.4')
+
+
+async def http_error(request, exc):
+    return JSONResponse({'error': exc.detail}, status_code=exc.status_code)
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health),
+        Route('/metrics', metrics),
+        Route('/meta', cached_endpoint(meta)),
+        Route('/slice', cached_endpoint(data_slice)),
+        Route('/rankings', cached_endpoint(rankings)),
+        Route('/compare', cached_endpoint(compare)),
+        Route('/correlation', cached_endpoint(correlation)),
+        Route('/quality', cached_endpoint(quality)),
+        Route('/simulate', simulate, methods=['POST']),
+    ],
+    exception_handlers={HTTPException: http_error},
+)
@@ -9,8 +9,10 @@ sys.path.append(str(Path(__file__).parent))
 from utils.loaders import load_inequality_data
 from utils.data_loader import SouthAsiaDataLoader
 from utils.utils import human_indicator, get_color_scale
+from utils.state import default_analysis_config
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 from utils.user_manager import UserManager
 import time
 import os 
@@ -58,6 +60,7 @@ with st.sidebar:
 
 
 apply_all_styles()
+start_page("Home")
 
 render_help_button("home")
 
@@ -83,6 +86,8 @@ api_stats = api_loader.get_api_summary_v2()
 display_data_points = total_records + api_stats['total_records']
 display_indicators = total_indicators + api_stats['indicators']
 
+lap("Load stats")
+
 # HERO SECTION
 st.markdown("""
 <div style="text-align: center; margin-bottom: 3rem;">
@@ -141,6 +146,8 @@ with col4:
 
 st.markdown("<br><br>", unsafe_allow_html=True)
 
+lap("Hero & quick stats")
+
 # CONFIGURATION SECTION
 
 # Initialize session state
@@ -155,21 +162,8 @@ max_year = int(df['year'].max())
 
 # Create defaults if none exist
 if st.session_state.analysis_config is None:
-    # Prioritize Top 10% Income Share, then Gini, then first available
-    if 'Top 10% Income Share' in all_indicators:
-        default_indicator = 'Top 10% Income Share'
-    elif 'gini_index' in all_indicators:
-        default_indicator = 'gini_index'
-    else:
-        default_indicator = all_indicators[0] if all_indicators else None
-    default_year_start = max(min_year, max_year - 20)
-    default_year_range = (default_year_start, max_year)
-    
     st.session_state.analysis_config = {
-        'countries': all_countries,
-        'year_range': default_year_range,
-        'indicator': default_indicator,
-        'color_scale': get_color_scale(default_indicator) if default_indicator else 'Viridis',
+        **default_analysis_config(df),
         'timestamp': pd.Timestamp.now()
     }
 
@@ -392,6 +386,8 @@ if st.session_state.get('show_save_options'):
                     st.warning("Please fill in email and occupation.")
 
 
+lap("Configuration")
+
 # CURRENT CONFIGURATION DISPLAY
 
 if st.session_state.analysis_config is not None:
@@ -485,6 +481,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+lap("Summary & help")
+
 # -----------------
 # Navigation
 # -----------------
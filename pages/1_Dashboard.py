@@ -12,10 +12,18 @@ import io
 sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.loaders import load_inequality_data
+from utils.analysis_cache import config_slice, latest_values, country_correlation
+from utils.forecasting import (series_forecast, add_projection_traces, projection_caption,
+                                artifact_version, FORECASTS_PATH)
+from utils.imputation import filled_series, provenance_caption
+from utils.rankings import rank_table, render_ranking_list
+from utils.figures import new_figure, country_traces, cached_figure
+from utils.analysis_store import open_shared_analysis, share_analysis
 from utils.utils import human_indicator, format_value
-from utils.exports import export_data_menu
+from utils.exports import export_data_menu, image_download_buttons
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 from utils.api_loader import get_api_loader
 from utils.imf_api_loader import get_imf_loader
 from utils.un_data_loader import get_un_loader
@@ -35,6 +43,7 @@ un_loader = get_un_loader()
 
 render_help_button("dashboard")
 apply_all_styles()
+start_page("Dashboard")
 # ═══════════════════════════════════════════════════════════════════
 
 st.markdown("""
@@ -268,29 +277,37 @@ if df.empty:
     st.stop()
 
 ensure_public_analysis(df)
+
+# A share link (?share=<id>) opens a saved analysis and renders its stored results.
+# Its filters are applied once per share id, so later filter changes are kept on rerun.
+share_id = st.query_params.get('share')
+shared = open_shared_analysis(share_id)
+if shared and st.session_state.get('_applied_share') != share_id:
+    st.session_state.analysis_config = {**shared['filters'], 'year_range': tuple(shared['filters']['year_range'])}
+    st.session_state._applied_share = share_id
 config = st.session_state.analysis_config
 
-# Filter data
-filtered_df = df[
-    (df['country'].isin(config['countries'])) &
-    (df['year'] >= config['year_range'][0]) &
-    (df['year'] <= config['year_range'][1]) &
-    (df['indicator'] == config['indicator'])
-].copy()
+# Filter data (one mean value per country-year; shared via the persistent cache)
+config_filters = (list(config['countries']), config['indicator'], tuple(config['year_range']))
+if shared:
+    shared_filters = shared['filters']
+    if config_filters != (list(shared_filters['countries']), shared_filters['indicator'],
+                          tuple(shared_filters['year_range'])):
+        shared = None  # Filters changed since: compute the current view instead
+    else:
+        st.caption(f"🔗 Shared analysis: **{shared['name']}** · {shared['view_count']} views")
+shared_results = shared['results'] if shared else None
+filtered_df = (shared_results['slice'] if shared_results else config_slice(*config_filters)).copy()
 
 if filtered_df.empty:
     st.warning("⚠️ No data available for selected filters")
     st.stop()
 
-# FIX: Remove duplicates and scale values
-# Remove duplicate country-year rows by averaging
-filtered_df = filtered_df.groupby(['country', 'year', 'indicator']).agg({
-    'value': 'mean'
-}).reset_index()
-
 # Auto-scaling logic removed to preserve data integrity
 
 
+lap("Load & filter")
+
 # ═══════════════════════════════════════════════════════════════════
 # API ENRICHMENT SECTION
 # ═══════════════════════════════════════════════════════════════════
@@ -430,16 +447,14 @@ st.markdown(f"""
 
 
 
+lap("API enrichment & header")
+
 # ═══════════════════════════════════════════════════════════════════
 # KEY METRICS ROW 
 # ═══════════════════════════════════════════════════════════════════
 
 latest_year = int(filtered_df['year'].max())
-latest_data = filtered_df[filtered_df['year'] == latest_year].groupby('country').agg({
-    'value': 'mean',
-    'year': 'first',
-    'indicator': 'first'
-}).reset_index()
+latest_data = (shared_results['latest'] if shared_results else latest_values(*config_filters)).drop(columns='rank')
 prev_year = latest_year - 1
 prev_data = filtered_df[filtered_df['year'] == prev_year]
 
@@ -720,38 +735,38 @@ if use_economic_apis:
                     )
                     
                     if not gdp_forecasts.empty:
-                        # Create trend chart
-                        fig_forecast = go.Figure()
-                        
-                        for country in gdp_forecasts['country'].unique():
-                            country_data = gdp_forecasts[gdp_forecasts['country'] == country]
-                            fig_forecast.add_trace(go.Scatter(
-                                x=country_data['year'],
-                                y=country_data['value'],
-                                mode='lines+markers',
-                                name=country,
-                                line=dict(width=3),
-                                marker=dict(size=8)
-                            ))
-                        
-                        fig_forecast.update_layout(
-                            title="GDP Growth Trends (%)",
-                            xaxis_title="Year",
-                            yaxis_title="GDP Growth Rate (%)",
-                            height=350,  # Increased height
-                            paper_bgcolor='rgba(0,0,0,0)',
-                            plot_bgcolor='rgba(0,0,0,0)',
-                            font=dict(color='#e2e8f0'),
-                            legend=dict(orientation="h", y=-0.3),  # Moved legend lower
-                            margin=dict(l=40, r=40, t=40, b=80),  # Increased bottom margin
-                            xaxis=dict(
-                                dtick=5,  # Show tick every 5 years
-                                tickangle=-45,  # Rotate labels to prevent overlap
-                                tickfont=dict(size=11)
+                        # Projections of the curated World Bank series (precomputed)
+                        gdp_projections = series_forecast('GDP growth (annual %)', config['countries'])
+
+                        def build_gdp_chart():
+                            gdp_colors = dict(zip(gdp_forecasts['country'].unique(), px.colors.qualitative.Plotly))
+                            fig = new_figure(
+                                country_traces(gdp_forecasts, gdp_colors, mode='lines+markers',
+                                               line=dict(width=3), marker=dict(size=8), hovertemplate=None),
+                                title="GDP Growth Trends (%)",
+                                yaxis=dict(title="GDP Growth Rate (%)"),
+                                height=350,  # Increased height
+                                legend=dict(orientation="h", y=-0.3),  # Moved legend lower
+                                margin=dict(l=40, r=40, t=40, b=80),  # Increased bottom margin
+                                xaxis=dict(
+                                    title="Year",
+                                    dtick=5,  # Show tick every 5 years
+                                    tickangle=-45,  # Rotate labels to prevent overlap
+                                    tickfont=dict(size=11)
+                                )
                             )
-                        )
-                        
+                            add_projection_traces(fig, gdp_projections, gdp_colors, band=False)
+                            return fig
+
+                        # Keyed on the versions of both inputs (WEO file and forecast artifact)
+                        fig_forecast = cached_figure(build_gdp_chart, 'imf_gdp_growth',
+                                                     (list(config['countries']), str(imf_loader.path),
+                                                      artifact_version(imf_loader.path),
+                                                      artifact_version(FORECASTS_PATH)))
+
                         st.plotly_chart(fig_forecast, use_container_width=True)
+                        if not gdp_projections.empty:
+                            st.caption(projection_caption(gdp_projections))
                         
                         # Summary statistics
                         latest_avail_year = gdp_forecasts['year'].max()
@@ -769,10 +784,11 @@ if use_economic_apis:
     # UN Social Indicators
     if use_un:
         with forecast_col2:
-            st.markdown("""
+            un_year = f" ({un_loader.years.max()})" if len(un_loader.years) else ""
+            st.markdown(f"""
             <div style="background: linear-gradient(135deg, rgba(59, 130, 246, 0.1), rgba(96, 165, 250, 0.1)); 
                         padding: 20px; border-radius: 12px; border-left: 4px solid #3b82f6;">
-                <h4 style="color: #ffffff; margin-top: 0;">🌍 UN Social Indicators (2023)</h4>
+                <h4 style="color: #ffffff; margin-top: 0;">🌍 UN Social Indicators{un_year}</h4>
             """, unsafe_allow_html=True)
             
             try:
@@ -814,6 +830,23 @@ if use_economic_apis:
                     categories = hdi_data['category'].value_counts()
                     category_text = " | ".join([f"{cat}: {count}" for cat, count in categories.items()])
                     st.info(f"📊 **Categories:** {category_text}")
+                    
+                    # HDI history (one slice of the HDR time series; only when it spans several years)
+                    hdi_history = un_loader.get_indicators(config['countries'], ['HDI'])
+                    if hdi_history['year'].nunique() > 1:
+                        with st.expander("📈 HDI history", expanded=False):
+                            fig_hdi_history = px.line(hdi_history, x='year', y='value', color='country', markers=True)
+                            fig_hdi_history.update_layout(
+                                height=300,
+                                paper_bgcolor='rgba(0,0,0,0)',
+                                plot_bgcolor='rgba(0,0,0,0)',
+                                font=dict(color='#e2e8f0'),
+                                xaxis_title="Year",
+                                yaxis_title="HDI",
+                                legend=dict(orientation="h", y=-0.3),
+                                margin=dict(l=40, r=20, t=20, b=80)
+                            )
+                            st.plotly_chart(fig_hdi_history, use_container_width=True)
                 else:
                     st.warning("ℹ️ UN HDI data unavailable")
                     
@@ -822,6 +855,8 @@ if use_economic_apis:
             
             st.markdown("</div>", unsafe_allow_html=True)
 
+lap("Metrics & insights")
+
 # ═══════════════════════════════════════════════════════════════════
 # MAIN VISUALIZATION SECTION
 # ═══════════════════════════════════════════════════════════════════
@@ -840,13 +875,14 @@ render_availability_badge(actual_min_year, actual_max_year, selected_min_year, s
 
 
 
-# Main area chart -
-yearly_data = filtered_df.pivot_table(
+# Main area chart - missing years come from the shared filled cube (utils/imputation.py)
+area_rows = filled_series(config['indicator'], config['countries'], (actual_min_year, actual_max_year))
+yearly_data = area_rows.pivot_table(
     values='value',
     index='year',
     columns='country',
     aggfunc='mean'
-).ffill()
+).reindex(columns=sorted(filtered_df['country'].unique()))
 
 fig_area = go.Figure()
 
@@ -921,27 +957,8 @@ col_spacer, col_downloads = st.columns([10, 1])
 with col_downloads:
     with st.popover("⬇️", help="Download in multiple formats"):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-        # PNG
-        try:
-            png_bytes = fig_area.to_image(format="png", width=1400, height=1000)
-            st.download_button("PNG", png_bytes, f"temporal_trends_{timestamp}.png", "image/png", key="area_png", use_container_width=True)
-        except:
-            st.button("PNG", disabled=True, key="area_png", use_container_width=True)
-
-        # JPG
-        try:
-            jpg_bytes = fig_area.to_image(format="jpeg", width=1400, height=1000)
-            st.download_button("JPG", jpg_bytes, f"temporal_trends_{timestamp}.jpg", "image/jpeg", key="area_jpg", use_container_width=True)
-        except:
-            st.button("JPG", disabled=True, key="area_jpg", use_container_width=True)
-
-        # JPEG
-        try:
-            jpeg_bytes = fig_area.to_image(format="jpeg", width=1400, height=1000)
-            st.download_button("JPEG", jpeg_bytes, f"temporal_trends_{timestamp}.jpeg", "image/jpeg", key="area_jpeg", use_container_width=True)
-        except:
-            st.button("JPEG", disabled=True, key="area_jpeg", use_container_width=True)
+        # Rendered on click by the shared kaleido worker, not on every rerun
+        image_download_buttons(fig_area, f"temporal_trends_{timestamp}", width=1400, height=1000, key="area")
 
 
 st.plotly_chart(fig_area, use_container_width=True, config={
@@ -956,6 +973,9 @@ st.plotly_chart(fig_area, use_container_width=True, config={
         'scale': 2
     }
 })
+area_note = provenance_caption(area_rows[area_rows['country'].isin(yearly_data.columns)])
+if area_note:
+    st.caption(f"ℹ️ {area_note}")
 
 # STORYTELLING: Inequality Trends
 st.markdown(f"""
@@ -970,6 +990,26 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+# Model projections (precomputed by scripts/build_forecasts.py; nothing is fitted here)
+projections = series_forecast(config['indicator'], config['countries'])
+if not projections.empty:
+    with st.expander("📈 Model projections", expanded=False):
+        country_colors = {country: colors[i % len(colors)] for i, country in enumerate(yearly_data.columns)}
+        fig_projection = new_figure(
+            country_traces(filtered_df, country_colors, order=list(country_colors), mode='lines', line=dict(width=2.5)),
+            height=420,
+            xaxis=dict(title='Year'),
+            yaxis=dict(title=y_label_short),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02),
+            margin=dict(l=60, r=20, t=60, b=40),
+            hovermode='x unified'
+        )
+        add_projection_traces(fig_projection, projections, country_colors, observed=filtered_df)
+        st.plotly_chart(fig_projection, use_container_width=True, key="projection_chart")
+        st.caption(projection_caption(projections))
+
+lap("Main chart")
+
 # ═══════════════════════════════════════════════════════════════════
 # SECONDARY VISUALIZATIONS ROW
 # ═══════════════════════════════════════════════════════════════════
@@ -1059,27 +1099,8 @@ with col_viz1:
     with col_downloads2:
         with st.popover("⬇️", help="Download in multiple formats"):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-            # PNG
-            try:
-                png_bytes = fig_bars.to_image(format="png", width=1400, height=1000)
-                st.download_button("PNG", png_bytes, f"country_avg_{timestamp}.png", "image/png", key="bar_png", use_container_width=True)
-            except:
-                st.button("PNG", disabled=True, key="bar_png", use_container_width=True)
-
-            # JPG
-            try:
-                jpg_bytes = fig_bars.to_image(format="jpeg", width=1400, height=1000)
-                st.download_button("JPG", jpg_bytes, f"country_avg_{timestamp}.jpg", "image/jpeg", key="bar_jpg", use_container_width=True)
-            except:
-                st.button("JPG", disabled=True, key="bar_jpg", use_container_width=True)
-
-            # JPEG
-            try:
-                jpeg_bytes = fig_bars.to_image(format="jpeg", width=1400, height=1000)
-                st.download_button("JPEG", jpeg_bytes, f"country_avg_{timestamp}.jpeg", "image/jpeg", key="bar_jpeg", use_container_width=True)
-            except:
-                st.button("JPEG", disabled=True, key="bar_jpeg", use_container_width=True)
+            # Rendered on click by the shared kaleido worker, not on every rerun
+            image_download_buttons(fig_bars, f"country_avg_{timestamp}", width=1400, height=1000, key="bar")
     
     st.plotly_chart(fig_bars, use_container_width=True, config={
         'displayModeBar': 'hover',
@@ -1195,27 +1216,8 @@ with col_viz2:
     with col_downloads3:
         with st.popover("⬇️", help="Download in multiple formats"):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-            # PNG
-            try:
-                png_bytes = fig_radial.to_image(format="png", width=1400, height=1400)
-                st.download_button("PNG", png_bytes, f"radial_{timestamp}.png", "image/png", key="radial_png", use_container_width=True)
-            except:
-                st.button("PNG", disabled=True, key="radial_png", use_container_width=True)
-
-            # JPG
-            try:
-                jpg_bytes = fig_radial.to_image(format="jpeg", width=1400, height=1400)
-                st.download_button("JPG", jpg_bytes, f"radial_{timestamp}.jpg", "image/jpeg", key="radial_jpg", use_container_width=True)
-            except:
-                st.button("JPG", disabled=True, key="radial_jpg", use_container_width=True)
-
-            # JPEG
-            try:
-                jpeg_bytes = fig_radial.to_image(format="jpeg", width=1400, height=1400)
-                st.download_button("JPEG", jpeg_bytes, f"radial_{timestamp}.jpeg", "image/jpeg", key="radial_jpeg", use_container_width=True)
-            except:
-                st.button("JPEG", disabled=True, key="radial_jpeg", use_container_width=True)
+            # Rendered on click by the shared kaleido worker, not on every rerun
+            image_download_buttons(fig_radial, f"radial_{timestamp}", width=1400, height=1400, key="radial")
     
     st.plotly_chart(fig_radial, use_container_width=True, config={
         'displayModeBar': 'hover',
@@ -1287,50 +1289,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ✅ FIX #1 & #5: SMART CORRELATION CALCULATION WITH DATA OVERLAP CHECKING
-country_trends = filtered_df.pivot_table(values='value', index='year', columns='country')
-
-# Check data quality for correlation analysis
-total_years = len(country_trends)
-min_required_years = max(10, int(total_years * 0.5))  # At least 10 years or 50% of data
-
-# Calculate data availability for each country
-data_availability = {}
-for country in country_trends.columns:
-    non_null_count = country_trends[country].notna().sum()
-    data_availability[country] = non_null_count
-
-# Check if we have sufficient overlapping data
-sufficient_data = all(count >= min_required_years for count in data_availability.values())
-
-# Calculate pairwise overlaps
-pairwise_overlaps = {}
-for i, country1 in enumerate(country_trends.columns):
-    for j, country2 in enumerate(country_trends.columns):
-        if i < j:
-            # Count years where both countries have data
-            overlap = (country_trends[country1].notna() & country_trends[country2].notna()).sum()
-            pairwise_overlaps[(country1, country2)] = overlap
-
-# Calculate average pairwise overlap
-avg_overlap = np.mean(list(pairwise_overlaps.values())) if pairwise_overlaps else 0
-min_overlap = min(pairwise_overlaps.values()) if pairwise_overlaps else 0
-
-# Decide if we can show correlation
-show_correlation = sufficient_data and avg_overlap >= min_required_years
-
-if show_correlation:
-    # Calculate correlation matrix normally
-    correlation_matrix = country_trends.corr()
-    
-    # Replace NaN correlations with 0 for countries with insufficient overlap
-    for (country1, country2), overlap in pairwise_overlaps.items():
-        if overlap < min_required_years:
-            i = list(correlation_matrix.index).index(country1)
-            j = list(correlation_matrix.columns).index(country2)
-            correlation_matrix.iloc[i, j] = np.nan
-            correlation_matrix.iloc[j, i] = np.nan
-else:
-    correlation_matrix = None
+correlation = shared_results['correlation'] if shared_results else country_correlation(*config_filters)
+correlation_matrix = correlation['matrix']
+data_availability = correlation['availability']
+total_years = correlation['total_years']
+min_required_years = correlation['min_required_years']  # At least 10 years or 50% of data
+avg_overlap = correlation['avg_overlap']
+min_overlap = correlation['min_overlap']
+show_correlation = correlation_matrix is not None
 
 # ✅ FIX #3: CONDITIONAL HEATMAP DISPLAY
 if show_correlation and correlation_matrix is not None:
@@ -1408,48 +1374,8 @@ if show_correlation and correlation_matrix is not None:
     with col_downloads_corr:
         with st.popover("⬇️", help="Download correlation matrix"):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-            # PNG
-            try:
-                png_bytes = fig_corr.to_image(format="png", width=1400, height=1400)
-                st.download_button(
-                    "PNG",
-                    png_bytes,
-                    f"correlation_matrix_{timestamp}.png",
-                    "image/png",
-                    key="corr_png",
-                    use_container_width=True
-                )
-            except:
-                st.button("PNG", disabled=True, key="corr_png", use_container_width=True)
-
-            # JPG
-            try:
-                jpg_bytes = fig_corr.to_image(format="jpeg", width=1400, height=1400)
-                st.download_button(
-                    "JPG",
-                    jpg_bytes,
-                    f"correlation_matrix_{timestamp}.jpg",
-                    "image/jpeg",
-                    key="corr_jpg",
-                    use_container_width=True
-                )
-            except:
-                st.button("JPG", disabled=True, key="corr_jpg", use_container_width=True)
-
-            # JPEG
-            try:
-                jpeg_bytes = fig_corr.to_image(format="jpeg", width=1400, height=1400)
-                st.download_button(
-                    "JPEG",
-                    jpeg_bytes,
-                    f"correlation_matrix_{timestamp}.jpeg",
-                    "image/jpeg",
-                    key="corr_jpeg",
-                    use_container_width=True
-                )
-            except:
-                st.button("JPEG", disabled=True, key="corr_jpeg", use_container_width=True)
+            # Rendered on click by the shared kaleido worker, not on every rerun
+            image_download_buttons(fig_corr, f"correlation_matrix_{timestamp}", width=1400, height=1400, key="corr")
 
     # Display the chart
     st.plotly_chart(fig_corr, use_container_width=True, config={
@@ -1502,6 +1428,8 @@ else:
     
     st.dataframe(availability_df, use_container_width=True, hide_index=True)
 
+lap("Secondary charts & correlation")
+
 # ═══════════════════════════════════════════════════════════════════
 # CORRELATION INSIGHTS - Key Statistics (Only shown if correlation is available)
 # ═══════════════════════════════════════════════════════════════════
@@ -1666,6 +1594,9 @@ if show_correlation and correlation_matrix is not None:
             )
         else:
             st.info("No valid correlation pairs available with current data.")
+
+lap("Correlation insights")
+
 # ═══════════════════════════════════════════════════════════════════
 # BOTTOM SECTION: Rankings & Timeline
 # ═══════════════════════════════════════════════════════════════════
@@ -1686,62 +1617,10 @@ with col_bottom1:
     </div>
     """, unsafe_allow_html=True)
     
-    rankings = latest_data.groupby('country')['value'].mean().reset_index()
-    # Sort based on indicator type: for positive indicators, highest is best (rank #1)
-    if is_positive_indicator:
-        rankings = rankings.sort_values('value', ascending=False).reset_index(drop=True)
-    else:
-        rankings = rankings.sort_values('value', ascending=True).reset_index(drop=True)
-    
-    for idx, row in rankings.iterrows():
-        rank = idx + 1
-        country = row['country']
-        value = row['value']
-        
-        # Calculate bar width based on indicator type
-        # For positive indicators: higher value = fuller bar
-        # For negative indicators: lower value = fuller bar (inverted)
-        if is_positive_indicator:
-            pct_of_max = (value / rankings['value'].max()) * 100
-        else:
-            # Invert for negative indicators so rank #1 (lowest) has fullest bar
-            max_val = rankings['value'].max()
-            min_val = rankings['value'].min()
-            if max_val != min_val:
-                # Normalize inversely: best (min) = 100%, worst (max) = smallest %
-                pct_of_max = ((max_val - value) / (max_val - min_val)) * 100
-            else:
-                pct_of_max = 100  # All equal
-        
-        # Color based on rank (NO EMOJIS)
-        if rank == 1:
-            bar_color = '#10b981'
-            rank_icon = '#1'
-        elif rank == 2:
-            bar_color = '#3b82f6'
-            rank_icon = '#2'
-        elif rank == 3:
-            bar_color = '#8b5cf6'
-            rank_icon = '#3'
-        else:
-            bar_color = '#64748b'
-            rank_icon = f'#{rank}'
-        
-        st.markdown(f"""
-        <div style="margin-bottom: 12px;">
-            <div style="display: flex; justify-content: space-between; margin-bottom: 4px;">
-                <span style="color: #e2e8f0; font-size: 0.9rem; font-weight: 500;">
-                    {rank_icon} {country}
-                </span>
-                <span style="color: #ffffff; font-weight: 600; font-size: 0.9rem;">
-                    {value:.2f}
-                </span>
-            </div>
-            <div style="background: rgba(100, 116, 139, 0.2); border-radius: 4px; height: 6px; overflow: hidden;">
-                <div style="background: {bar_color}; height: 100%; width: {pct_of_max}%; border-radius: 4px;"></div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    # Ranks, bars and colours in one pass, rendered as a single HTML block
+    rankings = rank_table(latest_data.groupby('country')['value'].mean().reset_index(),
+                          higher_is_better=is_positive_indicator)
+    render_ranking_list(rankings)
 
 with col_bottom2:
     st.markdown("""
@@ -1752,87 +1631,49 @@ with col_bottom2:
     </div>
     """, unsafe_allow_html=True)
     
-    fig_lines = go.Figure()
-    
-    for i, country in enumerate(filtered_df['country'].unique()):
-        country_data = filtered_df[filtered_df['country'] == country].sort_values('year')
-        
-        fig_lines.add_trace(go.Scatter(
-            x=country_data['year'],
-            y=country_data['value'],
-            mode='lines+markers',
-            name=country,
-            line=dict(width=2.5, color=colors[i % len(colors)]),
-            marker=dict(size=6, color=colors[i % len(colors)]),
-            hovertemplate='<b>%{fullData.name}</b><br>Year: %{x}<br>Value: %{y:.2f}<extra></extra>'
-        ))
-    
-    # REQUIREMENT #5: PROPER AXIS LABELS (FIXED SPACING)
-    fig_lines.update_layout(
-        height=350,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#e2e8f0', size=12),
-        xaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 116, 139, 0.2)',
-            title=dict(
-                text=f'<b>Year ({config["year_range"][0]}-{config["year_range"][1]})</b>',
-                font=dict(size=13, color='#94a3b8')
+    # One grouped pass over the slice; the figure is reused while the config is unchanged
+    def build_country_lines():
+        return new_figure(
+            country_traces(filtered_df, colors, mode='lines+markers', line=dict(width=2.5),
+                           style=lambda i, country, color: dict(marker=dict(size=6, color=color))),
+            height=350,
+            xaxis=dict(
+                title=dict(
+                    text=f'<b>Year ({config["year_range"][0]}-{config["year_range"][1]})</b>',
+                    font=dict(size=13, color='#94a3b8')
+                )
             ),
-            color='#94a3b8'
-        ),
-        yaxis=dict(
-            showgrid=True,
-            gridcolor='rgba(100, 116, 139, 0.2)',
-            title=dict(
-                text=f'<b>{y_label_short}<br>(Index Value)</b>',  # Use <br> for line break
-                font=dict(size=12, color='#94a3b8')
+            yaxis=dict(
+                title=dict(
+                    text=f'<b>{y_label_short}<br>(Index Value)</b>',  # Use <br> for line break
+                    font=dict(size=12, color='#94a3b8')
+                )
             ),
-            color='#94a3b8'
-        ),
-        legend=dict(
-            orientation="v",
-            yanchor="top",
-            y=1,
-            xanchor="left",
-            x=1.01,
-            bgcolor='#0f1419',
-            bordercolor='rgba(59, 130, 246, 0.3)',
-            borderwidth=1,
-            font=dict(color='#e2e8f0', size=10),
-            title=dict(text='<b>Countries</b>', font=dict(size=11, color='#e2e8f0'))
-        ),
-        margin=dict(l=80, r=150, t=40, b=50),  # Increased left margin
-        hovermode='x unified'
-    )
+            legend=dict(
+                orientation="v",
+                yanchor="top",
+                y=1,
+                xanchor="left",
+                x=1.01,
+                bgcolor='#0f1419',
+                bordercolor='rgba(59, 130, 246, 0.3)',
+                borderwidth=1,
+                font=dict(size=10),
+                title=dict(text='<b>Countries</b>', font=dict(size=11, color='#e2e8f0'))
+            ),
+            margin=dict(l=80, r=150, t=40, b=50),  # Increased left margin
+            hovermode='x unified'
+        )
+
+    fig_lines = cached_figure(build_country_lines, 'country_lines', config_filters)
     
     # Download options
     col_spacer4, col_downloads4 = st.columns([10, 1])
     with col_downloads4:
         with st.popover("⬇️", help="Download in multiple formats"):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-            # PNG
-            try:
-                png_bytes = fig_lines.to_image(format="png", width=1400, height=1000)
-                st.download_button("PNG", png_bytes, f"individual_trends_{timestamp}.png", "image/png", key="line_png", use_container_width=True)
-            except:
-                st.button("PNG", disabled=True, key="line_png", use_container_width=True)
-
-            # JPG
-            try:
-                jpg_bytes = fig_lines.to_image(format="jpeg", width=1400, height=1000)
-                st.download_button("JPG", jpg_bytes, f"individual_trends_{timestamp}.jpg", "image/jpeg", key="line_jpg", use_container_width=True)
-            except:
-                st.button("JPG", disabled=True, key="line_jpg", use_container_width=True)
-
-            # JPEG
-            try:
-                jpeg_bytes = fig_lines.to_image(format="jpeg", width=1400, height=1000)
-                st.download_button("JPEG", jpeg_bytes, f"individual_trends_{timestamp}.jpeg", "image/jpeg", key="line_jpeg", use_container_width=True)
-            except:
-                st.button("JPEG", disabled=True, key="line_jpeg", use_container_width=True)
+            # Rendered on click by the shared kaleido worker, not on every rerun
+            image_download_buttons(fig_lines, f"individual_trends_{timestamp}", width=1400, height=1000, key="line")
     
     st.plotly_chart(fig_lines, use_container_width=True, config={
         'displayModeBar': 'hover',
@@ -1858,6 +1699,8 @@ with col_bottom2:
     """, unsafe_allow_html=True)
 
 
+lap("Rankings & timeline")
+
 # ═══════════════════════════════════════════════════════════════════
 # FOOTER INSIGHTS 
 # ═══════════════════════════════════════════════════════════════════
@@ -1962,9 +1805,19 @@ with st.expander("View Raw Data & Export Options"):
     st.dataframe(filtered_df, use_container_width=True, hide_index=True)
     export_data_menu(filtered_df, "dashboard_data_export", key="dashboard_data")
 
+    # Share link: saves the config with its computed results (utils/analysis_store.py)
+    share_name = st.text_input("Analysis name", value=f"{human_indicator(config['indicator'])} "
+                               f"{config['year_range'][0]}-{config['year_range'][1]}", key="share_name")
+    if st.button("🔗 Create share link", key="create_share"):
+        user = st.session_state.get('user')
+        share_id = share_analysis(config, share_name, email=user['email'] if user else None)
+        st.code(f"/Dashboard?share={share_id}", language=None)
+
 st.markdown("---")
 st.caption("Dashboard | South Asia Inequality Analysis Platform")
 
+lap("Footer & export")
+
 # -----------------
 # Navigation
 # -----------------
@@ -1,17 +1,18 @@
 import streamlit as st
 import pandas as pd
 import sys
-import re
 from pathlib import Path
 from datetime import datetime
 
 # Add utils to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.loaders import load_inequality_data, load_all_indicators
+from utils.search_service import get_search_service
+from utils.search_query import get_query_compiler
 from utils.utils import human_indicator, format_value
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 
 # --------------------------------------------------
 # Page Configuration
@@ -23,6 +24,7 @@ st.set_page_config(
 )
 render_help_button("search")
 apply_all_styles()
+start_page("Smart Search")
 
 # Custom CSS for search enhancement - MATCHING SIDEBAR THEME
 st.markdown("""
@@ -176,117 +178,54 @@ st.markdown("""
 # --------------------------------------------------
 # Load Data
 # --------------------------------------------------
-@st.cache_data
-def load_search_data():
-    """Load all data needed for search"""
-    df_main = load_inequality_data()
-    df_all = load_all_indicators()
-    return df_main, df_all
-
 try:
-    df_main, df_all = load_search_data()
+    # One shared frame + precomputed bookmarks per dataset version
+    search_service = get_search_service()
 except:
     st.error("Failed to load data. Please ensure data files exist.")
     st.stop()
 
-if df_main.empty and df_all.empty:
+df = search_service.df
+if df.empty:
     st.error("No data available for search.")
     st.stop()
 
-# Use whichever is available
-df = df_all if not df_all.empty else df_main
+# Query compiler over the indexed indicator cube (shared per dataset version)
+query_compiler = get_query_compiler()
+
+lap("Load & compile")
 
 # --------------------------------------------------
 # Quick Stats Bar
 # --------------------------------------------------
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    st.metric("Countries", df['country'].nunique())
+    st.metric("Countries", search_service.stats['countries'])
 with col2:
-    st.metric("Indicators", df['indicator'].nunique())
+    st.metric("Indicators", search_service.stats['indicators'])
 with col3:
-    st.metric("Years", f"{int(df['year'].min())}–{int(df['year'].max())}")
+    st.metric("Years", f"{search_service.min_year}–{search_service.max_year}")
 with col4:
-    st.metric("Total Records", f"{len(df):,}")
+    st.metric("Total Records", f"{search_service.stats['records']:,}")
 
 st.divider()
 
-# --------------------------------------------------
-# ENHANCED COMMAND DEFINITIONS
-# --------------------------------------------------
-
-# Navigation commands - expanded
-COMMAND_KEYWORDS = {
-    # Core pages
-    'map': 'pages/3_Map_Analysis.py',
-    'correlation': 'pages/4_Correlations.py',
-    'dashboard': 'pages/1_Dashboard.py',
-    'simulator': 'pages/5_Income_Simulator.py',
-    'temporal': 'pages/8_Temporal_Comparison.py',
-    'quality': 'pages/6_Data_Quality.py',
-    'insights': 'pages/7_Indicator_Insights.py',
-    'help': 'pages/9_Help.py',
-    'home': 'home.py',
-    
-    # Aliases
-    'income': 'pages/5_Income_Simulator.py',
-    'compare': 'pages/8_Temporal_Comparison.py',
-    'data': 'pages/6_Data_Quality.py',
-    'sunburst': 'pages/7_Indicator_Insights.py',
-    'overview': 'pages/1_Dashboard.py',
-    'summary': 'pages/1_Dashboard.py',
-}
-
-# Time range shortcuts
-def get_time_range(keyword, max_year, min_year):
-    """Get time range based on keyword"""
-    time_ranges = {
-        'recent': (max_year - 4, max_year),
-        'last 5 years': (max_year - 4, max_year),
-        'last decade': (max_year - 9, max_year),
-        'last 10 years': (max_year - 9, max_year),
-        '2020s': (2020, max_year),
-        '2010s': (2010, 2019),
-        '2000s': (2000, 2009),
-        'all time': (min_year, max_year),
-        'full range': (min_year, max_year),
-        'complete': (min_year, max_year),
-    }
-    
-    for key, range_tuple in time_ranges.items():
-        if key in keyword.lower():
-            return range_tuple
-    
-    return None
-
-# Category keywords
-CATEGORY_KEYWORDS = {
-    'poverty': 'Poverty',
-    'inequality': 'Income Inequality',
-    'income': 'Income & Growth',
-    'education': 'Education',
-    'employment': 'Employment',
-    'infrastructure': 'Infrastructure',
-    'health': 'Health',
-    'economic': 'Income & Growth',
-    'labor': 'Employment',
-}
-
 # --------------------------------------------------
 # HELPER FUNCTIONS FOR NAVIGATION
 # --------------------------------------------------
 
 def navigate_with_filter(page, config):
     """Navigate to a page with pre-configured filters"""
-    st.session_state.analysis_config = config
+    # Copy lists so pages never mutate the shared search service data
+    st.session_state.analysis_config = {k: list(v) if isinstance(v, list) else v for k, v in config.items()}
     st.switch_page(page)
 
 def apply_country_filter(country):
     """Apply country filter and navigate to dashboard"""
-    countries = df['country'].unique().tolist()
-    indicators = df['indicator'].unique().tolist()
-    min_year = int(df['year'].min())
-    max_year = int(df['year'].max())
+    countries = search_service.countries
+    indicators = search_service.indicators
+    min_year = search_service.min_year
+    max_year = search_service.max_year
     default_indicator = "gini_index" if "gini_index" in indicators else indicators[0]
     
     config = {
@@ -299,9 +238,9 @@ def apply_country_filter(country):
 
 def apply_indicator_filter(indicator):
     """Apply indicator filter and navigate to dashboard"""
-    countries = df['country'].unique().tolist()
-    min_year = int(df['year'].min())
-    max_year = int(df['year'].max())
+    countries = search_service.countries
+    min_year = search_service.min_year
+    max_year = search_service.max_year
     
     config = {
         'countries': countries,
@@ -312,206 +251,8 @@ def apply_indicator_filter(indicator):
     navigate_with_filter('pages/1_Dashboard.py', config)
 
 def get_gini_indicator():
-    """Detect GINI indicator name from actual data"""
-    indicators = df['indicator'].unique().tolist()
-    
-    # Try exact match first
-    if 'gini_index' in indicators:
-        return 'gini_index'
-    
-    # Try variations
-    for ind in indicators:
-        if 'gini' in ind.lower():
-            return ind
-    
-    # Fallback to first indicator
-    return indicators[0] if indicators else 'gini_index'
-
-# --------------------------------------------------
-# ENHANCED SEARCH PARSER
-# --------------------------------------------------
-
-def detect_comparison_command(query, df):
-    """Detect country comparison requests like 'compare India Pakistan'"""
-    query_lower = query.lower()
-    countries = df['country'].unique().tolist()
-    
-    # Check for comparison keywords
-    if any(word in query_lower for word in ['compare', 'vs', 'versus',]):
-        # Extract country names
-        found_countries = []
-        for country in countries:
-            if country.lower() in query_lower:
-                found_countries.append(country)
-        
-        if len(found_countries) >= 2:
-            return {
-                'type': 'comparison',
-                'countries': found_countries,
-                'action': 'navigate',
-                'page': 'pages/1_Dashboard.py'
-            }
-    
-    return None
-
-def detect_time_range_command(query, max_year, min_year):
-    """Detect time range commands like 'recent', 'last decade', '2015-2023'"""
-    query_lower = query.lower()
-    
-    # Check predefined keywords
-    time_range = get_time_range(query_lower, max_year, min_year)
-    if time_range:
-        return time_range
-    
-    # Detect year ranges like "2015-2023" or "2015 to 2023"
-    year_pattern = r'(\d{4})\s*[-–to]+\s*(\d{4})'
-    match = re.search(year_pattern, query)
-    if match:
-        start_year = int(match.group(1))
-        end_year = int(match.group(2))
-        if min_year <= start_year <= max_year and min_year <= end_year <= max_year:
-            return (start_year, end_year)
-    
-    return None
-
-def detect_category_command(query):
-    """Detect category filter commands like 'poverty indicators'"""
-    query_lower = query.lower()
-    
-    for keyword, category in CATEGORY_KEYWORDS.items():
-        if keyword in query_lower:
-            return category
-    
-    return None
-
-def detect_help_command(query):
-    """Detect help requests like 'what is gini' or 'how to export'"""
-    query_lower = query.lower()
-    
-    help_keywords = ['how to', 'what is', 'explain', 'help', 'tutorial']
-    
-    if any(keyword in query_lower for keyword in help_keywords):
-        return {
-            'type': 'help',
-            'query': query,
-            'page': 'pages/9_Help.py'
-        }
-    
-    return None
-
-def detect_export_command(query):
-    """Detect export/download requests"""
-    query_lower = query.lower()
-    
-    export_keywords = ['export', 'download', 'save']
-    
-    if any(keyword in query_lower for keyword in export_keywords):
-        return {
-            'type': 'export',
-            'message': 'Navigate to Dashboard or Map page, then use the download buttons for PNG, SVG, HTML, or JSON export.'
-        }
-    
-    return None
-
-def detect_ranking_command(query):
-    """Detect ranking requests like 'top 5', 'rank by poverty'"""
-    query_lower = query.lower()
-    
-    ranking_keywords = ['top', 'bottom', 'best', 'worst', 'rank', 'highest', 'lowest']
-    
-    if any(keyword in query_lower for keyword in ranking_keywords):
-        return {
-            'type': 'ranking',
-            'query': query,
-            'message': 'Navigate to Dashboard for country rankings and comparisons.'
-        }
-    
-    return None
-
-def parse_smart_search(query, df):
-    """
-    Master search parser - detects intent and extracts entities
-    Returns: dict with 'type' and relevant data
-    """
-    query_lower = query.lower().strip()
-    
-    if not query_lower:
-        return None
-    
-    max_year = int(df['year'].max())
-    min_year = int(df['year'].min())
-    countries = df['country'].unique().tolist()
-    indicators = df['indicator'].unique().tolist()
-    
-    # Priority 1: Help commands
-    help_result = detect_help_command(query_lower)
-    if help_result:
-        return help_result
-    
-    # Priority 2: Navigation commands
-    for keyword, page in COMMAND_KEYWORDS.items():
-        if keyword in query_lower:
-            return {
-                'type': 'navigation',
-                'page': page,
-                'keyword': keyword
-            }
-    
-    # Priority 3: Comparison commands
-    comparison_result = detect_comparison_command(query_lower, df)
-    if comparison_result:
-        return comparison_result
-    
-    # Priority 4: Export commands
-    export_result = detect_export_command(query_lower)
-    if export_result:
-        return export_result
-    
-    # Priority 5: Ranking commands
-    ranking_result = detect_ranking_command(query_lower)
-    if ranking_result:
-        return ranking_result
-    
-    # Priority 6: Time range detection
-    time_range = detect_time_range_command(query_lower, max_year, min_year)
-    
-    # Priority 7: Category detection
-    category = detect_category_command(query_lower)
-    
-    # Priority 8: Country search
-    found_countries = [c for c in countries if c.lower() in query_lower]
-    
-    # Priority 9: Indicator search
-    found_indicators = []
-    for ind in indicators:
-        # Check if query matches indicator name
-        if query_lower in ind.lower():
-            found_indicators.append(ind)
-        # Also check human-readable name
-        try:
-            human_name = human_indicator(ind).lower()
-            if query_lower in human_name:
-                found_indicators.append(ind)
-        except:
-            pass
-    
-    # Remove duplicates
-    found_indicators = list(set(found_indicators))
-    
-    # Priority 10: Year search
-    year_matches = re.findall(r'\b(19|20)\d{2}\b', query)
-    found_years = [int(y) for y in year_matches if min_year <= int(y) <= max_year]
-    
-    # Build comprehensive result
-    return {
-        'type': 'multi_search',
-        'countries': found_countries,
-        'indicators': found_indicators,
-        'years': found_years,
-        'time_range': time_range,
-        'category': category,
-        'query': query
-    }
+    """GINI indicator name detected from actual data (precomputed per dataset version)"""
+    return search_service.gini_indicator
 
 # --------------------------------------------------
 # SECTION 1: Main Search Interface
@@ -531,8 +272,8 @@ if search_query:
         st.session_state.search_history.insert(0, search_query)
         st.session_state.search_history = st.session_state.search_history[:10]
     
-    # Parse search
-    result = parse_smart_search(search_query, df)
+    # Compile the query into a filter plan (cached per normalized query)
+    result, result_table = query_compiler.run(search_query)
     
     if result:
         st.markdown("---")
@@ -555,14 +296,17 @@ if search_query:
                 st.info(f"Will compare **{len(result['countries'])} countries** on Dashboard")
             with col2:
                 if st.button("View Comparison", type="primary", key="comp_btn"):
-                    max_year = int(df['year'].max())
+                    max_year = search_service.max_year
                     config = {
                         'countries': result['countries'],
-                        'indicator': get_gini_indicator(),
+                        'indicator': result['indicator'],
                         'year_range': (max_year - 10, max_year),
                         'color_scale': 'Viridis'
                     }
                     navigate_with_filter(result['page'], config)
+            if result_table is not None and not result_table.empty:
+                st.caption(f"{human_indicator(result['indicator'])}, last 10 years")
+                st.dataframe(result_table.tail(10), use_container_width=True)
         
         elif result['type'] == 'help':
             st.info(f"Help request: {result['query']}")
@@ -588,7 +332,11 @@ if search_query:
             st.info(f"Ranking request: {result['query']}")
             col1, col2 = st.columns([3, 1])
             with col1:
-                st.write("The Dashboard page shows country rankings and performance comparisons.")
+                order = "Lowest" if result['ascending'] else "Highest"
+                st.write(f"**{order} {result['k']}** by {human_indicator(result['indicator'])} (latest available year)")
+                if result_table is not None and not result_table.empty:
+                    st.dataframe(result_table, hide_index=True, use_container_width=True)
+                st.caption("The Dashboard page shows full country rankings and performance comparisons.")
             with col2:
                 if st.button("View Rankings", type="primary", key="rank_btn"):
                     st.switch_page("pages/1_Dashboard.py")
@@ -608,7 +356,7 @@ if search_query:
                         config = {
                             'countries': result['countries'],
                             'indicator': result['indicators'][0] if result['indicators'] else get_gini_indicator(),
-                            'year_range': result['time_range'] or (int(df['year'].max()) - 10, int(df['year'].max())),
+                            'year_range': result['time_range'] or (search_service.max_year - 10, search_service.max_year),
                             'color_scale': 'Viridis'
                         }
                         navigate_with_filter("pages/1_Dashboard.py", config)
@@ -630,9 +378,9 @@ if search_query:
                 with col2:
                     if st.button("Analyze Indicator", type="primary", key="indicator_btn"):
                         config = {
-                            'countries': result['countries'] if result['countries'] else df['country'].unique().tolist(),
+                            'countries': result['countries'] if result['countries'] else search_service.countries,
                             'indicator': result['indicators'][0],
-                            'year_range': result['time_range'] or (int(df['year'].max()) - 10, int(df['year'].max())),
+                            'year_range': result['time_range'] or (search_service.max_year - 10, search_service.max_year),
                             'color_scale': 'Viridis'
                         }
                         navigate_with_filter("pages/1_Dashboard.py", config)
@@ -647,7 +395,7 @@ if search_query:
                     if st.button("View on Map", type="primary", key="year_btn"):
                         selected_year = result['years'][0]
                         config = {
-                            'countries': df['country'].unique().tolist(),
+                            'countries': search_service.countries,
                             'indicator': get_gini_indicator(),
                             'year_range': (selected_year, selected_year),
                             'color_scale': 'Viridis'
@@ -663,7 +411,7 @@ if search_query:
                 with col2:
                     if st.button("Apply Time Filter", type="primary", key="time_btn"):
                         config = {
-                            'countries': result['countries'] if result['countries'] else df['country'].unique().tolist(),
+                            'countries': result['countries'] if result['countries'] else search_service.countries,
                             'indicator': result['indicators'][0] if result['indicators'] else get_gini_indicator(),
                             'year_range': result['time_range'],
                             'color_scale': 'Viridis'
@@ -682,11 +430,17 @@ if search_query:
                         st.info(f"Category filtering: Select '{result['category']}' indicators on Dashboard")
                         st.switch_page("pages/1_Dashboard.py")
             
+            if result_table is not None and not result_table.empty:
+                with st.expander(f"Matching data ({len(result_table):,} records)"):
+                    st.dataframe(result_table.head(500), hide_index=True, use_container_width=True)
+            
             if not results_found:
                 st.warning("No results found. Try refining your search.")
 
 st.divider()
 
+lap("Search")
+
 # --------------------------------------------------
 # SECTION 2: Popular Queries
 # --------------------------------------------------
@@ -706,9 +460,9 @@ with col1:
 with col2:
     st.markdown("**Data Views**")
     if st.button("Recent Data (Last 5 Years)", use_container_width=True, key="pop_recent"):
-        max_year = int(df['year'].max())
+        max_year = search_service.max_year
         config = {
-            'countries': df['country'].unique().tolist(),
+            'countries': search_service.countries,
             'indicator': get_gini_indicator(),
             'year_range': (max_year - 4, max_year),
             'color_scale': 'Viridis'
@@ -717,9 +471,9 @@ with col2:
     
     if st.button("Complete Timeline (2000-2024)", use_container_width=True, key="pop_full"):
         config = {
-            'countries': df['country'].unique().tolist(),
+            'countries': search_service.countries,
             'indicator': get_gini_indicator(),
-            'year_range': (int(df['year'].min()), int(df['year'].max())),
+            'year_range': (search_service.min_year, search_service.max_year),
             'color_scale': 'Viridis'
         }
         navigate_with_filter("pages/1_Dashboard.py", config)
@@ -740,120 +494,12 @@ st.divider()
 # --------------------------------------------------
 st.subheader("Bookmarked Views")
 
-# Helper functions for safe data access
-def get_high_inequality_countries(threshold=40):
-    """Get countries with average GINI > threshold, with fallback"""
-    try:
-        gini_indicator = get_gini_indicator()
-        gini_data = df[df['indicator'] == gini_indicator]
-        
-        if gini_data.empty:
-            return df['country'].unique().tolist()
-        
-        avg_gini = gini_data.groupby('country')['value'].mean()
-        high_countries = avg_gini[avg_gini > threshold].index.tolist()
-        
-        if not high_countries:
-            high_countries = avg_gini[avg_gini > 35].index.tolist()
-            if not high_countries:
-                return df['country'].unique().tolist()
-        
-        return high_countries
-    except Exception as e:
-        return df['country'].unique().tolist()
-
-def get_low_inequality_countries(threshold=30):
-    """Get countries with average GINI < threshold, with fallback"""
-    try:
-        gini_indicator = get_gini_indicator()
-        gini_data = df[df['indicator'] == gini_indicator]
-        
-        if gini_data.empty:
-            return df['country'].unique().tolist()
-        
-        avg_gini = gini_data.groupby('country')['value'].mean()
-        low_countries = avg_gini[avg_gini < threshold].index.tolist()
-        
-        if not low_countries:
-            low_countries = avg_gini[avg_gini < 35].index.tolist()
-            if not low_countries:
-                return df['country'].unique().tolist()
-        
-        return low_countries
-    except Exception as e:
-        return df['country'].unique().tolist()
-
-detected_gini_indicator = get_gini_indicator()
-max_year = int(df['year'].max())
-min_year = int(df['year'].min())
-
-# Enhanced bookmarks
-bookmarks = {
-    "All Countries Overview": {
-        "description": "Dashboard view with all countries, GINI index, last 10 years",
-        "countries": df['country'].unique().tolist(),
-        "indicator": detected_gini_indicator,
-        "year_range": (max(min_year, max_year - 9), max_year),
-        "page": "pages/1_Dashboard.py"
-    },
-    "High Inequality Focus": {
-        "description": "Countries with GINI > 40 (severe inequality)",
-        "countries": get_high_inequality_countries(40),
-        "indicator": detected_gini_indicator,
-        "year_range": (max(min_year, max_year - 9), max_year),
-        "page": "pages/1_Dashboard.py"
-    },
-    "Low Inequality Focus": {
-        "description": "Countries with GINI < 30 (more equitable distribution)",
-        "countries": get_low_inequality_countries(30),
-        "indicator": detected_gini_indicator,
-        "year_range": (max(min_year, max_year - 9), max_year),
-        "page": "pages/1_Dashboard.py"
-    },
-    "Recent Analysis (2020-2024)": {
-        "description": "Focus on most recent 5 years of data",
-        "countries": df['country'].unique().tolist(),
-        "indicator": detected_gini_indicator,
-        "year_range": (max(2020, min_year), max_year),
-        "page": "pages/1_Dashboard.py"
-    },
-    "Last Decade (2015-2024)": {
-        "description": "Ten-year analysis of inequality trends",
-        "countries": df['country'].unique().tolist(),
-        "indicator": detected_gini_indicator,
-        "year_range": (max(2015, min_year), max_year),
-        "page": "pages/1_Dashboard.py"
-    },
-    "Complete Timeline (2000-2024)": {
-        "description": "Full 24-year historical analysis",
-        "countries": df['country'].unique().tolist(),
-        "indicator": detected_gini_indicator,
-        "year_range": (min_year, max_year),
-        "page": "pages/1_Dashboard.py"
-    },
-    "Geographic Visualization": {
-        "description": "Latest year choropleth map view",
-        "countries": df['country'].unique().tolist(),
-        "indicator": detected_gini_indicator,
-        "year_range": (max_year, max_year),
-        "page": "pages/3_Map_Analysis.py"
-    },
-    "Correlation Analysis": {
-        "description": "Explore relationships between inequality and drivers",
-        "page": "pages/4_Correlations.py"
-    },
-    "Indicator Insights (Sunburst)": {
-        "description": "Multi-dimensional indicator dominance patterns",
-        "countries": df['country'].unique().tolist(),
-        "page": "pages/7_Indicator_Insights.py"
-    },
-    "Temporal Comparison Tool": {
-        "description": "Compare different time periods side-by-side",
-        "countries": df['country'].unique().tolist(),
-        "indicator": detected_gini_indicator,
-        "page": "pages/8_Temporal_Comparison.py"
-    }
-}
+detected_gini_indicator = search_service.gini_indicator
+max_year = search_service.max_year
+min_year = search_service.min_year
+
+# Bookmarks are precomputed per dataset version
+bookmarks = search_service.bookmarks
 
 col1, col2 = st.columns([3, 1])
 
@@ -906,6 +552,8 @@ with col_action:
 
 st.divider()
 
+lap("Popular queries & bookmarks")
+
 # --------------------------------------------------
 # SECTION 4: Search History
 # --------------------------------------------------
@@ -1000,6 +648,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+lap("History & help")
+
 # -----------------
 # Navigation
 # -----------------
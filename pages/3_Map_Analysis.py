@@ -1,6 +1,7 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import json
@@ -12,9 +13,14 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.loaders import load_inequality_data, load_geojson
+from utils.forecasting import series_forecast, add_projection_traces, projection_caption
+from utils.imputation import filled_series
+from utils.rankings import rank_table, ranking_column_config
+from utils.state import ANALYSIS_KEYS, config_hash, page_artifact
 from utils.utils import human_indicator
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 
 # --------------------------------------------------
 # Page config
@@ -27,6 +33,7 @@ st.set_page_config(
 )
 render_help_button("map")
 apply_all_styles()
+start_page("Map Analysis")
 
 # Load custom CSS
 try:
@@ -100,41 +107,6 @@ country_flags = {
 
 indicator_to_use = str(config['indicator']).strip().lower()
 
-filtered_df = df[
-    (df['country'].isin(config['countries'])) &
-    (df['year'] >= config['year_range'][0]) &
-    (df['year'] <= config['year_range'][1]) &
-    (df['indicator'].str.strip().str.lower() == indicator_to_use)
-].copy()
-
-# Ensure 'year' is integer for correct chronological animation
-filtered_df['year'] = filtered_df['year'].astype(int)
-
-# Sort by country and year for consistent ranking and animation
-filtered_df = filtered_df.sort_values(['country', 'year'])
-
-if filtered_df.empty:
-    st.warning("⚠️ No data available for selected filters")
-    st.stop()
-
-# --------------------------------------------------
-# Derived metrics
-# --------------------------------------------------
-filtered_df['regional_avg'] = filtered_df.groupby('year')['value'].transform('mean')
-#filtered_df['rank'] = filtered_df.groupby('year')['value'].rank(ascending=False, method='min').astype(int)
-#filtered_df['rank'] = filtered_df.groupby('year')['value'].rank(ascending=True, method='min').astype(int)
-ascending = config.get('lower_is_better', True)
-filtered_df['rank'] = filtered_df.groupby('year')['value'] \
-    .rank(ascending=ascending, method='min').astype(int)
-
-filtered_df = filtered_df.sort_values(['country','year'])
-#filtered_df['change_from_prev'] = filtered_df.groupby('country')['value'].diff()
-filtered_df['year_diff'] = filtered_df.groupby('country')['year'].diff()
-filtered_df['change_from_prev'] = filtered_df['value'].diff().where(
-    filtered_df['year_diff'] == 1
-)
-
-
 # Decide if higher values are worse
 ascending = config.get('lower_is_better', True)
 
@@ -156,11 +128,57 @@ def get_trend_arrow(change, threshold=0.5, higher_is_better=None):
     else:
         return "➡️"
 
-# Apply to DataFrame
-filtered_df['trend_arrow'] = filtered_df['change_from_prev'].apply(
-    lambda x: get_trend_arrow(x, threshold=0.5, higher_is_better=not ascending)
-)
 
+# --------------------------------------------------
+# Derived metrics
+# --------------------------------------------------
+def build_map_frame():
+    """Config rows with regional average, rank, change from previous year, trend and metadata"""
+    filtered = df[
+        (df['country'].isin(config['countries'])) &
+        (df['year'] >= config['year_range'][0]) &
+        (df['year'] <= config['year_range'][1]) &
+        (df['indicator'].str.strip().str.lower() == indicator_to_use)
+    ].copy()
+    if filtered.empty:
+        return filtered
+
+    # Ensure 'year' is integer for correct chronological animation
+    filtered['year'] = filtered['year'].astype(int)
+
+    filtered['regional_avg'] = filtered.groupby('year')['value'].transform('mean')
+    filtered['rank'] = filtered.groupby('year')['value'] \
+        .rank(ascending=ascending, method='min').astype(int)
+
+    # Sort by country and year for consistent ranking and animation
+    filtered = filtered.sort_values(['country', 'year'])
+    # Change from the previous year; an unobserved previous year is read from the
+    # shared filled cube (utils/imputation.py) instead of leaving the change blank
+    previous = filled_series(filtered['indicator'].iloc[0], config['countries'])[['country', 'year', 'value']]
+    previous = previous.assign(year=previous['year'] + 1).rename(columns={'value': 'prev_value'})
+    filtered = filtered.merge(previous, on=['country', 'year'], how='left')
+    filtered['change_from_prev'] = filtered['value'] - filtered['prev_value']
+
+    filtered['trend_arrow'] = filtered['change_from_prev'].apply(
+        lambda x: get_trend_arrow(x, threshold=0.5, higher_is_better=not ascending)
+    )
+
+    # Add metadata to hover
+    for field in ('population', 'gdp', 'income_group'):
+        filtered[field] = filtered['country'].map(
+            {country: meta[field] for country, meta in country_metadata.items()})
+    return filtered
+
+
+# Memoized against the config: reruns from other widgets reuse the frame
+filtered_df = page_artifact('map', 'frame', build_map_frame,
+                            config_hash(config, ANALYSIS_KEYS + ('lower_is_better',)))
+
+if filtered_df.empty:
+    st.warning("⚠️ No data available for selected filters")
+    st.stop()
+
+lap("Load")
 
 # Helper function for heat intensity
 def get_heat_intensity(value, min_val, max_val):
@@ -224,16 +242,6 @@ def get_trend_with_percentage(change):
 
 #     return badges
 
-
-
-# Add metadata to hover
-for country in filtered_df['country'].unique():
-    if country in country_metadata:
-        meta = country_metadata[country]
-        filtered_df.loc[filtered_df['country'] == country, 'population'] = meta['population']
-        filtered_df.loc[filtered_df['country'] == country, 'gdp'] = meta['gdp']
-        filtered_df.loc[filtered_df['country'] == country, 'income_group'] = meta['income_group']
-
 # --------------------------------------------------
 # Insights function
 # --------------------------------------------------
@@ -258,6 +266,8 @@ def calculate_year_insights(df, year):
             insights['most_declined'] = year_df.loc[year_df['yearly_change'].idxmax()]
     return insights
 
+lap("Derived metrics")
+
 # --------------------------------------------------
 # Choropleth map
 # --------------------------------------------------
@@ -607,6 +617,8 @@ for row in rows:
                     unsafe_allow_html=True
                 )
 
+lap("Choropleth map")
+
 # --------------------------------------------------
 # Year slider for insights
 # --------------------------------------------------
@@ -780,6 +792,10 @@ if selected_country_spotlight != '-- Select a country --' and not year_data.empt
                 name='Regional Average',
                 line=dict(color='#95a5a6', width=2, dash='dash')
             ))
+            # Model projection (precomputed by scripts/build_forecasts.py)
+            spotlight_projection = series_forecast(config['indicator'], [selected_country_spotlight])
+            add_projection_traces(sparkline_fig, spotlight_projection, {selected_country_spotlight: '#667eea'},
+                                  observed=country_history)
             sparkline_fig.update_layout(
                 height=300,
                 margin=dict(l=0, r=0, t=30, b=0),
@@ -790,6 +806,8 @@ if selected_country_spotlight != '-- Select a country --' and not year_data.empt
                 yaxis=dict(showgrid=True, gridcolor='rgba(0,0,0,0.1)')
             )
             st.plotly_chart(sparkline_fig, width="stretch", config={'displayModeBar': False}, key="country_sparkline_chart")
+            if not spotlight_projection.empty:
+                st.caption(projection_caption(spotlight_projection))
 
         # Quick comparison
         st.markdown("**Quick Comparison:**")
@@ -915,28 +933,26 @@ if show_rankings:
                 'trend_arrow': 'first'
             })
 
-            # Recalculate rank
-            year_df['rank'] = year_df['value'].rank(
-                ascending=lower_is_better,
-                method='min'
-            ).astype(int)
-
-            # Sort by rank
-            year_df = year_df.sort_values('rank')
+            # Rank, standing bar and status in one pass
+            year_df = rank_table(year_df, higher_is_better=not lower_is_better, method='min')
+            value_label = human_indicator(config['indicator'])
 
             # Prepare dataframe for display
-            rankings_df = year_df[['rank','country','value','regional_avg','change_from_prev','trend_arrow']].copy()
+            rankings_df = year_df[['rank','country','value','bar_pct','regional_avg','change_from_prev','trend_arrow']].copy()
             rankings_df.columns = [
-                'Rank','Country',human_indicator(config['indicator']),'Regional Average','Change from Prev Year','Trend'
+                'Rank','Country',value_label,'Standing','Regional Average','Change from Prev Year','Trend'
             ]
 
             # Difference and status
-            rankings_df['Difference from Avg'] = (rankings_df[human_indicator(config['indicator'])] - rankings_df['Regional Average']).round(2)
-            rankings_df['Status'] = rankings_df['Difference from Avg'].apply(
-                lambda x: 'Above avg' if x>5 else 'Below avg' if x<-5 else 'Near avg'
+            rankings_df['Difference from Avg'] = (rankings_df[value_label] - rankings_df['Regional Average']).round(2)
+            rankings_df['Status'] = np.select(
+                [rankings_df['Difference from Avg'] > 5, rankings_df['Difference from Avg'] < -5],
+                ['Above avg', 'Below avg'], 'Near avg'
             )
 
-            st.dataframe(rankings_df, use_container_width=True, hide_index=True)
+            st.dataframe(rankings_df, use_container_width=True, hide_index=True,
+                         column_config=ranking_column_config('Standing', value_label,
+                                                             higher_is_better=not lower_is_better))
 
 
 
@@ -949,6 +965,8 @@ st.caption("Map Analysis | South Asia Inequality Analysis Platform")
 st.caption("Data sources: World Bank, UNDP | Map boundaries: Natural Earth")
 st.caption("Enhanced with dynamic insights, country highlighting, projections, and advanced filtering")
 
+lap("Insights & spotlight")
+
 # -----------------
 # Navigation
 # -----------------
@@ -14,6 +14,7 @@ from utils.loaders import load_all_indicators
 from utils.utils import human_indicator
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 from utils.indicator_metadata import get_available_indicators_by_category, INDICATOR_CATEGORIES
 
 # ----------------------------
@@ -26,6 +27,7 @@ st.set_page_config(
 )
 render_help_button("correlations")
 apply_all_styles()
+start_page("Correlations")
 
 # ----------------------------
 # Load custom CSS
@@ -324,6 +326,8 @@ with st.sidebar:
     else:
         st.info("Using all available countries")
 
+lap("Load & classify")
+
 # ----------------------------
 # Pivot data
 # ----------------------------
@@ -378,6 +382,8 @@ def strength_label(rv):
 strength = strength_label(r)
 direction = "Positive" if r > 0 else "Negative"
 
+lap("Pivot & correlation")
+
 # ----------------------------
 # Layout
 # ----------------------------
@@ -654,6 +660,8 @@ with col4:
 st.caption(" Correlation Explorer | South Asia Inequality Analysis Platform")
 
 
+lap("Charts & summary")
+
 # -----------------
 # Navigation
 # -----------------
@@ -7,11 +7,21 @@ from datetime import datetime
 import textwrap
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 from utils.data_loader import SouthAsiaDataLoader
 from utils.loaders import load_inequality_data
+from utils.imputation import filled_value
 from utils.api_loader import get_api_loader
 from utils.un_data_loader import get_un_loader
 from utils.imf_api_loader import get_imf_loader
+from utils.income_distribution import (
+    LognormalDistribution, get_default_distribution, get_wid_distributions,
+    distribution_from_key, DEFAULT_MU
+)
+from utils.simulator_engine import (
+    COUNTRY_DATA, COMPONENTS as SCORE_COMPONENTS, score_profiles,
+    sensitivity_surface, tornado_sensitivity
+)
 
 st.set_page_config(
     page_title="Income Simulator",
@@ -24,6 +34,7 @@ un_loader = get_un_loader()
 imf_loader = get_imf_loader()
 render_help_button("simulator")
 apply_all_styles()
+start_page("Income Simulator")
 # Load custom CSS
 try:
     with open('assets/dashboard.css') as f:
@@ -177,25 +188,16 @@ Personalized Economic Modeling & Comparative Analytics
 <div style="width: 80px; height: 4px; background: linear-gradient(90deg, #8b5cf6, #ec4899); margin: 20px auto; border-radius: 2px;"></div>
 </div>""", unsafe_allow_html=True)
 
-# Country data
-COUNTRY_DATA = {
-    'Bangladesh': {'base': 25, 'education_weight': 0.32, 'urban_bonus': 8},
-    'Bhutan': {'base': 23, 'education_weight': 0.30, 'urban_bonus': 7},
-    'India': {'base': 22, 'education_weight': 0.35, 'urban_bonus': 12},
-    'Maldives': {'base': 28, 'education_weight': 0.33, 'urban_bonus': 14},
-    'Nepal': {'base': 22, 'education_weight': 0.32, 'urban_bonus': 7},
-    'Pakistan': {'base': 20, 'education_weight': 0.30, 'urban_bonus': 10},
-    'Sri Lanka': {'base': 25, 'education_weight': 0.32, 'urban_bonus': 11},
-    'Afghanistan': {'base': 18, 'education_weight': 0.28, 'urban_bonus': 8}
-}
-
 @st.cache_data(ttl=3600)
 def get_historical_data_efficiently():
     """Helper to load main data once for simulator use"""
     return load_inequality_data()
 
 def calculate_percentile(country, edu, digital, gender, urban, occupation="Services", credit=False, age="Adult", api_data=None, un_data=None, poverty_data=None, live_context=None):
-    """Calculate economic percentile with detailed live component breakdown"""
+    """
+    Calculate economic percentile with detailed live component breakdown.
+    Single-profile wrapper around utils.simulator_engine.score_profiles.
+    """
     
     # Backward compatibility for old calls signature if needed, or just unify
     if live_context is None:
@@ -211,304 +213,33 @@ def calculate_percentile(country, edu, digital, gender, urban, occupation="Servi
         if poverty_data is not None and not poverty_data.empty:
             live_context['poverty_rate'] = poverty_data['value'].iloc[0]
             
-    data = COUNTRY_DATA.get(country, COUNTRY_DATA['India'])
-    
-    # 1. BASE VALUE (GDP-Driven)
-    if 'gdp' in live_context:
-        # Base value calibrated to GDP per capita
-        # Log scale: $2000 -> Base 22, $400 -> Base 16
-        base = 15 + (np.log10(max(live_context['gdp'], 100)/100) * 5)
-    else:
-        base = data['base']
-    
-    # Re-normalize base if migration is high (brain drain or influx)
-    if 'net_migration' in live_context and live_context['net_migration'] < -500000:
-        base -= 1 # Penalty for massive brain drain
-        
-    weight = data['education_weight']
-    
-    # 2. OCCUPATION & EMPLOYMENT QUALITY
-    sector_scores = {"Agriculture": 0, "Industry": 8, "Services": 12, "Public Sector": 15, "Unemployed": -5}
-    
-    # Unemployment penalty dynamism
-    if occupation == "Unemployed":
-        # Base penalty
-        occ_val = -5
-        
-        # 1. Adjust for Youth Unemployment if Age is Youth
-        if age == "Youth (<25)" and 'unemp_youth' in live_context:
-            u_youth = live_context['unemp_youth']
-            # If youth unemployment is rampant (30%), the stigma/penalty is lower (structural)
-            if u_youth > 20: occ_val += 2 
-            
-        # 2. Adjust for Education Level (Paradox of Educated Unemployment)
-        # In South Asia, often higher education = higher unemployment rate
-        if edu > 12:
-            if 'unemp_advanced' in live_context:
-                u_adv = live_context['unemp_advanced']
-                if u_adv > 15: occ_val += 1 # "Waiting for white collar job" phenomenon
-        elif edu >= 6:
-            if 'unemp_intermediate' in live_context:
-                # Same logic
-                pass
-                
-        # 3. National Rate Context
-        if 'unemployment_rate' in live_context:
-            u_rate = live_context['unemployment_rate']
-            occ_val += (u_rate / 10) # Higher national rate softens personal penalty
-            
-    else:
-        # EMPLOYED SECTOR LOGIC
-        if 'sector_shares' in live_context:
-            shares = live_context['sector_shares']
-            current_share = shares.get(occupation, 30)
-            scarcity_factor = max(0.8, 1.5 - (current_share / 100))
-            
-            # Vulnerability Penalty
-            vuln_penalty = 0
-            if 'vulnerable_emp' in live_context:
-                vuln_penalty = (live_context['vulnerable_emp'] / 100) * 3
-            
-            # Wage Worker Bonus
-            wage_bonus = 0
-            if 'wage_worker' in live_context:
-                 wage_bonus = (live_context['wage_worker'] / 100) * 2
-            
-            # Agriculture Value Added (Ag Productivity)
-            ag_bonus = 0
-            if occupation == "Agriculture" and 'ag_value_added_gdp' in live_context:
-                ag_val = live_context['ag_value_added_gdp']
-                # If Ag value added is high (e.g. 20%) but employment is low -> High productivity
-                # If Ag value added is low (15%) but employment high (40%) -> Low productivity
-                # We already use share for scarcity. Let's use this for "Sector Health".
-                if ag_val > 15: ag_bonus = 1
-            
-            base_score = sector_scores.get(occupation, 10)
-            occ_val = (base_score * scarcity_factor) - vuln_penalty + wage_bonus + ag_bonus
-            
-            # Employers/Contributing Family adjustment
-            # If "Self-employed" was an option (mapped to Services/Ind usually), we'd use 'employers_share'
-            # Here we assume Services/Industry might include entrepreneurs.
-            if occupation in ["Services", "Industry"] and 'employers_share' in live_context:
-                emp_share = live_context['employers_share']
-                # If high entrepreneurial density -> higher potential ceiling
-                occ_val += (emp_share / 5)
-                
-        else:
-            occ_val = sector_scores.get(occupation, 10)
-
-    # 3. FINANCIAL ACCESS (Multi-dimensional Banking Infrastructure)
-    if credit:
-        credit_val = 6
-        
-        # A. FINANCIAL DEPTH - How developed is the credit market?
-        if 'credit_depth' in live_context:
-             # Domestic credit to private sector (% of GDP). Range: 10-100%+
-             credit_val += min(3, live_context['credit_depth'] / 30) # Cap at +3 for strong markets
-             
-        if 'financial_sector_credit' in live_context:
-            # Total domestic credit by financial sector (broader than private)
-            # If this is significantly higher than private credit, implies govt borrowing
-            # Use as a secondary depth indicator
-            fin_cred = live_context['financial_sector_credit']
-            if fin_cred > 50: credit_val += 0.5
-        
-        # B. BANKING PENETRATION - Actual access to banking services
-        if 'borrowers_density' in live_context:
-            # Borrowers from commercial banks per 1,000 adults
-            # High value (200+) = widespread access, Low (20) = elite only
-            borrowers = live_context['borrowers_density']
-            if borrowers > 100:
-                credit_val += 2  # Highly banked population
-            elif borrowers > 50:
-                credit_val += 1  # Moderate access
-            # Low borrowers (<50) gets no bonus - having an account is rare/elite
-                
-        # C. CREDIT INFORMATION INFRASTRUCTURE
-        if 'credit_info_depth' in live_context:
-            # Depth of credit information index (0-8)
-            # Strong credit bureaus enable better lending
-            info_depth = live_context['credit_info_depth']
-            credit_val += (info_depth / 8) * 1.5  # Up to +1.5 for perfect (8)
-            
-        if 'private_credit_bureau' in live_context:
-            # Private credit bureau coverage (% of adults)
-            # High coverage = mature credit ecosystem
-            bureau_cov = live_context['private_credit_bureau']
-            if bureau_cov > 30: credit_val += 1
-            
-        if 'public_credit_registry' in live_context:
-            # Public credit registry coverage (% of adults)
-            registry = live_context['public_credit_registry']
-            if registry > 10: credit_val += 0.5
-        
-        # D. FINANCIAL SECTOR QUALITY (Policy & Regulation)
-        if 'financial_sector_rating' in live_context:
-            # CPIA financial sector rating (1=low to 6=high)
-            # Strong institutions = better protection, lower interest rates
-            rating = live_context['financial_sector_rating']
-            credit_val += ((rating - 2) / 4) * 2  # Scale 2-6 to 0-2 bonus
-        
-        # E. PHYSICAL INFRASTRUCTURE (ATMs)
-        if 'atm_density' in live_context:
-            density = live_context['atm_density']  # per 100,000 adults
-            # Scarcity bonus: Low ATM density makes physical access elite
-            if density < 20:  # Very low
-                credit_val += 2  # Having access is rare
-            elif density < 50:
-                credit_val += 1
-            # High density (100+) = no bonus, access is common
-            
-        # F. ECONOMIC INTEGRATION (Remittances & Business Ecosystem)
-        if 'remittances_gdp' in live_context and live_context['remittances_gdp'] > 5:
-            # High remittances = banking is critical for receiving funds
-            credit_val += min(2, live_context['remittances_gdp'] / 10)
-            
-        if 'business_density' in live_context:
-            # High business density makes credit more useful for entrepreneurship
-            bd = live_context['business_density']  # per 1000 people
-            if bd > 5: credit_val += 1.5
-            elif bd > 2: credit_val += 0.5
-            
-    else:
-        credit_val = 0
-    
-    age_map = {"Youth (<25)": -4, "Adult (25-60)": 6, "Senior (>60)": 2}
-    age_val = age_map.get(age, 4)
-    
-    # 4. EDUCATION (Quality & Scarcity Adjusted)
-    # Base contribution from years
-    edu_contrib = (edu/20)*40*weight
-    
-    # DYNAMIC ENROLLMENT & GPI LOGIC
-    # Primary (Years 1-5)
-    if 'primary_enrollment' in live_context:
-        # If gross enrollment > 100%, basic education is universal -> lower scarcity bonus
-        p_enrol = live_context['primary_enrollment']
-        if p_enrol < 90: edu_contrib += 2 # Scarcity bonus
-        
-    if 'primary_gender_enrollment' in live_context:
-        # If specific gender enrollment is low, educated person of that gender gets higher elite score
-        pg_enrol = live_context['primary_gender_enrollment']
-        if pg_enrol < 85: edu_contrib += 1.5
-    
-    # Secondary (Years 6-12)
-    if edu >= 6:
-        if 'secondary_enrollment' in live_context:
-            s_enrol = live_context['secondary_enrollment']
-            # Scarcity Multiplier: If only 40% enrolled, secondary ed is worth 1.2x more
-            s_mult = max(1.0, 1.5 - (s_enrol/100))
-            edu_contrib *= s_mult
-            
-        if 'secondary_gender_enrollment' in live_context:
-            sg_enrol = live_context['secondary_gender_enrollment']
-            # If my gender only has 30% enrollment, my degree is very rare
-            if sg_enrol < 50: edu_contrib += 3
-            
-        if 'secondary_gpi' in live_context and gender == 1: # Female
-            gpi = live_context['secondary_gpi']
-            if gpi < 0.9: edu_contrib += 2 # Overcoming systemic barrier bonus
-    
-    # Tertiary (Years 13+)
-    if edu > 12: 
-        if 'tertiary_enrollment' in live_context:
-             t_enrol = live_context['tertiary_enrollment']
-             # Tertiary Scarcity: Low enrollment (15%) -> High Premium (2.5x). High (80%) -> Low Premium.
-             t_mult = max(1.0, 3.0 - (t_enrol/40))
-             edu_contrib *= t_mult
-             
-        if 'tertiary_gender_enrollment' in live_context:
-            tg_enrol = live_context['tertiary_gender_enrollment']
-            if tg_enrol < 20: edu_contrib += 5 # Status Symbol Bonus
-            
-        if 'tertiary_gpi' in live_context and gender == 1: # Female
-            gpi = live_context['tertiary_gpi']
-            if gpi < 0.8: edu_contrib += 3 # Breaking the glass ceiling bonus
-             
-    # Adjust for Primary Quality (Completion rate)
-    if 'primary_completion' in live_context:
-         comp = live_context['primary_completion']
-         if comp < 80:
-             edu_contrib += 2 # Scarcity bonus for finishing basic schooling
-             
-    # 5. DIGITAL SKILLS (Mobile + Internet)
-    digital_contrib = (digital/100)*15
-    if 'mobile_subs' in live_context:
-        # If mobile density is high (>100), digital skills are assumed baseline?
-        # Actually maybe if mobile subs are high, intermediate skills are needed to stand out.
-        pass
-
-    # 6. GENDER IMPACT
-    if 'gii' in live_context:
-        gender_penalty = live_context['gii'] * 18
-    else:
-        gender_penalty = 8
-    gender_contrib = gender*(-gender_penalty)
-
-    # 7. LOCATION (Urban Scarcity Driven)
-    if 'urban_pct' in live_context:
-        # Urban Pct 20% -> Bonus 16. Urban Pct 40% -> Bonus 12.
-        u_pct = live_context['urban_pct']
-        urban_bonus = 20 * (1 - (u_pct/100))
-        
-        # If rural, maybe check net migration? If high out-migration, rural is depressed.
-    else:
-        urban_bonus = data['urban_bonus']
-        
-    urban_contrib = urban*urban_bonus
-    
-    raw_percentile = base + edu_contrib + digital_contrib + gender_contrib + urban_contrib + occ_val + credit_val + age_val
-    
-    components = {
-        "Base Value": base,
-        "Education": edu_contrib,
-        "Digital Skills": digital_contrib,
-        "Occupation": occ_val,
-        "Urban Advantage": urban_contrib,
-        "Credit Access": credit_val,
-        "Age Factor": age_val,
-        "Gender Impact": gender_contrib 
+    profile = {
+        'country': [country], 'edu': [edu], 'digital': [digital], 'gender': [gender],
+        'urban': [urban], 'occupation': [occupation], 'credit': [credit], 'age': [age]
     }
+    row = score_profiles(profile, live_context).iloc[0]
+    components = {name: float(row[name]) for name in SCORE_COMPONENTS}
     
     # 8. POVERTY BENCHMARKING
     poverty_bench = None
-    if 'poverty_rate' in live_context:
-        pov_rate = live_context['poverty_rate']
-        dist = raw_percentile - pov_rate
+    if 'poverty_distance' in row.index and pd.notna(row['poverty_distance']):
         poverty_bench = {
-            "rate": pov_rate,
-            "distance": dist,
-            "status": "Below Poverty Line" if dist < 0 else ("Near Poverty Line" if dist < 15 else "Above Poverty Line")
+            "rate": row['poverty_rate'],
+            "distance": row['poverty_distance'],
+            "status": row['poverty_status']
         }
     
-    return max(0, min(100, raw_percentile)), components, poverty_bench
+    return float(row['percentile']), components, poverty_bench
 
 def calculate_historical_percentile(country, year, edu, digital, gender, urban, occupation="Services", credit=False, age="Adult"):
     """
     Data-driven historical percentile calculation.
     Adjusts weights based on real-world indicators for that specific year.
-    Uses south_asia_indicators.csv as the source of truth.
+    Uses the curated dataset, with missing years from the shared filled cube
+    (interpolated between observations, extrapolated up to a few years past them).
     """
-    all_data = get_historical_data_efficiently()
-    country_data = all_data[all_data['country'] == country]
-    
     def get_val(indicator_name, default_val):
-        # Try exact year
-        val_df = country_data[(country_data['indicator'] == indicator_name) & (country_data['year'] == year)]
-        if not val_df.empty:
-            return val_df['value'].values[0]
-        
-        # Try closest year within 5 years
-        proximity_df = country_data[country_data['indicator'] == indicator_name].copy()
-        if proximity_df.empty:
-            return default_val
-        
-        proximity_df['dist'] = abs(proximity_df['year'] - year)
-        closest = proximity_df[proximity_df['dist'] <= 5].sort_values('dist')
-        if not closest.empty:
-            return closest['value'].values[0]
-        
-        return default_val
+        return filled_value(country, indicator_name, year, default_val)
 
     # FETCH DATA
     internet_val = get_val('Individuals using the Internet (% of population)', 0.1 if year < 2005 else 10.0)
@@ -562,27 +293,30 @@ def get_tercile(p):
     if p < 66.66: return "Middle Tercile", "#f59e0b"
     return "Upper Tercile", "#10b981"
 
-def render_percentile_distribution(p, title="Your Relative Standing"):
-    """
-    Renders a distribution plot with a High-Contrast Cyberpunk / Neon theme.
-    """
-    # 1. Simulate Income Distribution (Log-Normal)
-    mean = 10.0
-    sigma = 0.6
-    
-    # Generate distribution
-    x = np.linspace(0, 30, 500)
-    pdf = np.zeros_like(x)
-    mask = x > 0
-    pdf[mask] = (1 / (x[mask] * sigma * np.sqrt(2 * np.pi))) * np.exp(-((np.log(x[mask]) - mean/4) ** 2) / (2 * sigma ** 2))
-    pdf = pdf / pdf.max()
-    
-    # 2. Determine User's Position
-    sample = np.random.lognormal(mean=mean/4, sigma=sigma, size=100000)
-    x_user = np.percentile(sample, p)
-    y_user = np.interp(x_user, x, pdf)
+def _distribution_bounds(dist):
+    """(density grid max, visible x max) for a distribution plot"""
+    if isinstance(dist, LognormalDistribution):
+        # Keep the default framing (grid 0-30, view 0-20) scaled to the distribution's median
+        scale = np.exp(dist.mu - DEFAULT_MU)
+        return 30 * scale, 20 * scale
+    # WID curves are far more skewed; frame them on the bulk of the population
+    view_max = float(dist.quantile(97))
+    return 1.5 * view_max, view_max
+
+def get_country_distribution(country, year=None):
+    """WID-calibrated distribution for a country-year, or None if no shares exist"""
+    try:
+        return get_wid_distributions().get(country, year)
+    except Exception:
+        return None
+
+@st.cache_data(show_spinner=False)
+def _distribution_base_figure(key):
+    """Population curve + layout for a distribution, built once per distribution key"""
+    dist = distribution_from_key(key)
+    grid_max, view_max = _distribution_bounds(dist)
+    x, pdf = dist.pdf_grid(x_max=grid_max)
     
-    # 3. Build Plot
     fig = go.Figure()
     
     # A. The Population Curve (Cyberpunk Area)
@@ -597,6 +331,46 @@ def render_percentile_distribution(p, title="Your Relative Standing"):
         hoverinfo='skip'
     ))
     
+    fig.update_layout(
+        paper_bgcolor='rgba(9, 9, 11, 0.8)', # Dark card background
+        plot_bgcolor='rgba(0,0,0,0)',
+        height=300, # EXACT MATCH to updated left card min-height
+        margin=dict(l=20, r=30, t=50, b=30), # Increased r margin for text
+        xaxis=dict(
+            title=dict(text="RELATIVE INCOME SCALE (POOR → RICH)", font=dict(color='#94a3b8', size=10)),
+            showgrid=True, 
+            gridcolor='rgba(0, 243, 255, 0.1)', # Faint generic grid
+            gridwidth=1,
+            showticklabels=False, 
+            zeroline=False,
+            range=[0, view_max] # Zoomed in to make curve look fuller
+        ),
+        yaxis=dict(
+            showgrid=True, 
+            gridcolor='rgba(0, 243, 255, 0.1)',
+            showticklabels=False, 
+            zeroline=False,
+            range=[0, 1.5] # Increased headroom for the marker (was 1.3)
+        ),
+        showlegend=False
+    )
+    return fig.to_dict()
+
+def render_percentile_distribution(p, title="Your Relative Standing", distribution=None):
+    """
+    Renders a distribution plot with a High-Contrast Cyberpunk / Neon theme.
+    The user's position comes from the closed-form quantile of ``distribution``
+    (WID-calibrated country curve, or the synthetic lognormal by default), so
+    renders are exact and reproducible.
+    """
+    dist = distribution or get_default_distribution()
+    fig = go.Figure(_distribution_base_figure(dist.cache_key))
+    x, pdf = dist.pdf_grid(x_max=_distribution_bounds(dist)[0])
+    
+    # Determine User's Position
+    x_user = float(dist.quantile(p))
+    y_user = np.interp(x_user, x, pdf)
+    
     # B. User's Position Line (Laser Beam)
     fig.add_trace(go.Scatter(
         x=[x_user, x_user],
@@ -619,47 +393,18 @@ def render_percentile_distribution(p, title="Your Relative Standing"):
             line=dict(color='#ffffff', width=1)
         ),
         text=[f"<b>YOU</b><br><span style='font-size:12px; color:#ffffff;'>{p:.1f}th %</span>"],
-        textposition="top right", # Offset to the side of the vertical line
+        # Offset to the side of the vertical line, flipping left near the right edge
+        textposition="top left" if p > 80 else "top right",
         textfont=dict(color='#ff00ff', size=14, family="Courier New, monospace"),
         name='Your Standing'
     ))
-
-    # Styling for "Cyberpunk Card" look
-    # Update the marker trace text position logic
-    if p > 80:
-        fig.data[2].textposition = "top left"
-    elif p < 20:
-        fig.data[2].textposition = "top right"
-    else:
-        fig.data[2].textposition = "top right" # Default to right to avoid the vertical line
     
     fig.update_layout(
         title=dict(
             text=f"<b>{title.upper()}</b>", 
             font=dict(size=14, color='#00f3ff', family="Courier New, monospace"),
             x=0.03, y=0.92
-        ),
-        paper_bgcolor='rgba(9, 9, 11, 0.8)', # Dark card background
-        plot_bgcolor='rgba(0,0,0,0)',
-        height=300, # EXACT MATCH to updated left card min-height
-        margin=dict(l=20, r=30, t=50, b=30), # Increased r margin for text
-        xaxis=dict(
-            title=dict(text="RELATIVE INCOME SCALE (POOR → RICH)", font=dict(color='#94a3b8', size=10)),
-            showgrid=True, 
-            gridcolor='rgba(0, 243, 255, 0.1)', # Faint generic grid
-            gridwidth=1,
-            showticklabels=False, 
-            zeroline=False,
-            range=[0, 20] # Zoomed in to make curve look fuller
-        ),
-        yaxis=dict(
-            showgrid=True, 
-            gridcolor='rgba(0, 243, 255, 0.1)',
-            showticklabels=False, 
-            zeroline=False,
-            range=[0, 1.5] # Increased headroom for the marker (was 1.3)
-        ),
-        showlegend=False
+        )
     )
     
     # Allow marker to render outside plot area if needed
@@ -899,6 +644,8 @@ st.markdown(f"""<div style="text-align: center; margin: 20px 0; padding: 15px; b
 
 st.markdown("---")
 
+lap("Hero & mode selection")
+
 # ============= CONDITIONAL RENDERING BASED ON MODE =============
 
 if st.session_state.simulator_mode == "individual":
@@ -1229,7 +976,14 @@ Rank higher than <b>{sp_p:.1f}%</b> of {sp_country}. Out of 100 people, you surp
 
     # Chart takes full width below
     st.markdown("<br>", unsafe_allow_html=True)
-    st.plotly_chart(render_percentile_distribution(sp_p, "Your Economic Standing"), use_container_width=True)
+    sp_dist = get_country_distribution(sp_country)
+    st.plotly_chart(render_percentile_distribution(sp_p, "Your Economic Standing", sp_dist), use_container_width=True)
+    if sp_dist is not None and sp_dist.has_income:
+        st.caption(
+            f"Curve calibrated to WID income shares for {sp_country} ({sp_dist.year}). "
+            f"Average pre-tax income at the {sp_p:.0f}th percentile: "
+            f"~{float(sp_dist.quantile(sp_p)):,.0f} (local currency units)."
+        )
 
     # ============= STEP 3: INSIGHTS =============
 
@@ -1264,6 +1018,63 @@ Rank higher than <b>{sp_p:.1f}%</b> of {sp_country}. Out of 100 people, you surp
 
     # ============= STEP 4: VISUALIZATIONS =============
 
+    st.markdown('<p class="section-header" style="margin-top: 50px;">What-If Sensitivity</p>', unsafe_allow_html=True)
+    st.markdown('<p style="color: #94a3b8; font-size: 1rem; margin-bottom: 20px;">Every cell below is a full re-simulation of your profile, scored in one batch.</p>', unsafe_allow_html=True)
+
+    sp_profile = {
+        'country': sp_country, 'edu': sp_edu, 'digital': sp_digital, 'gender': g_val,
+        'urban': u_val, 'occupation': sp_occ, 'credit': sp_credit, 'age': sp_age
+    }
+
+    sens_col1, sens_col2 = st.columns(2, gap="large")
+
+    with sens_col1:
+        surface = sensitivity_surface(sp_profile, 'digital', list(range(0, 101, 5)), 'edu', list(range(0, 21)), context_data)
+        fig_surface = px.imshow(
+            surface,
+            origin='lower',
+            aspect='auto',
+            color_continuous_scale='Plasma',
+            zmin=0, zmax=100,
+            labels=dict(x="Digital Proficiency (%)", y="Years of Education", color="Percentile")
+        )
+        fig_surface.add_trace(go.Scatter(
+            x=[sp_digital], y=[sp_edu], mode='markers',
+            marker=dict(color='#ffffff', size=12, symbol='x'),
+            name='You', hovertemplate="You: %{y} yrs, %{x}%<extra></extra>"
+        ))
+        fig_surface.update_layout(
+            title="Education × Digital Skills",
+            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#e2e8f0'), height=420, margin=dict(l=20, r=20, t=50, b=20),
+            showlegend=False
+        )
+        st.plotly_chart(fig_surface, use_container_width=True)
+
+    with sens_col2:
+        tornado = tornado_sensitivity(sp_profile, context_data).iloc[::-1]
+        fig_tornado = go.Figure()
+        fig_tornado.add_trace(go.Bar(
+            y=tornado['factor'], x=tornado['low'] - tornado['base'], base=tornado['base'],
+            orientation='h', marker_color='#ef4444', name='Worst case',
+            customdata=tornado['low'], hovertemplate="%{y}: %{customdata:.1f}th<extra>Worst case</extra>"
+        ))
+        fig_tornado.add_trace(go.Bar(
+            y=tornado['factor'], x=tornado['high'] - tornado['base'], base=tornado['base'],
+            orientation='h', marker_color='#10b981', name='Best case',
+            customdata=tornado['high'], hovertemplate="%{y}: %{customdata:.1f}th<extra>Best case</extra>"
+        ))
+        fig_tornado.add_vline(x=sp_p, line_dash='dash', line_color='#ffffff')
+        fig_tornado.update_layout(
+            title="Which Factors Move You Most",
+            barmode='overlay',
+            xaxis=dict(title="Percentile", range=[0, 100]),
+            paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#e2e8f0'), height=420, margin=dict(l=20, r=20, t=50, b=20),
+            legend=dict(orientation='h', y=-0.2)
+        )
+        st.plotly_chart(fig_tornado, use_container_width=True)
+
 
 
 
@@ -1757,11 +1568,11 @@ else:
     
     with res_col1:
         st.markdown(f'<div style="text-align: center; color: #8b98a5; margin-bottom: 10px;">POSITION IN {year_1}</div>', unsafe_allow_html=True)
-        st.plotly_chart(render_percentile_distribution(p1, f"Standing in {year_1}"), use_container_width=True)
+        st.plotly_chart(render_percentile_distribution(p1, f"Standing in {year_1}", get_country_distribution(h_country, year_1)), use_container_width=True)
         
     with res_col2:
         st.markdown(f'<div style="text-align: center; color: #8b98a5; margin-bottom: 10px;">POSITION IN {year_2}</div>', unsafe_allow_html=True)
-        st.plotly_chart(render_percentile_distribution(p2, f"Standing in {year_2}"), use_container_width=True)
+        st.plotly_chart(render_percentile_distribution(p2, f"Standing in {year_2}", get_country_distribution(h_country, year_2)), use_container_width=True)
 
     # EVOLUTION DASHBOARD
     evol_diff = p2 - p1
@@ -1895,6 +1706,8 @@ you face more competition from others with similar profiles, requiring higher sp
 </p>
 </div>""", unsafe_allow_html=True)
 
+lap("Simulator")
+
 # Footer
 st.divider()
 st.markdown(textwrap.dedent("""
@@ -9,11 +9,12 @@ import numpy as np
 # Add utils to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.loaders import load_quality_audit, load_inequality_data
+from utils.loaders import load_quality_audit, load_inequality_data, compute_quality_audit
 
 
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 from utils.api_loader import get_api_loader
 
 st.set_page_config(
@@ -28,6 +29,7 @@ api_loader = get_api_loader()
 
 render_help_button("quality")
 apply_all_styles()
+start_page("Data Quality")
 # Load custom CSS
 try:
     with open('assets/dashboard.css') as f:
@@ -143,33 +145,9 @@ with st.spinner("Calculating quality metrics from live data..."):
     # 1. Load actual data
     df_actual = load_inequality_data()
     
-    # 2. Calculate dynamic audit
+    # 2. Calculate dynamic audit (shared across workers via the persistent cache)
     if not df_actual.empty:
-        # Define expected year range
-        EXPECTED_YEARS = 25  # 2000-2024
-        
-        # Group by Country + Indicator
-        audit = df_actual.groupby(['country', 'indicator']).agg(
-            record_count=('value', 'count'),
-            min_year=('year', 'min'),
-            max_year=('year', 'max')
-        ).reset_index()
-        
-        # Calculate completeness
-        audit['completeness'] = (audit['record_count'] / EXPECTED_YEARS) * 100
-        audit['completeness'] = audit['completeness'].clip(upper=100)  # Cap at 100%
-        
-        # Merge source information if available
-        if 'source' in df_actual.columns:
-            # Create a source mapping (take first source found for each country-indicator pair)
-            source_map = df_actual.groupby(['country', 'indicator'])['source'].first().reset_index()
-            audit = pd.merge(audit, source_map, on=['country', 'indicator'], how='left')
-            audit['source'] = audit['source'].fillna('World Bank / Derived')
-        else:
-            audit['source'] = 'World Bank / Derived' 
-            
-        audit['issues'] = audit.apply(lambda x: "Low coverage" if x['completeness'] < 50 else "Good", axis=1)
-        
+        audit = compute_quality_audit()
     else:
         # Fallback if load fails
         audit = load_quality_audit()
@@ -235,6 +213,8 @@ COUNTRY_COORDS = {
     'Maldives': {'lat': 3.2028, 'lon': 73.2207, 'name': 'Maldives'}
 }
 
+lap("Load & audit")
+
 # ============= OVERVIEW METRICS =============
 
 st.markdown('<p class="section-title">📊 Quality Overview</p>', unsafe_allow_html=True)
@@ -339,6 +319,8 @@ if use_api_validation:
             validation_df = pd.DataFrame(validation_results)
             st.dataframe(validation_df, use_container_width=True, hide_index=True)
 
+lap("Overview & API validation")
+
 # ============= BUBBLE MAP =============
 
 st.markdown('<p class="section-title">🗺️ Geographic Data Quality Distribution</p>', unsafe_allow_html=True)
@@ -548,6 +530,8 @@ if 'source' in audit.columns and 'country' in audit.columns and 'completeness' i
     
     st.plotly_chart(fig_sankey, use_container_width=True)
 
+lap("Bubble map & Sankey")
+
 # ============= DETAILED ANALYSIS =============
 
 st.markdown('<p class="section-title">📊 Detailed Quality Analysis</p>', unsafe_allow_html=True)
@@ -929,6 +913,8 @@ with tab3:
         else:
             st.success("✅ No critical data gaps found! All datasets have ≥60% completeness.")
 
+lap("Detailed analysis")
+
 # Footer
 st.divider()
 st.markdown("""
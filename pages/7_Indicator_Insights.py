@@ -10,10 +10,11 @@ import io
 # Add utils to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.loaders import load_all_indicators
+from utils.insights_engine import get_insights_tables, best_coverage_year, year_view
 from utils.utils import format_value
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 
 st.set_page_config(
     page_title="Indicator Insights",
@@ -22,6 +23,7 @@ st.set_page_config(
 )
 render_help_button("Indicator Insights")
 apply_all_styles()
+start_page("Indicator Insights")
 
 # -----------------
 # Navigation Helper
@@ -150,46 +152,12 @@ config = st.session_state.get("analysis_config", None)
 home_countries = config.get("countries", []) if config else []
 home_year_range = config.get("year_range", None) if config else None
 
-# Load data
+# Load the precomputed dominance tables (shared per dataset version)
 with st.spinner("Loading data..."):
-    df = load_all_indicators()
+    tables = get_insights_tables()
+year_table = tables["years"]
 
-if df.empty:
-    st.error("No data available")
-    safe_stop()
-
-# Clean basic
-df = df.dropna(subset=["country", "year", "indicator", "value"]).copy()
-df["year"] = pd.to_numeric(df["year"], errors="coerce")
-df["value"] = pd.to_numeric(df["value"], errors="coerce")
-df = df.dropna(subset=["year", "value"])
-
-# ============================================================
-# ✅ SUNBURST FEATURE: LIMIT TO SELECTED INDICATORS ONLY
-# IMPORTANT: your df uses indicator LABELS, so filter by LABELS
-# ============================================================
-SUNBURST_ALLOWED_LABELS = {
-    "Gini index (World Bank estimate)",
-    "GINI index (World Bank estimate)",
-    "Gini index",
-    "Income share held by highest 10%",
-    "Income share held by highest 20%",
-    "Income share held by lowest 20%",
-    "Poverty headcount ratio at national poverty lines (% of population)",
-    "GDP per capita (current US$)",
-    "GDP growth (annual %)",
-    "Unemployment, total (% of total labor force) (modeled ILO estimate)",
-    "Vulnerable employment, total (% of total employment) (modeled ILO estimate)",
-    "Labor force, total",
-    "Individuals using the Internet (% of population)",
-    "Literacy rate, adult total (% of people ages 15 and above)",
-    "Inflation, consumer prices (annual %)",
-    "HDI"  # optional (only if present in your merged df)
-}
-
-df = df[df["indicator"].isin(SUNBURST_ALLOWED_LABELS)].copy()
-
-if df.empty:
+if tables["values"].empty:
     st.error("No data available after applying Sunburst indicator filter.")
     safe_stop()
 
@@ -199,19 +167,17 @@ with st.sidebar:
 
     # year range from home (if exists)
     if home_year_range:
-        df_yr = df[(df["year"] >= home_year_range[0]) & (df["year"] <= home_year_range[1])]
-        if not df_yr.empty:
-            df = df_yr
+        years_in_range = year_table.loc[home_year_range[0]:home_year_range[1]]
+        if not years_in_range.empty:
+            year_table = years_in_range
 
-    available_years = sorted(df["year"].unique(), reverse=True)
+    available_years = sorted(year_table.index, reverse=True)
     if not available_years:
         st.error("No valid years found.")
         safe_stop()
 
     # choose best year (most coverage)
-    year_coverage = df.groupby("year").agg(value_count=("value", "count"), ind_count=("indicator", "nunique"))
-    year_coverage["score"] = year_coverage["value_count"] * year_coverage["ind_count"]
-    best_year = int(year_coverage["score"].idxmax())
+    best_year = best_coverage_year(year_table)
 
     selected_year = st.selectbox(
         "Select Year",
@@ -229,14 +195,14 @@ with st.sidebar:
     st.caption("This chart shows **indicator dominance** after normalization (0–100 per indicator).")
 
 # Filter year
-year_df = df[df["year"] == selected_year].copy()
+year_df, year_scores = year_view(tables, selected_year)
 if year_df.empty:
     st.warning(f"No data for year {selected_year}")
     safe_stop()
 
-# Filter to home countries if set (NO new selection)
+# Filter to home countries if set (NO new selection); dominance is relative to these countries
 if home_countries:
-    year_df = year_df[year_df["country"].isin(home_countries)].copy()
+    year_df, year_scores = year_view(tables, selected_year, home_countries)
 
 if year_df.empty:
     st.warning("No data after applying Home selected countries.")
@@ -250,12 +216,7 @@ present_countries = sorted(year_df["country"].unique())
 excluded_countries = sorted(list(set(expected_countries) - set(present_countries))) if home_countries else []
 
 country_coverage_table = (
-    year_df.groupby("country")
-    .agg(
-        indicators_available=("indicator", "nunique"),
-        data_points=("value", "count")
-    )
-    .reset_index()
+    year_scores[["country", "indicators_available", "data_points"]]
     .sort_values(["indicators_available", "data_points"], ascending=False)
 )
 
@@ -290,38 +251,12 @@ with st.expander("View country coverage details (selected year)"):
     display_cov.columns = ["Country", "Indicators available", "Data points"]
     st.dataframe(display_cov, use_container_width=True, hide_index=True)
 
-# Normalize per indicator for fair sunburst sizing
-sunburst_df = year_df[["country", "indicator", "value"]].copy()
-sunburst_df = sunburst_df.dropna(subset=["value"])
-sunburst_df = sunburst_df[sunburst_df["value"] != 0]
-
-sunburst_df["normalized_value"] = 0.0
-
-for ind in sunburst_df["indicator"].unique():
-    m = sunburst_df["indicator"] == ind
-    vals = sunburst_df.loc[m, "value"]
-
-    if vals.isna().all() or (vals == 0).all():
-        continue
-
-    ind_norm = str(ind).strip().lower()
-
-    # special scales
-    if "gini" in ind_norm:
-        sunburst_df.loc[m, "normalized_value"] = vals  # gini already comparable-ish
-    elif ind_norm == "hdi" or "human development index" in ind_norm:
-        sunburst_df.loc[m, "normalized_value"] = vals * 100  # 0–1 -> 0–100
-    else:
-        vmin, vmax = vals.min(), vals.max()
-        if pd.notna(vmin) and pd.notna(vmax) and vmax > vmin:
-            sunburst_df.loc[m, "normalized_value"] = ((vals - vmin) / (vmax - vmin)) * 100
-        else:
-            sunburst_df.loc[m, "normalized_value"] = 50.0
+lap("Load & filter")
 
-sunburst_df = sunburst_df.dropna(subset=["normalized_value"])
-sunburst_df = sunburst_df[sunburst_df["normalized_value"] > 0]
+# Dominance (0–100 per indicator) is precomputed; keep the segments that carry weight
+sunburst_df = year_df.dropna(subset=["normalized_value"])[["country", "indicator", "value", "normalized_value", "is_ineq"]].copy()
 
-if sunburst_df.empty or sunburst_df["normalized_value"].sum() == 0:
+if sunburst_df.empty:
     st.error("Sunburst cannot render because normalized values sum to 0. Try a different year.")
     safe_stop()
 
@@ -337,6 +272,8 @@ def fmt(val):
 
 sunburst_df["formatted_value"] = sunburst_df["value"].apply(fmt)
 
+lap("Normalize & score")
+
 # ---------------- Sunburst ----------------
 fig = px.sunburst(
     sunburst_df,
@@ -390,6 +327,8 @@ st.markdown(
 
 
 
+lap("Sunburst")
+
 # ============================================================
 # ✅ Visualization Story (Country-wise)
 # ============================================================
@@ -400,45 +339,15 @@ countries_in_view = sorted(sunburst_df["country"].unique())
 if home_countries:
     countries_in_view = [c for c in home_countries if c in countries_in_view]
 
-def norm_name(s: str) -> str:
-    return str(s).strip().lower()
-
-INEQ_KEYWORDS = [
-    "gini",
-    "income share",
-    "poverty",
-    "unemployment",
-    "vulnerable employment",
-]
-
-def is_ineq_indicator(ind: str) -> bool:
-    t = norm_name(ind)
-    return any(k in t for k in INEQ_KEYWORDS)
-
-scores = []
-drivers_map = {}
-ineq_share_map = {}  # % of each country's visible dominance that is inequality-related
-
-for c in countries_in_view:
-    cdf = sunburst_df[sunburst_df["country"] == c].copy()
-    cdf["is_ineq"] = cdf["indicator"].apply(is_ineq_indicator)
-
-    ineq_part = cdf[cdf["is_ineq"]].copy()
-    score = float(ineq_part["normalized_value"].sum()) if not ineq_part.empty else 0.0
-
-    total_country = float(cdf["normalized_value"].sum()) if not cdf.empty else 0.0
-    ineq_share = (score / total_country * 100) if total_country > 0 else 0.0
-    ineq_share_map[c] = ineq_share
-
-    if not ineq_part.empty:
-        top_drivers = ineq_part.sort_values("normalized_value", ascending=False).head(3)["indicator"].tolist()
-    else:
-        top_drivers = cdf.sort_values("normalized_value", ascending=False).head(3)["indicator"].tolist()
-
-    drivers_map[c] = top_drivers
-    scores.append({"country": c, "score": score})
+# Inequality scores and top drivers are precomputed per year and country
+year_scores = year_scores.set_index("country")
+ineq_share_map = year_scores["ineq_share"].reindex(countries_in_view).fillna(0.0).to_dict()
+drivers_map = year_scores["top_drivers"].reindex(countries_in_view).to_dict()
 
-scores_df = pd.DataFrame(scores).sort_values("score", ascending=False).reset_index(drop=True)
+scores_df = pd.DataFrame({
+    "country": countries_in_view,
+    "score": year_scores["score"].reindex(countries_in_view).fillna(0.0).to_numpy(),
+}).sort_values("score", ascending=False).reset_index(drop=True)
 
 # ------------------------------------------------------------
 # FIX: Do not assign inequality level if no inequality indicators exist
@@ -533,6 +442,8 @@ for c in countries_in_view:
         
         st.caption("Note: Dominance reflects what stands out after normalization. It reveals patterns but does not establish causation.")
 
+lap("Country story")
+
 # ============================================================
 # ⭐ COUNTRY SPOTLIGHT (Story Mode)
 # ============================================================
@@ -625,9 +536,7 @@ with st.expander("View underlying data (for this country)"):
     view["Dominance Score (0-100)"] = view["Dominance Score (0-100)"].round(1)
     
     # Add indicator type column
-    view["Type"] = view["Indicator"].apply(
-        lambda x: " Inequality" if is_ineq_indicator(x) else " Economic/Development"
-    )
+    view["Type"] = np.where(c_df["is_ineq"], " Inequality", " Economic/Development")
     
     # Reorder columns
     view = view[["Type", "Indicator", "Actual Value", "Dominance Score (0-100)"]]
@@ -647,6 +556,8 @@ with st.expander("View underlying data (for this country)"):
 st.divider()
 st.caption("Indicator Insights | South Asia Inequality Analysis Platform")
 
+lap("Country spotlight")
+
 # -----------------
 # Navigation
 # -----------------
@@ -2,11 +2,10 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from scipy.stats import ttest_rel
+import plotly.graph_objects as go
 import sys
 from pathlib import Path
 import numpy as np
-import json
 
 # --------------------------------------------------
 # Path setup
@@ -14,18 +13,25 @@ import json
 sys.path.append(str(Path(__file__).parent.parent))
 from utils.help_system import render_help_button
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 from utils.loaders import load_inequality_data, load_geojson
 from utils.utils import (
     human_indicator,
     get_color_scale,
     handle_missing_data,
     validate_dataframe,
-    format_value,
-    safe_divide
+    format_value
 )
 from utils.indicator_metadata import (
     get_available_indicators_by_category,
+    get_category_for_indicator,
 )
+from utils.table_export import table_download_button
+from utils.temporal_engine import period_matrices, significance_tests
+from utils.forecasting import series_forecast, add_projection_traces, projection_caption
+from utils.imputation import filled_series, filled_version, provenance_caption
+from utils.rankings import tier_labels, assign_tiers, tier_flows, tier_movement
+from utils.state import config_hash, page_artifact
 
 # --------------------------------------------------
 # CONSTANTS
@@ -33,6 +39,16 @@ from utils.indicator_metadata import (
 MIN_STATISTICAL_TEST_SIZE = 5
 TIER_THRESHOLD = 6  # Use 3 tiers if <= 6 countries, 4 tiers if more
 
+# Export format label -> utils.table_export format
+EXPORT_FORMATS = {
+    "CSV": "CSV",
+    "Excel (XLSX)": "Excel",
+    "JSON": "JSON",
+    "TSV": "TSV",
+    "Parquet": "Parquet",
+    "Arrow (Feather)": "Arrow",
+}
+
 # Eurostat-style color palette
 EUROSTAT_COLORS = {
     'diverging': [
@@ -44,6 +60,13 @@ EUROSTAT_COLORS = {
     ]
 }
 
+@st.cache_data(show_spinner=False)
+def category_significance(indicators, countries, then, now):
+    """Bootstrap / permutation / Wilcoxon results for every indicator in a category (cached per selection)"""
+    data = handle_missing_data(load_inequality_data())
+    then_matrix, now_matrix, _ = period_matrices(data, list(indicators), countries=list(countries), then=then, now=now)
+    return significance_tests(then_matrix, now_matrix)
+
 # ADD THIS NEW HELPER FUNCTION
 def add_country_labels_to_map(fig, data, geojson):
     """Add country name labels to choropleth map."""
@@ -118,6 +141,7 @@ st.set_page_config(
 )
 render_help_button("temporal")
 apply_all_styles()
+start_page("Temporal Comparison")
 
 # -----------------
 # Navigation Helper
@@ -575,11 +599,10 @@ indicator_config = get_indicator_config(indicator)
 ascending = indicator_config["lower_is_better"]
 improved_direction = indicator_config["improved_direction"]
 
-# Filter data for selected indicator
-idf = df[df["indicator"] == indicator].copy()
-
-# Remove any rows with null values
-idf = idf.dropna(subset=["value"])
+# Observed rows of the indicator (memoized: colour / mode widgets reuse them)
+indicator_key = config_hash(st.session_state.analysis_config, ('indicator',))
+idf = page_artifact('temporal', 'observed',
+                    lambda: df[df["indicator"] == indicator].dropna(subset=["value"]), indicator_key)
 
 if idf.empty:
     st.error(f"❌ No valid data available for {human_indicator(indicator)}")
@@ -634,6 +657,16 @@ mode = st.radio(
     horizontal=True
 )
 
+fill_gaps = st.checkbox(
+    "Fill missing years",
+    value=True,
+    help="Compare countries without an observation in the selected years using the shared "
+         "gap-filled data (interpolated between observations, extrapolated a few years past them). "
+         "Heatmaps and significance tests always use observed values only."
+)
+# Comparison source: observed rows, or the filled cube (same columns plus provenance)
+source_df = filled_series(indicator) if fill_gaps else idf
+
 try:
     if mode.startswith("Point"):
         then_year, now_year = st.select_slider(
@@ -645,11 +678,13 @@ try:
             st.error("❌ THEN year must be earlier than NOW year.")
             safe_stop()
 
-        df_then = idf[idf["year"] == then_year].copy()
-        df_now = idf[idf["year"] == now_year].copy()
+        df_then = source_df[source_df["year"] == then_year].copy()
+        df_now = source_df[source_df["year"] == now_year].copy()
+        period_rows = pd.concat([df_then, df_now])
 
         period_then = str(then_year)
         period_now = str(now_year)
+        then_span, now_span = (then_year, then_year), (now_year, now_year)
     else:
         # Range to Range mode
         mid_point = len(years) // 2
@@ -669,20 +704,26 @@ try:
         if early_range[1] >= late_range[0]:
             st.warning("⚠️ Early period should end before late period begins for clearer comparison.")
 
-        df_then = idf[idf["year"].between(*early_range)].groupby(
+        df_then = source_df[source_df["year"].between(*early_range)].groupby(
             ["country", "country_code"], as_index=False
         )["value"].mean()
-        df_now = idf[idf["year"].between(*late_range)].groupby(
+        df_now = source_df[source_df["year"].between(*late_range)].groupby(
             ["country", "country_code"], as_index=False
         )["value"].mean()
+        period_rows = source_df[
+            source_df["year"].between(*early_range) | source_df["year"].between(*late_range)
+        ]
 
         period_then = f"{early_range[0]}–{early_range[1]}"
         period_now = f"{late_range[0]}–{late_range[1]}"
+        then_span, now_span = early_range, late_range
 
 except Exception as e:
     st.error(f"❌ Error in period selection: {str(e)}")
     safe_stop()
 
+lap("Load & configure")
+
 # --------------------------------------------------
 # Keep common countries and validate
 # --------------------------------------------------
@@ -702,71 +743,83 @@ df_now = df_now.dropna(subset=["value"])
 if df_then.empty or df_now.empty:
     st.error("❌ No valid data available for comparison after filtering.")
     safe_stop()
-# --------------------------------------------------
-# Ranking
-# --------------------------------------------------
-try:
-    df_then["rank_then"] = df_then["value"].rank(ascending=ascending, method='min')
-    df_now["rank_now"] = df_now["value"].rank(ascending=ascending, method='min')
-except Exception as e:
-    st.error(f"❌ Error calculating rankings: {str(e)}")
-    safe_stop()
+
+if fill_gaps:
+    fill_note = provenance_caption(period_rows[period_rows["country_code"].isin(common)])
+    if fill_note:
+        st.caption(f"ℹ️ {fill_note}")
 
 # --------------------------------------------------
-# Merge & compute changes (FIXED: Better null handling)
+# Ranking, merge & changes (memoized per indicator, source and periods)
 # --------------------------------------------------
-try:
-    cmp = df_then.merge(
-        df_now,
+def build_comparison():
+    then = df_then.assign(rank_then=df_then["value"].rank(ascending=ascending, method='min'))
+    now = df_now.assign(rank_now=df_now["value"].rank(ascending=ascending, method='min'))
+    merged = then.merge(
+        now,
         on=["country", "country_code"],
         suffixes=("_then", "_now"),
         how="inner"
     )
 
-    if cmp.empty:
-        st.error("❌ No data available after merging periods.")
-        safe_stop()
-
     # Calculate absolute change
-    cmp["abs_change"] = cmp["value_now"] - cmp["value_then"]
+    merged["abs_change"] = merged["value_now"] - merged["value_then"]
 
     # Calculate percentage change with proper null handling
-    cmp["pct_change"] = cmp.apply(
-        lambda r: safe_divide(r["abs_change"], r["value_then"]) * 100
-        if pd.notna(r["value_then"]) and r["value_then"] != 0
-        else None,
-        axis=1
-    )
+    merged["pct_change"] = merged["abs_change"] / merged["value_then"].where(merged["value_then"] != 0) * 100
 
     # Calculate rank change
-    cmp["rank_change"] = cmp["rank_then"] - cmp["rank_now"]
+    merged["rank_change"] = merged["rank_then"] - merged["rank_now"]
 
     # Determine improvement (FIXED: Based on indicator type)
     if ascending:  # Lower is better
-        cmp["improved"] = cmp["abs_change"] < 0
+        merged["improved"] = merged["abs_change"] < 0
     else:  # Higher is better
-        cmp["improved"] = cmp["abs_change"] > 0
+        merged["improved"] = merged["abs_change"] > 0
+    return merged
 
+
+try:
+    # Shared object: shallow copy before the views add tier columns
+    cmp = page_artifact('temporal', 'comparison', build_comparison,
+                        indicator_key, fill_gaps, period_then, period_now).copy(deep=False)
 except Exception as e:
     st.error(f"❌ Error computing changes: {str(e)}")
     safe_stop()
 
+if cmp.empty:
+    st.error("❌ No data available after merging periods.")
+    safe_stop()
+
 # --------------------------------------------------
-# Statistical test (FIXED: Better error handling)
+# Statistical test: resampling-based, robust for a handful of countries
 # --------------------------------------------------
 try:
-    if len(cmp) >= 3:  # Need at least 3 pairs for meaningful test
-        t_stat, p_value = ttest_rel(cmp["value_then"], cmp["value_now"])
-        test_valid = True
+    # Paired values: observed rows only, even when the comparison uses the filled cube
+    if fill_gaps:
+        observed = idf[idf["country_code"].isin(cmp["country_code"])]
+        test_pairs = pd.concat([
+            observed[observed["year"].between(*then_span)].groupby("country_code")["value"].mean(),
+            observed[observed["year"].between(*now_span)].groupby("country_code")["value"].mean(),
+        ], axis=1, keys=["value_then", "value_now"], join="inner").dropna()
+    else:
+        test_pairs = cmp[["value_then", "value_now"]]
+
+    if len(test_pairs) >= 3:  # Need at least 3 pairs for meaningful test
+        sig_result = significance_tests(test_pairs["value_then"].to_numpy(), test_pairs["value_now"].to_numpy()).iloc[0]
+        p_value = sig_result["p_permutation"]
+        test_valid = pd.notna(p_value)
     else:
-        t_stat, p_value = None, None
+        sig_result, p_value = None, None
         test_valid = False
-        st.warning("⚠️ Not enough data points for statistical test (need at least 3 countries)")
+        st.warning("⚠️ Not enough data points for statistical test (need at least 3 countries with observed values)")
 except Exception as e:
     st.warning(f"⚠️ Could not perform statistical test: {str(e)}")
-    t_stat, p_value = None, None
+    sig_result, p_value = None, None
     test_valid = False
 
+lap("Rank, merge & test")
+
 # --------------------------------------------------
 # Visualization selector
 # --------------------------------------------------
@@ -1134,83 +1187,14 @@ try:
 
     elif viz_option == "Sankey Diagram (Rank Flow)":
         st.info("Shows how countries moved between performance tiers")
-        num_countries = len(cmp)
-
-        if num_countries < 8:
-            num_tiers = 3
-            labels_list = ['Top Tier', 'Middle Tier', 'Bottom Tier']
-        else:
-            num_tiers = 4
-            labels_list = ['Top 25%', 'Upper Middle', 'Lower Middle', 'Bottom 25%']
-
-
-        try:
-            cmp['tier_then'] = pd.qcut(
-                cmp['rank_then'],
-                q=num_tiers,
-                labels=labels_list,
-                duplicates='drop'
-            )
-            cmp['tier_now'] = pd.qcut(
-                cmp['rank_now'],
-                q=num_tiers,
-                labels=labels_list,
-                duplicates='drop'
-            )
-        except ValueError:
-            # Fallback to manual binning if qcut fails
+        labels_list = tier_labels(len(cmp))
+        cmp['tier_then'], cmp['tier_now'], manual_tiers = assign_tiers(cmp['rank_then'], cmp['rank_now'], labels_list)
+        if manual_tiers:
             st.warning("⚠️ Using manual tier assignment due to data distribution")
-            max_rank = max(cmp['rank_then'].max(), cmp['rank_now'].max())
-            bins = [0] + [max_rank * (i+1) / num_tiers for i in range(num_tiers)]
-
-            cmp['tier_then'] = pd.cut(
-                cmp['rank_then'],
-                bins=bins,
-                labels=labels_list,
-                include_lowest=True
-            )
-            cmp['tier_now'] = pd.cut(
-                cmp['rank_now'],
-                bins=bins,
-                labels=labels_list,
-                include_lowest=True
-            )
-
-    # Build Sankey data
-        import plotly.graph_objects as go
 
-        sankey_data = cmp.groupby(['tier_then', 'tier_now']).size().reset_index(name='count')
-
-        # Create node labels
-        source_labels = [f"{tier} (THEN)" for tier in labels_list]
-        target_labels = [f"{tier} (NOW)" for tier in labels_list]
-        all_labels = source_labels + target_labels
-        label_to_idx = {label: idx for idx, label in enumerate(all_labels)}
-
-        sources = []
-        targets = []
-        values = []
-        colors = []
-
-        for _, row in sankey_data.iterrows():
-            source_label = f"{row['tier_then']} (THEN)"
-            target_label = f"{row['tier_now']} (NOW)"
-
-            if source_label in label_to_idx and target_label in label_to_idx:
-                sources.append(label_to_idx[source_label])
-                targets.append(label_to_idx[target_label])
-                values.append(row['count'])
-
-                # FIXED: Color based on movement (lower index = better tier)
-                src_idx = label_to_idx[source_label] % len(labels_list)
-                tgt_idx = (label_to_idx[target_label] - len(labels_list)) % len(labels_list)
-
-                if src_idx == tgt_idx:
-                    colors.append('rgba(150, 150, 150, 0.3)')  # Gray - no change
-                elif tgt_idx > src_idx:
-                    colors.append('rgba(231, 76, 60, 0.5)')  # Red - WORSENED (moved to worse tier)
-                else:
-                    colors.append('rgba(46, 204, 113, 0.5)')  # Green - IMPROVED (moved to better tier)
+        # Build Sankey data (red = moved to a worse tier, green = better)
+        all_labels = [f"{tier} (THEN)" for tier in labels_list] + [f"{tier} (NOW)" for tier in labels_list]
+        links = tier_flows(cmp['tier_then'], cmp['tier_now'], labels_list)
 
         # Node colors
         node_colors = ["#240b47"] * len(labels_list) + ["#e089c9"] * len(labels_list)
@@ -1223,12 +1207,7 @@ try:
                 label=all_labels,
                 color=node_colors
             ),
-            link=dict(
-                source=sources,
-                target=targets,
-                value=values,
-                color=colors
-            )
+            link=links
         )])
 
         fig_sankey.update_layout(
@@ -1243,16 +1222,8 @@ try:
         with st.expander("Individual Country Movements"):
             movement_df = cmp[['country', 'tier_then', 'tier_now', 'rank_change']].copy()
 
-            # Corrected movement logic
-            def determine_movement(row):
-                if row['tier_then'] == row['tier_now']:
-                    return '➡️ Stayed in Same Tier'
-                elif row['rank_change'] > 0:
-                    return '⬆️ Improved (Better Rank)'
-                else:
-                    return '⬇️ Worsened (Worse Rank)'
-
-            movement_df['Movement'] = movement_df.apply(determine_movement, axis=1)
+            movement_df['Movement'] = tier_movement(movement_df['tier_then'], movement_df['tier_now'],
+                                                    movement_df['rank_change'])
             st.dataframe(movement_df, use_container_width=True, hide_index=True)
 
     elif viz_option == "Heatmap Matrix":
@@ -1280,43 +1251,17 @@ try:
             format_func=human_indicator
         )
 
-        heatmap_data_then = []
-        heatmap_data_now = []
-
-        for country_code in common:
-            country_name = cmp[cmp['country_code'] == country_code]['country'].iloc[0]
-
-            row_then = {'Country': country_name}
-            row_now = {'Country': country_name}
-
-            for ind in selected_indicators:
-                indicator_df = df[
-                    (df['indicator'] == ind) &
-                    (df['country_code'] == country_code)
-                ]
-
-                if mode.startswith("Point"):
-                    then_val = indicator_df[indicator_df['year'] == then_year]['value']
-                    now_val = indicator_df[indicator_df['year'] == now_year]['value']
-
-                    row_then[human_indicator(ind)] = then_val.iloc[0] if len(then_val) > 0 else np.nan
-                    row_now[human_indicator(ind)] = now_val.iloc[0] if len(now_val) > 0 else np.nan
-                else:
-                    then_val = indicator_df[indicator_df['year'].between(*early_range)]['value'].mean()
-                    now_val = indicator_df[indicator_df['year'].between(*late_range)]['value'].mean()
-
-                    row_then[human_indicator(ind)] = then_val if pd.notna(then_val) else np.nan
-                    row_now[human_indicator(ind)] = now_val if pd.notna(now_val) else np.nan
-
-            heatmap_data_then.append(row_then)
-            heatmap_data_now.append(row_now)
-
-        df_heatmap_then = pd.DataFrame(heatmap_data_then).set_index('Country')
-        df_heatmap_now = pd.DataFrame(heatmap_data_now).set_index('Country')
-
-        # Ensure both dataframes have identical structure
-        df_heatmap_then = df_heatmap_then.sort_index().sort_index(axis=1)
-        df_heatmap_now = df_heatmap_now.sort_index().sort_index(axis=1)
+        # THEN / NOW matrices for every country x indicator in one aggregation
+        if mode.startswith("Point"):
+            heat_then, heat_now = then_year, now_year
+        else:
+            heat_then, heat_now = early_range, late_range
+        df_heatmap_then, df_heatmap_now, df_heatmap_diff = (
+            matrix.rename(columns=human_indicator).sort_index(axis=1)
+            for matrix in period_matrices(
+                df, selected_indicators, countries=common, then=heat_then, now=heat_now
+            )
+        )
 
         # Calculate global min/max for consistent color scaling
         global_min = min(df_heatmap_then.min().min(), df_heatmap_now.min().min())
@@ -1358,9 +1303,6 @@ try:
         st.markdown("---")
         st.markdown("### Change Heatmap (NOW - THEN)")
 
-        # Calculate difference with proper alignment
-        df_heatmap_diff = df_heatmap_now - df_heatmap_then
-
         # Get max absolute change for symmetric color scale
         max_diff = df_heatmap_diff.abs().max().max()
         if pd.isna(max_diff) or max_diff == 0:
@@ -1431,6 +1373,8 @@ viz_help_mapping = {
 # Show help for the selected visualization
 if viz_option in viz_help_mapping:
     render_visualization_help(viz_help_mapping[viz_option])
+lap("Visualizations")
+
 # --------------------------------------------------
 # Insights (FIXED: Better logic and null handling)
 # --------------------------------------------------
@@ -1521,7 +1465,8 @@ try:
     - {num_improved} countries improved, {num_worsened} countries worsened
 
     **Statistical Confidence:**
-    {f"- Paired t-test: **p = {p_value:.4f}** (t = {t_stat:.2f})" if test_valid else "- Statistical test could not be performed"}
+    {f"- Sign-flip permutation test: **p = {p_value:.4f}** (Wilcoxon signed-rank p = {sig_result['p_wilcoxon']:.4f})" if test_valid else "- Statistical test could not be performed"}
+    {f"- 95% bootstrap CI of the mean change: **[{format_value(sig_result['ci_low'])}, {format_value(sig_result['ci_high'])}]**" if test_valid else ""}
     {f"- The change is **{sig}** at {confidence} confidence level" if test_valid else ""}
 
     **Notable Changes:**
@@ -1534,6 +1479,79 @@ try:
 except Exception as e:
     st.error(f"❌ Error generating summary: {str(e)}")
 
+# --------------------------------------------------
+# Significance across the indicator's category
+# --------------------------------------------------
+try:
+    sig_category = get_category_for_indicator(indicator)
+    sig_indicators = get_available_indicators_by_category(df).get(sig_category, {}).get('indicators') or [indicator]
+    if mode.startswith("Point"):
+        sig_then, sig_now = then_year, now_year
+    else:
+        sig_then, sig_now = tuple(early_range), tuple(late_range)
+
+    with st.expander(f"📐 Significance across {sig_category} ({len(sig_indicators)} indicators)", expanded=False):
+        sig_table = category_significance(tuple(sig_indicators), tuple(sorted(common)), sig_then, sig_now)
+        sig_table = sig_table[sig_table["n"] >= 3].sort_values("p_permutation")
+        if sig_table.empty:
+            st.info("Not enough paired country data in this category for the selected periods.")
+        else:
+            st.dataframe(
+                pd.DataFrame({
+                    "Indicator": [human_indicator(i) for i in sig_table.index],
+                    "Countries": sig_table["n"].to_numpy(),
+                    "Mean Change": sig_table["mean_change"].to_numpy(),
+                    "95% CI Low": sig_table["ci_low"].to_numpy(),
+                    "95% CI High": sig_table["ci_high"].to_numpy(),
+                    "Permutation p": sig_table["p_permutation"].to_numpy(),
+                    "Wilcoxon p": sig_table["p_wilcoxon"].to_numpy(),
+                    "Significant": np.where(sig_table["p_permutation"] < 0.05, "Yes ✓", "No ✗"),
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(
+                f"{period_then} → {period_now}. Permutation p-values are exact (all sign patterns) "
+                "for up to 12 countries; CIs use 10,000 paired bootstrap resamples of countries."
+            )
+except Exception as e:
+    st.warning(f"⚠️ Could not compute category significance: {str(e)}")
+
+# --------------------------------------------------
+# Projected trajectory (precomputed by scripts/build_forecasts.py)
+# --------------------------------------------------
+trajectory_countries = sorted(idf.loc[idf["country_code"].isin(common), "country"].unique())
+projections = series_forecast(indicator, trajectory_countries)
+if not projections.empty:
+    with st.expander(f"🔮 Projected trajectory beyond {period_now}", expanded=False):
+        trajectory_colors = dict(zip(trajectory_countries, px.colors.qualitative.Plotly * 2))
+        observed = idf[idf["country"].isin(trajectory_countries)].sort_values("year")
+        fig_trajectory = px.line(
+            observed, x="year", y="value", color="country",
+            color_discrete_map=trajectory_colors,
+            labels={"year": "Year", "value": human_indicator(indicator), "country": "Country"}
+        )
+        add_projection_traces(fig_trajectory, projections, trajectory_colors, observed=observed)
+        fig_trajectory.update_layout(height=420, hovermode="x unified", legend=dict(orientation="h", y=-0.2))
+        st.plotly_chart(fig_trajectory, use_container_width=True, key="projection_trajectory")
+
+        horizon_end = projections.loc[projections.groupby("country")["year"].idxmax()]
+        st.dataframe(
+            pd.DataFrame({
+                "Country": horizon_end["country"].to_numpy(),
+                "Year": horizon_end["year"].to_numpy(),
+                "Projected": horizon_end["forecast"].to_numpy(),
+                "Interval Low": horizon_end["lower"].to_numpy(),
+                "Interval High": horizon_end["upper"].to_numpy(),
+                "Model": horizon_end["model"].to_numpy(),
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(projection_caption(projections))
+
+lap("Insights & significance")
+
 # --------------------------------------------------
 # Export Section (Enhanced with multiple options)
 # --------------------------------------------------
@@ -1549,7 +1567,7 @@ try:
         # Data export options
         export_format = st.selectbox(
             "Select data format",
-            ["CSV", "Excel (XLSX)", "JSON", "TSV"]
+            list(EXPORT_FORMATS)
         )
 
     with col2:
@@ -1614,7 +1632,7 @@ try:
         "Period_THEN": period_then,
         "Period_NOW": period_now,
         "Countries": len(common),
-        "Export_Date": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+        "Gap_Filled": fill_gaps,
     }
 
     # Display preview
@@ -1622,85 +1640,31 @@ try:
         st.dataframe(export_df.head(10), use_container_width=True)
         st.caption(f"Showing first 10 of {len(export_df)} rows")
 
-    # Export based on format
-    if export_format == "CSV":
-        # Add metadata as comment lines
-        metadata_lines = "\n".join([f"# {k}: {v}" for k, v in metadata.items()])
-        csv_data = metadata_lines + "\n" + export_df.to_csv(index=False)
-
-        st.download_button(
-            label=f"⬇️ Download as CSV",
-            data=csv_data,
-            file_name=f"{filename_base}.csv",
-            mime="text/csv",
-            use_container_width=True
-        )
-
-    elif export_format == "Excel (XLSX)":
-        try:
-            from io import BytesIO
-            output = BytesIO()
-
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                export_df.to_excel(writer, sheet_name='Data', index=False)
-
-                # Add metadata sheet
-                metadata_df = pd.DataFrame([metadata])
-                metadata_df.to_excel(writer, sheet_name='Metadata', index=False)
-
-                # Add summary statistics if comparison data
-                if data_selection == "Comparison Results (All Metrics)":
-                    summary_df = pd.DataFrame({
-                        'Metric': ['Mean Change', 'Median Change', 'Std Dev', 'Countries Improved', 'Countries Worsened'],
-                        'Value': [
-                            cmp['abs_change'].mean(),
-                            cmp['abs_change'].median(),
-                            cmp['abs_change'].std(),
-                            cmp['improved'].sum(),
-                            (~cmp['improved']).sum()
-                        ]
-                    })
-                    summary_df.to_excel(writer, sheet_name='Summary', index=False)
-
-            output.seek(0)
-            st.download_button(
-                label=f"⬇️ Download as Excel",
-                data=output,
-                file_name=f"{filename_base}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True
-            )
-        except ImportError:
-            st.error("❌ Excel export requires 'openpyxl'. Install it with: pip install openpyxl")
-
-    elif export_format == "JSON":
-        # Include metadata in JSON
-        json_output = {
-            "metadata": metadata,
-            "data": export_df.to_dict(orient='records')
-        }
-        json_data = json.dumps(json_output, indent=2)
-
-        st.download_button(
-            label=f"⬇️ Download as JSON",
-            data=json_data,
-            file_name=f"{filename_base}.json",
-            mime="application/json",
-            use_container_width=True
-        )
-
-    else:  # TSV
-        # Add metadata as comment lines
-        metadata_lines = "\n".join([f"# {k}: {v}" for k, v in metadata.items()])
-        tsv_data = metadata_lines + "\n" + export_df.to_csv(index=False, sep='\t')
-
-        st.download_button(
-            label=f"⬇️ Download as TSV",
-            data=tsv_data,
-            file_name=f"{filename_base}.tsv",
-            mime="text/tab-separated-values",
-            use_container_width=True
-        )
+    # Export based on format (generated on click, cached per data version + selection)
+    extra_sheets = None
+    if data_selection == "Comparison Results (All Metrics)":
+        extra_sheets = {'Summary': pd.DataFrame({
+            'Metric': ['Mean Change', 'Median Change', 'Std Dev', 'Countries Improved', 'Countries Worsened'],
+            'Value': [
+                cmp['abs_change'].mean(),
+                cmp['abs_change'].median(),
+                cmp['abs_change'].std(),
+                cmp['improved'].sum(),
+                (~cmp['improved']).sum()
+            ]
+        })}
+
+    table_download_button(
+        export_df,
+        filename_base,
+        EXPORT_FORMATS[export_format],
+        label=f"⬇️ Download as {export_format.split(' (')[0]}",
+        signature=(data_selection, indicator, period_then, period_now, tuple(sorted(common)),
+                   fill_gaps, filled_version() if fill_gaps else None),
+        metadata=metadata,
+        stamp=lambda: {"Export_Date": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")},
+        extra_sheets=extra_sheets
+    )
 except Exception as e:
     st.error(f"❌ Error in export section: {str(e)}")
     st.caption("Please try a different export format or contact support if the issue persists.")
@@ -1773,6 +1737,8 @@ except Exception as e:
 
 st.caption("Temporal Comparison | South Asia Inequality Analysis Platform")
 
+lap("Export")
+
 # -----------------
 # Navigation
 # -----------------
@@ -8,6 +8,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.help_content import HELP_CONTENT
 from utils.sidebar import apply_all_styles
+from utils.profiling import start_page, lap
 
 
 st.set_page_config(
@@ -18,6 +19,7 @@ st.set_page_config(
 )
 
 apply_all_styles()
+start_page("Help")
 
 # Custom CSS for help page
 st.markdown("""
@@ -402,6 +404,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+lap("Help tabs")
+
 # -----------------
 # Navigation
 # -----------------
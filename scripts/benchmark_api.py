@@ -0,0 +1,130 @@
+"""
+Local load test for the analytics API (api.py).
+
+Starts ``uvicorn api:app`` on a free port (unless --url is given), then fires
+concurrent keep-alive requests at each endpoint and reports throughput and
+latency percentiles.
+
+    python scripts/benchmark_api.py --concurrency 16 --requests 2000
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIMULATE_BODY = json.dumps({'profiles': [
+    {'country': c, 'edu': 12, 'digital': 5, 'gender': 0, 'urban': 1,
+     'occupation': 'Services', 'credit': False, 'age': 'Adult (25-60)'}
+    for c in ['India', 'Pakistan', 'Bangladesh', 'Nepal']
+]})
+
+SCENARIOS = {
+    'meta': ('GET', '/meta', None),
+    'slice': ('GET', '/slice?indicators=GINI%20Coefficient&countries=India,Pakistan&start=2010&end=2020', None),
+    'rankings': ('GET', '/rankings?indicator=GINI%20Coefficient&k=5', None),
+    'compare': ('GET', '/compare?indicators=GINI%20Coefficient&then=2005-2009&now=2015-2019', None),
+    'correlation': ('GET', '/correlation?x=GDP%20Per%20Capita&y=GINI%20Coefficient', None),
+    'quality': ('GET', '/quality', None),
+    'simulate': ('POST', '/simulate', SIMULATE_BODY),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, workers):
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(port),
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=ROOT,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/meta')  # Also warms the shared cube
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("API server did not start")
+
+
+def run_scenario(host, port, method, path, body, n_requests, concurrency):
+    """Latencies (seconds) of n_requests spread over `concurrency` keep-alive connections"""
+    per_worker = [n_requests // concurrency + (i < n_requests % concurrency) for i in range(concurrency)]
+    headers = {'Content-Type': 'application/json'} if body else {}
+
+    def worker(count):
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        conn.connect()
+        # Without TCP_NODELAY, delayed ACKs add ~40 ms to every keep-alive request
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        latencies, errors = [], 0
+        for _ in range(count):
+            start = time.perf_counter()
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            errors += response.status != 200
+        conn.close()
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(worker, per_worker))
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([r[0] for r in results])
+    return elapsed, latencies, sum(r[1] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help="Benchmark a running server instead of starting one")
+    parser.add_argument('--workers', type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent client connections")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per endpoint")
+    parser.add_argument('--only', nargs='*', choices=list(SCENARIOS), help="Endpoints to benchmark")
+    args = parser.parse_args()
+
+    proc = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        host, port = '127.0.0.1', free_port()
+        print(f"Starting API server on port {port} ({args.workers} workers)...")
+        proc = start_server(port, args.workers)
+
+    try:
+        print(f"\n{'endpoint':<12} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name in args.only or SCENARIOS:
+            method, path, body = SCENARIOS[name]
+            elapsed, latencies, errors = run_scenario(
+                host, port, method, path, body, args.requests, args.concurrency)
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            print(f"{name:<12} {len(latencies) / elapsed:>9.0f} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f} {errors:>7}")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Build the forecast artifact (data/processed/forecasts.csv) used by the
+Dashboard, Map and Temporal Comparison projection overlays.
+
+Fits ETS, damped-trend ETS and auto-order ARIMA to every (country, indicator)
+series of the curated dataset in parallel, keeps the model that best predicts
+each series' last years, and stores projections with prediction intervals.
+Skips the build when the artifact already matches the dataset (see
+utils/forecasting.py).
+
+    python scripts/build_forecasts.py                    # all cores
+    python scripts/build_forecasts.py --workers 4 --horizon 8
+    python scripts/build_forecasts.py --force            # rebuild even if up to date
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from utils.forecasting import (CURATED_PATH, DEFAULT_COVERAGE, DEFAULT_HORIZON, FORECASTS_PATH,
+                               dataset_digest, forecast_all, read_artifact_metadata, write_forecasts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit projections for every curated indicator series")
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON, help="Years to project past each series")
+    parser.add_argument('--coverage', type=float, default=DEFAULT_COVERAGE, help="Prediction interval coverage")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the artifact is up to date")
+    args = parser.parse_args()
+
+    if not CURATED_PATH.exists():
+        print("ERROR: curated dataset not found; run scripts/curate_indicator_dataset.py first.")
+        return
+
+    digest = dataset_digest()
+    existing = read_artifact_metadata(FORECASTS_PATH)
+    up_to_date = (
+        existing.get('source_digest') == digest
+        and existing.get('horizon') == str(args.horizon)
+        and existing.get('coverage') == str(args.coverage)
+    )
+    if up_to_date and not args.force:
+        print(f"Forecasts are up to date ({FORECASTS_PATH.name}, dataset {digest}); use --force to rebuild.")
+        return
+
+    df = pd.read_csv(CURATED_PATH)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Fitting {df.groupby(['country', 'indicator']).ngroups} series on {workers} worker(s)...")
+    started = time.perf_counter()
+    forecasts = forecast_all(df, horizon=args.horizon, coverage=args.coverage, workers=workers)
+    elapsed = time.perf_counter() - started
+
+    write_forecasts(forecasts, digest, args.horizon, args.coverage)
+    series = forecasts.groupby(['country', 'indicator'])
+    print(f"Projected {series.ngroups} series ({len(forecasts):,} rows) in {elapsed:.1f}s -> {FORECASTS_PATH}")
+    print("Models chosen:")
+    print(series['model'].first().str.split('(').str[0].value_counts().rename_axis(None).to_string())
+
+
+if __name__ == "__main__":
+    main()
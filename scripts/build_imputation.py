@@ -0,0 +1,66 @@
+"""
+Build the filled indicator cube (data/processed/filled_indicators.csv) that
+the Dashboard, Temporal Comparison, Map Analysis and Income Simulator read
+for missing years.
+
+Interpolates interior gaps, extrapolates the edges of every (country,
+indicator) series with a cross-country regression or a bounded carry, and
+flags each cell as observed, interpolated or extrapolated (see
+utils/imputation.py). Skips the build when the artifact already matches the
+dataset and settings.
+
+    python scripts/build_imputation.py                   # linear, carry up to 5 years
+    python scripts/build_imputation.py --method pchip --max-gap 3
+    python scripts/build_imputation.py --force           # rebuild even if up to date
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.forecasting import CURATED_PATH, dataset_digest, read_artifact_metadata
+from utils.imputation import (CARRY_MAX_GAP, DEFAULT_METHOD, FILLED_PATH, INTERPOLATION_METHODS,
+                              fill_cube, write_filled)
+from utils.loaders import _read_curated_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gap-fill every curated indicator series with provenance flags")
+    parser.add_argument('--method', choices=INTERPOLATION_METHODS, default=DEFAULT_METHOD,
+                        help="Interpolation for interior gaps")
+    parser.add_argument('--max-gap', type=int, default=CARRY_MAX_GAP,
+                        help="Years an edge observation may be carried")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the artifact is up to date")
+    args = parser.parse_args()
+
+    if not CURATED_PATH.exists():
+        print("ERROR: curated dataset not found; run scripts/curate_indicator_dataset.py first.")
+        return
+
+    digest = dataset_digest()
+    existing = read_artifact_metadata(FILLED_PATH)
+    up_to_date = (
+        existing.get('source_digest') == digest
+        and existing.get('method') == args.method
+        and existing.get('max_gap') == str(args.max_gap)
+    )
+    if up_to_date and not args.force:
+        print(f"Filled cube is up to date ({FILLED_PATH.name}, dataset {digest}); use --force to rebuild.")
+        return
+
+    started = time.perf_counter()
+    filled = fill_cube(_read_curated_csv(str(CURATED_PATH)), method=args.method, max_gap=args.max_gap)
+    elapsed = time.perf_counter() - started
+
+    write_filled(filled, digest, args.method, args.max_gap)
+    print(f"Filled {filled.groupby(['country', 'indicator']).ngroups} series ({len(filled):,} cells) "
+          f"in {elapsed:.2f}s -> {FILLED_PATH}")
+    print("Cells by provenance / method:")
+    print(filled.groupby(['provenance', 'method']).size().rename_axis([None, None]).to_string())
+
+
+if __name__ == "__main__":
+    main()
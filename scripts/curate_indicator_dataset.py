@@ -1,6 +1,10 @@
 
 import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.inequality_metrics import derived_indicator_rows
 
 def curate():
     # Paths
@@ -109,6 +113,14 @@ def curate():
         # Remove duplicates
         df_final = df_final.drop_duplicates(subset=['country', 'year', 'indicator'], keep='first')
         
+        # 5. Derived inequality metrics (Gini, Theil, Palma, S80/S20, top-share ratios)
+        # computed in batch from the WID share series curated above
+        derived = derived_indicator_rows(df_final)
+        if not derived.empty:
+            print(f"Adding {derived['indicator'].nunique()} derived inequality metrics ({len(derived)} records)...")
+            df_final = pd.concat([df_final, derived], ignore_index=True)
+            df_final = df_final.drop_duplicates(subset=['country', 'year', 'indicator'], keep='first')
+        
         # Sort
         df_final = df_final.sort_values(['country', 'indicator', 'year'])
         
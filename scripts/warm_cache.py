@@ -0,0 +1,99 @@
+"""
+Warm the persistent cache (utils/persistent_cache.py) so the first visitor
+after a deploy does not pay for cold computations.
+
+Enumerates the Home page's default analysis_config and every Smart Search
+bookmark with a country/indicator/year selection, then precomputes the
+curated dataset parse, the quality audit, the Indicator Insights dominance
+tables and, per configuration, the Dashboard slice, latest-value rankings
+and country correlation matrix.
+
+    python scripts/warm_cache.py            # data artifacts
+    python scripts/warm_cache.py --api      # + World Bank API summary (network)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analysis_cache import config_slice, latest_values, country_correlation
+from utils.insights_engine import compute_insights_tables
+from utils.loaders import PROCESSED_DIR, _read_curated_csv, compute_quality_audit, load_inequality_data
+from utils.persistent_cache import get_cache_backend, is_cached
+from utils.search_service import SearchDataService
+from utils.state import default_analysis_config
+
+
+def analysis_configs(df):
+    """(label, countries, indicator, year_range) for the default config and bookmarks, deduplicated"""
+    candidates = [('Home default', default_analysis_config(df))]
+    candidates += list(SearchDataService(df).bookmarks.items())
+
+    seen = set()
+    configs = []
+    for label, config in candidates:
+        if not all(config.get(k) for k in ('countries', 'indicator', 'year_range')):
+            continue
+        filters = (list(config['countries']), config['indicator'], tuple(config['year_range']))
+        key = (tuple(filters[0]), filters[1], filters[2])
+        if key not in seen:
+            seen.add(key)
+            configs.append((label, *filters))
+    return configs
+
+
+def warm(label, func, *args):
+    """Run one cached function; returns (was already cached, seconds)"""
+    hit = is_cached(func, *args)
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"  {'hit ' if hit else 'warm'}  {elapsed:7.3f}s  {label}")
+    return hit, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute common analysis artifacts into the persistent cache")
+    parser.add_argument('--api', action='store_true', help="Also warm the World Bank API summary (network)")
+    args = parser.parse_args()
+
+    backend = get_cache_backend()
+    if backend is None:
+        print("Persistent cache is disabled (CACHE_BACKEND); nothing to warm.")
+        return
+
+    started = time.perf_counter()
+    results = []
+
+    print("Dataset:")
+    results.append(warm("curated dataset parse", _read_curated_csv, str(PROCESSED_DIR / "curated_indicators.csv")))
+    df = load_inequality_data()
+    if df.empty:
+        print("ERROR: curated dataset not found; run scripts/curate_indicator_dataset.py first.")
+        return
+    results.append(warm("quality audit", compute_quality_audit))
+    results.append(warm("indicator insights tables", compute_insights_tables))
+
+    for label, countries, indicator, year_range in analysis_configs(df):
+        print(f"\n{label} ({len(countries)} countries, {indicator}, {year_range[0]}-{year_range[1]}):")
+        results.append(warm("slice", config_slice, countries, indicator, year_range))
+        results.append(warm("rankings", latest_values, countries, indicator, year_range))
+        results.append(warm("correlation matrix", country_correlation, countries, indicator, year_range))
+
+    if args.api:
+        from utils.api_loader import get_api_loader
+        loader = get_api_loader()
+        print("\nWorld Bank API:")
+        results.append(warm("API summary", loader.get_api_summary_v2))
+
+    already = sum(hit for hit, _ in results)
+    print(f"\nWarmed {len(results) - already} entries ({already} already cached) "
+          f"in {time.perf_counter() - started:.2f}s")
+    print(f"Cache: {backend.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Analysis Artifacts
+Config-keyed building blocks of the Dashboard (filtered slice, latest values /
+rankings, country correlation matrix), stored in the persistent cache so they
+are shared across workers and can be precomputed by scripts/warm_cache.py.
+
+Every function takes the three ``analysis_config`` filters:
+countries (list), indicator (str) and year_range ((start, end)).
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.loaders import load_inequality_data
+from utils.persistent_cache import persistent_cache
+
+
+@persistent_cache
+def config_slice(countries, indicator, year_range):
+    """Long-format rows for the config, one (mean) value per country-year"""
+    df = load_inequality_data()
+    filtered = df[
+        (df['country'].isin(countries)) &
+        (df['year'] >= year_range[0]) &
+        (df['year'] <= year_range[1]) &
+        (df['indicator'] == indicator)
+    ]
+    # Remove duplicate country-year rows by averaging
+    return filtered.groupby(['country', 'year', 'indicator']).agg({'value': 'mean'}).reset_index()
+
+
+@persistent_cache
+def latest_values(countries, indicator, year_range):
+    """
+    Each country's value in the latest year of the slice, ranked highest first.
+    Columns: country, value, year, indicator, rank
+    """
+    data = config_slice(countries, indicator, year_range)
+    if data.empty:
+        return pd.DataFrame(columns=['country', 'value', 'year', 'indicator', 'rank'])
+    latest_year = data['year'].max()
+    latest = data[data['year'] == latest_year].groupby('country').agg({
+        'value': 'mean',
+        'year': 'first',
+        'indicator': 'first'
+    }).reset_index()
+    latest['rank'] = latest['value'].rank(ascending=False, method='min').astype(int)
+    return latest
+
+
+@persistent_cache
+def country_correlation(countries, indicator, year_range):
+    """
+    Country x country correlation of the indicator's yearly series, with the
+    data-overlap checks the Dashboard applies before showing it.
+
+    Returns:
+        dict with 'matrix' (DataFrame, or None when overlap is insufficient;
+        pairs below the overlap threshold are NaN), 'availability'
+        ({country: years with data}), 'total_years', 'min_required_years',
+        'avg_overlap' and 'min_overlap'
+    """
+    data = config_slice(countries, indicator, year_range)
+    trends = data.pivot_table(values='value', index='year', columns='country')
+
+    total_years = len(trends)
+    min_required_years = max(10, int(total_years * 0.5))  # At least 10 years or 50% of data
+
+    present = trends.notna().to_numpy(dtype=float)
+    availability = dict(zip(trends.columns, present.sum(axis=0).astype(int).tolist()))
+    sufficient_data = all(count >= min_required_years for count in availability.values())
+
+    # Years where both countries have data, for every pair at once
+    overlaps = present.T @ present
+    upper = np.triu_indices(len(trends.columns), k=1)
+    pair_overlaps = overlaps[upper]
+    avg_overlap = float(pair_overlaps.mean()) if pair_overlaps.size else 0
+    min_overlap = float(pair_overlaps.min()) if pair_overlaps.size else 0
+
+    matrix = None
+    if sufficient_data and avg_overlap >= min_required_years:
+        matrix = trends.corr()
+        # Blank out pairs with insufficient overlap
+        matrix = matrix.mask(overlaps < min_required_years)
+
+    return {
+        'matrix': matrix,
+        'availability': availability,
+        'total_years': total_years,
+        'min_required_years': min_required_years,
+        'avg_overlap': avg_overlap,
+        'min_overlap': min_overlap,
+    }
@@ -0,0 +1,306 @@
+"""
+Saved Analysis Store
+Repository over the local SQLite schema of data/inequality.db (users,
+saved_analyses, uploaded_datasets, shared_analyses), kept in the working
+copy utils.database.local_db_path() creates under data/cache/ (the tracked
+file is never written).
+
+- WAL mode, so page reads never wait on a writer
+- A small pool of connections shared by all sessions; every statement is a
+  module constant, so each connection's statement cache keeps it prepared
+- Indexes on the lookup columns (user_id, analysis_id; share_id is the
+  primary key)
+- Saved analyses also store their precomputed results (the Dashboard's
+  slice, latest values and correlation) as compressed JSON, tagged with the
+  dataset version:
+  opening a share link renders from the stored payload instead of
+  recomputing it, and a payload from an older dataset is rebuilt once
+
+``LOCAL_DB_PATH`` overrides the working copy (as in utils/database.py).
+"""
+
+import json
+import queue
+import secrets
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from utils.database import local_db_path
+
+POOL_SIZE = 4
+STATEMENT_CACHE = 64
+GUEST_EMAIL = 'guest@localhost'
+
+_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_saved_analyses_user ON saved_analyses (user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_shared_analyses_analysis ON shared_analyses (analysis_id)",
+    "CREATE INDEX IF NOT EXISTS idx_uploaded_datasets_user ON uploaded_datasets (user_id)",
+)
+# Columns added to saved_analyses for stored results
+_PAYLOAD_COLUMNS = {'result_payload': 'BLOB', 'payload_version': 'TEXT'}
+
+_SELECT_USER_ID = "SELECT user_id FROM users WHERE email = ?"
+_INSERT_PLACEHOLDER_USER = "INSERT OR IGNORE INTO users (email, password_hash) VALUES (?, '')"
+_INSERT_ANALYSIS = (
+    "INSERT INTO saved_analyses (user_id, name, description, filters, result_payload, payload_version)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+_UPDATE_PAYLOAD = (
+    "UPDATE saved_analyses SET result_payload = ?, payload_version = ?, modified_at = CURRENT_TIMESTAMP"
+    " WHERE analysis_id = ?"
+)
+_LIST_ANALYSES = (
+    "SELECT analysis_id, name, description, filters, created_at, modified_at FROM saved_analyses"
+    " WHERE user_id = ? ORDER BY modified_at DESC"
+)
+_SELECT_ANALYSIS = (
+    "SELECT analysis_id, user_id, name, description, filters, result_payload, payload_version,"
+    " created_at, modified_at FROM saved_analyses WHERE analysis_id = ?"
+)
+_DELETE_SHARES = "DELETE FROM shared_analyses WHERE analysis_id = ?"
+_DELETE_ANALYSIS = "DELETE FROM saved_analyses WHERE analysis_id = ?"
+_INSERT_SHARE = "INSERT INTO shared_analyses (share_id, analysis_id, is_public) VALUES (?, ?, ?)"
+_SELECT_SHARE = (
+    "SELECT s.share_id, s.is_public, s.view_count, a.analysis_id, a.name, a.description, a.filters,"
+    " a.result_payload, a.payload_version FROM shared_analyses s"
+    " JOIN saved_analyses a ON a.analysis_id = s.analysis_id WHERE s.share_id = ?"
+)
+_COUNT_VIEW = "UPDATE shared_analyses SET view_count = view_count + 1 WHERE share_id = ?"
+
+
+def _to_data(value):
+    """JSON-ready copy of a results tree (DataFrames as split records + dtypes)"""
+    if isinstance(value, pd.DataFrame):
+        return {'__frame__': {
+            # to_dict keeps Python floats, whose JSON repr round-trips exactly
+            # (to_json rounds to at most 15 significant digits)
+            'split': value.to_dict(orient='split'),
+            'dtypes': value.dtypes.astype(str).to_dict(),
+            'index_name': value.index.name,
+            'columns_name': value.columns.name,
+        }}
+    if isinstance(value, dict):
+        return {key: _to_data(item) for key, item in value.items()}
+    return value.item() if hasattr(value, 'item') else value  # NumPy scalars
+
+
+def _from_data(value):
+    if isinstance(value, dict) and '__frame__' in value:
+        frame = value['__frame__']
+        split = frame['split']
+        index = None if split['index'] == list(range(len(split['data']))) else split['index']
+        df = pd.DataFrame(split['data'], index=index, columns=split['columns']).astype(frame['dtypes'])
+        df.index.name, df.columns.name = frame['index_name'], frame['columns_name']
+        return df
+    if isinstance(value, dict):
+        return {key: _from_data(item) for key, item in value.items()}
+    return value
+
+
+def encode_payload(results):
+    """Results dict -> compressed JSON (data only, so reading a payload never runs code)"""
+    return zlib.compress(json.dumps(_to_data(results), default=str).encode())
+
+
+def decode_payload(blob):
+    """Stored payload -> results dict; None when empty or not in this format (it is then rebuilt)"""
+    if not blob:
+        return None
+    try:
+        return _from_data(json.loads(zlib.decompress(blob)))
+    except (zlib.error, ValueError):
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CONNECTION POOL
+# ═══════════════════════════════════════════════════════════════════
+
+class ConnectionPool:
+    """Fixed set of SQLite connections (WAL, foreign keys on), handed out one at a time"""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = Path(path)
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Pooled connection inside BEGIN IMMEDIATE ... COMMIT (rolled back on error)"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+# ═══════════════════════════════════════════════════════════════════
+# REPOSITORY
+# ═══════════════════════════════════════════════════════════════════
+
+class AnalysisRepository:
+    """Saved analyses and their share links"""
+
+    def __init__(self, path=None, pool_size=POOL_SIZE):
+        self.path = local_db_path(path)
+        self.pool = ConnectionPool(self.path, pool_size)
+        self._migrate()
+
+    def _migrate(self):
+        """Add the indexes and payload columns the shipped schema lacks (idempotent)"""
+        with self.pool.transaction() as conn:
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(saved_analyses)")}
+            for column, sql_type in _PAYLOAD_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE saved_analyses ADD COLUMN {column} {sql_type}")
+            for statement in _INDEXES:
+                conn.execute(statement)
+
+    def local_user_id(self, email=GUEST_EMAIL):
+        """
+        Local user_id for an email, adding a placeholder row (no password) when
+        the account lives elsewhere (e.g. Supabase) or for the guest account
+        """
+        with self.pool.transaction() as conn:
+            conn.execute(_INSERT_PLACEHOLDER_USER, (email,))
+            return conn.execute(_SELECT_USER_ID, (email,)).fetchone()['user_id']
+
+    def save_analysis(self, user_id, name, filters, description='', results=None, version=None):
+        """Insert a saved analysis (filters as JSON, results as a stored payload); returns its id"""
+        blob = encode_payload(results) if results is not None else None
+        with self.pool.transaction() as conn:
+            cursor = conn.execute(_INSERT_ANALYSIS, (user_id, name, description,
+                                                     json.dumps(filters, default=str), blob, version))
+            return cursor.lastrowid
+
+    def update_results(self, analysis_id, results, version):
+        with self.pool.transaction() as conn:
+            conn.execute(_UPDATE_PAYLOAD, (encode_payload(results), version, analysis_id))
+
+    def list_analyses(self, user_id):
+        """A user's saved analyses, newest first (without payloads)"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(_LIST_ANALYSES, (user_id,)).fetchall()
+        return [{**dict(row), 'filters': json.loads(row['filters'])} for row in rows]
+
+    def get_analysis(self, analysis_id):
+        with self.pool.connection() as conn:
+            row = conn.execute(_SELECT_ANALYSIS, (analysis_id,)).fetchone()
+        return self._record(row)
+
+    def delete_analysis(self, analysis_id):
+        with self.pool.transaction() as conn:
+            conn.execute(_DELETE_SHARES, (analysis_id,))
+            conn.execute(_DELETE_ANALYSIS, (analysis_id,))
+
+    def share(self, analysis_id, public=True):
+        """Create a share link id for a saved analysis"""
+        share_id = secrets.token_urlsafe(8)
+        with self.pool.transaction() as conn:
+            conn.execute(_INSERT_SHARE, (share_id, analysis_id, int(public)))
+        return share_id
+
+    def open_share(self, share_id, count_view=True):
+        """Shared analysis with its stored results (None if unknown); optionally counts the view"""
+        if not count_view:  # plain read, no write lock
+            with self.pool.connection() as conn:
+                return self._record(conn.execute(_SELECT_SHARE, (share_id,)).fetchone())
+        with self.pool.transaction() as conn:
+            conn.execute(_COUNT_VIEW, (share_id,))
+            row = conn.execute(_SELECT_SHARE, (share_id,)).fetchone()
+        return self._record(row)
+
+    @staticmethod
+    def _record(row):
+        if row is None:
+            return None
+        record = dict(row)
+        record['filters'] = json.loads(record['filters'])
+        record['results'] = decode_payload(record.pop('result_payload'))
+        return record
+
+
+@st.cache_resource
+def get_analysis_repository():
+    """Process-wide repository (one connection pool)"""
+    return AnalysisRepository()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# DASHBOARD RESULTS
+# ═══════════════════════════════════════════════════════════════════
+
+def analysis_results(countries, indicator, year_range):
+    """The Dashboard's precomputed results for a config (stored with saved analyses)"""
+    from utils.analysis_cache import config_slice, country_correlation, latest_values
+
+    filters = (list(countries), indicator, tuple(year_range))
+    return {
+        'slice': config_slice(*filters),
+        'latest': latest_values(*filters),
+        'correlation': country_correlation(*filters),
+    }
+
+
+def share_analysis(config, name, email=None, description=''):
+    """Save a config with its results (under the user's email, else the guest account); returns a share id"""
+    from utils.loaders import data_version
+
+    repo = get_analysis_repository()
+    filters = {key: config[key] for key in ('countries', 'indicator', 'year_range', 'color_scale') if key in config}
+    results = analysis_results(config['countries'], config['indicator'], config['year_range'])
+    analysis_id = repo.save_analysis(repo.local_user_id(email or GUEST_EMAIL), name, filters, description,
+                                     results, data_version())
+    return repo.share(analysis_id)
+
+
+def open_shared_analysis(share_id):
+    """
+    Shared analysis for a share link, with results rendered from its stored
+    payload (rebuilt once if the dataset changed since). The view is counted
+    once per session. Returns None for unknown ids.
+    """
+    from utils.loaders import data_version
+
+    if not share_id:
+        return None
+    repo = get_analysis_repository()
+    counted = st.session_state.setdefault('_counted_shares', [])
+    shared = repo.open_share(share_id, count_view=share_id not in counted)
+    if shared is None:
+        return None
+    if share_id not in counted:
+        counted.append(share_id)
+
+    version = data_version()
+    if shared['results'] is None or shared['payload_version'] != version:
+        filters = shared['filters']
+        shared['results'] = analysis_results(filters['countries'], filters['indicator'], filters['year_range'])
+        repo.update_results(shared['analysis_id'], shared['results'], version)
+    return shared
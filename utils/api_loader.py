@@ -3,6 +3,9 @@ import pandas as pd
 import streamlit as st
 from functools import lru_cache
 
+from utils.persistent_cache import persistent_cache
+from utils.profiling import profiled
+
 class WorldBankAPILoader:
     """
     Dynamic data loader using the World Bank Open Data API
@@ -109,6 +112,7 @@ class WorldBankAPILoader:
         'logistics_performance': 'LP.LPI.OVRL.XQ'
     }
 
+    @profiled("worldbank.fetch")
     def _fetch_raw(self, indicator_code, countries=None, date_range="1960:2024"):
         """
         Private uncached method for fetching data.
@@ -150,6 +154,7 @@ class WorldBankAPILoader:
             return pd.DataFrame()
 
     @st.cache_data(ttl=86400)
+    @persistent_cache(ttl=86400, versioned=False, cache_if=lambda df: not df.empty)
     def fetch_indicator(_self, indicator_code, countries=None, date_range="1960:2024"):
         """
         Public cached method.
@@ -157,6 +162,7 @@ class WorldBankAPILoader:
         return _self._fetch_raw(indicator_code, countries, date_range)
 
     @st.cache_data(ttl=3600)
+    @profiled("worldbank.exchange_rates")
     def get_exchange_rates(_self, base_currency="USD"):
         """
         Fetch live exchange rates for South Asian currencies
@@ -172,6 +178,8 @@ class WorldBankAPILoader:
             return {"INR": 83.0, "BDT": 110.0, "PKR": 280.0, "LKR": 320.0, "NPR": 133.0}
 
     @st.cache_data(ttl=86400)
+    @persistent_cache(ttl=86400, versioned=False, cache_if=lambda summary: summary['indicators'] > 0)
+    @profiled("worldbank.api_summary")
     def get_api_summary_v2(_self):
         """
         Calculates total records available across all expanded indicators.
@@ -1,10 +1,7 @@
 import bcrypt
 import streamlit as st
-from pathlib import Path
-import sys
 
-sys.path.append(str(Path(__file__).parent))
-from database import db
+from utils.database import get_persistence
 
 def hash_password(password: str) -> str:
     """Hash password using bcrypt"""
@@ -15,9 +12,9 @@ def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 def register_user(email: str, password: str, name: str = "", organization: str = "", country: str = ""):
-    """Register new user using Supabase"""
-    client = db.get_client()
-    if not client:
+    """Register new user (Supabase, or the local SQLite stand-in)"""
+    store = get_persistence()
+    if not store.available:
         return False, "Database connection not available"
     
     try:
@@ -29,7 +26,7 @@ def register_user(email: str, password: str, name: str = "", organization: str =
             "organization": organization,
             "country": country
         }
-        client.table("users").insert(data).execute()
+        store.register_user(data)
         return True, "Registration successful!"
     except Exception as e:
         if "unique_violation" in str(e).lower() or "already exists" in str(e).lower():
@@ -37,14 +34,13 @@ def register_user(email: str, password: str, name: str = "", organization: str =
         return False, f"Registration failed: {str(e)}"
 
 def login_user(email: str, password: str):
-    """Authenticate user using Supabase"""
-    client = db.get_client()
-    if not client:
+    """Authenticate user (one lookup on the shared, already-connected backend)"""
+    store = get_persistence()
+    if not store.available:
         return False, None
     
     try:
-        response = client.table("users").select("user_id, email, password_hash, name").eq("email", email).execute()
-        user = response.data[0] if response.data else None
+        user = store.get_user(email)
         
         if user and verify_password(password, user['password_hash']):
             return True, {
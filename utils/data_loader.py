@@ -7,6 +7,43 @@ import pandas as pd
 from pathlib import Path
 from functools import lru_cache
 
+try:
+    from utils.profiling import profiled
+except ImportError:  # Run as a script: python utils/data_loader.py
+    from profiling import profiled
+
+
+# WID percentile groups that make up an income share table
+SHARE_GROUPS = ['p0p50', 'p50p90', 'p90p100', 'p99p100']
+
+# Curated-dataset equivalents, used when cleaned_wid_v2.csv is not available
+CURATED_SHARE_INDICATORS = {
+    'Bottom 50% Income Share': 'p0p50',
+    'Middle 40% Income Share': 'p50p90',
+    'Top 10% Income Share': 'p90p100',
+    'Top 1% Income Share': 'p99p100',
+    'Mean Income': 'mean_income'
+}
+
+
+def _finish_share_table(table):
+    table = table.reindex(columns=SHARE_GROUPS + ['mean_income'])
+    table.columns.name = None
+    return table.dropna(subset=SHARE_GROUPS, how='all').sort_index()
+
+
+def share_table_from_curated(df):
+    """
+    Pivot long-format curated rows (country, year, indicator, value) into an
+    income share table indexed by (Country, Year)
+    """
+    df = df[df['indicator'].isin(CURATED_SHARE_INDICATORS.keys())]
+    df = df.assign(column=df['indicator'].map(CURATED_SHARE_INDICATORS))
+    table = df.pivot_table(index=['country', 'year'], columns='column',
+                           values='value', aggfunc='first')
+    table.index.names = ['Country', 'Year']
+    return _finish_share_table(table)
+
 
 class SouthAsiaDataLoader:
     """
@@ -29,6 +66,7 @@ class SouthAsiaDataLoader:
             'wid_v2': 'cleaned_wid_v2.csv'
         }
     
+    @profiled()
     @lru_cache(maxsize=10)
     def load_education_data(self, country=None, year_range=None):
         """
@@ -50,6 +88,7 @@ class SouthAsiaDataLoader:
         
         return self._apply_filters(df, country, year_range)
     
+    @profiled()
     @lru_cache(maxsize=10)
     def load_jobs_data(self, country=None, year_range=None):
         """
@@ -71,6 +110,7 @@ class SouthAsiaDataLoader:
         
         return self._apply_filters(df, country, year_range)
     
+    @profiled()
     @lru_cache(maxsize=10)
     def load_wdi_data(self, country=None, year_range=None):
         """
@@ -92,6 +132,7 @@ class SouthAsiaDataLoader:
         
         return self._apply_filters(df, country, year_range)
     
+    @profiled()
     @lru_cache(maxsize=10)
     def load_inequality_data(self, country=None, year_range=None, percentile=None):
         """
@@ -122,6 +163,7 @@ class SouthAsiaDataLoader:
         
         return df
     
+    @profiled()
     @lru_cache(maxsize=10)
     def load_wid_v2_data(self, country=None, year_range=None, percentile=None, 
                          indicator_category=None, variable_code=None):
@@ -196,6 +238,40 @@ class SouthAsiaDataLoader:
         
         return df
     
+    # WID percentile groups used by the share-based distribution engines
+    SHARE_GROUPS = SHARE_GROUPS
+    
+    @profiled()
+    @lru_cache(maxsize=2)
+    def load_income_share_table(self):
+        """
+        Load WID pre-tax income shares as one row per country-year
+        
+        Reads the WID v2 extract (sptinc shares + aptinc p0p100 average) when
+        present, otherwise the same WID series from the curated dataset.
+        
+        Returns:
+        --------
+        pd.DataFrame indexed by (Country, Year) with columns:
+            - p0p50, p50p90, p90p100, p99p100: Income shares (fractions)
+            - mean_income: Average national income (may be NaN)
+        """
+        try:
+            df = self.load_wid_v2_data(percentile=tuple(self.SHARE_GROUPS + ['p0p100']))
+            shares = df[df['Variable_Code'].str.startswith('sptinc') & df['Percentile'].isin(self.SHARE_GROUPS)]
+            means = df[df['Variable_Code'].str.startswith('aptinc') & (df['Percentile'] == 'p0p100')]
+            # Prefer the equal-split adult series (j992) when several variants exist
+            shares = shares.sort_values('Variable_Code', key=lambda c: ~c.str.endswith('j992'))
+            means = means.sort_values('Variable_Code', key=lambda c: ~c.str.endswith('j992'))
+            table = shares.pivot_table(index=['Country', 'Year'], columns='Percentile',
+                                       values='Value', aggfunc='first')
+            table['mean_income'] = means.groupby(['Country', 'Year'])['Value'].first()
+        except FileNotFoundError:
+            curated_path = self.data_dir.parent / 'processed' / 'curated_indicators.csv'
+            return share_table_from_curated(pd.read_csv(curated_path))
+        
+        return _finish_share_table(table)
+    
     def _apply_filters(self, df, country=None, year_range=None):
         """Apply common filters to dataframe"""
         if country is not None:
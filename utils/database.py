@@ -1,33 +1,342 @@
+"""
+Persistence Layer
+Storage for user accounts and saved profile configurations.
+
+Backends (``PERSISTENCE_BACKEND`` environment variable):
+- ``supabase``: Supabase tables ``users`` / ``user_configs``; the client is
+  created on first use (never at import) and reused by every session
+- ``sqlite``:   local stand-in for offline and test runs (opt-in), over a
+  working copy in data/cache/ seeded from the schema of the shipped
+  data/inequality.db (``users`` etc., plus ``user_configs`` created on first
+  use); ``LOCAL_DB_PATH`` overrides the file. The tracked data/inequality.db
+  itself is only ever read.
+Default: Supabase (reported as unavailable when no credentials are configured).
+
+On top of the backend, ``Persistence`` keeps a TTL read cache of saved
+configs and saves profiles through a write-behind queue: the caller returns
+immediately and a background thread writes (with retries).
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
 import streamlit as st
-from supabase import create_client, Client
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+SCHEMA_DB_PATH = DATA_DIR / 'inequality.db'  # shipped, git-tracked: read only
+LOCAL_DB_PATH = DATA_DIR / 'cache' / 'inequality.db'  # working copy (git-ignored)
+CONFIG_CACHE_TTL = 300  # seconds
+WRITE_RETRIES = 3
+RETRY_BACKOFF = 0.5  # seconds, doubled per attempt
+
+
+_seed_lock = threading.Lock()
+
+
+def local_db_path(path=None):
+    """
+    Path of the local working database (``LOCAL_DB_PATH`` overrides),
+    created on first use with the tables of the shipped data/inequality.db
+    (schema only, no rows). Refuses the shipped file itself.
+    """
+    path = Path(path or os.environ.get('LOCAL_DB_PATH') or LOCAL_DB_PATH)
+    if path.resolve() == SCHEMA_DB_PATH.resolve():
+        raise ValueError(f"{SCHEMA_DB_PATH} is the tracked schema file; point LOCAL_DB_PATH at a working copy")
+    if not path.exists():
+        with _seed_lock:
+            if not path.exists():
+                _seed_schema(path)
+    return path
+
+
+def _seed_schema(path):
+    source = sqlite3.connect(f"file:{SCHEMA_DB_PATH}?mode=ro", uri=True)
+    try:
+        statements = [row[0] for row in source.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+            " ORDER BY type = 'index'")]  # tables before indexes
+    finally:
+        source.close()
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SUPABASE CLIENT
+# ═══════════════════════════════════════════════════════════════════
+
+def supabase_credentials():
+    """(url, key) from Streamlit secrets or the environment, (None, None) if missing"""
+    try:
+        if "supabase" in st.secrets:
+            return st.secrets["supabase"]["url"], st.secrets["supabase"]["key"]
+    except Exception:
+        pass  # No secrets file
+    return os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+
 
 class SupabaseDB:
+    """
+    Supabase client created on first use and reused (thread-safe).
+    Initialisation is attempted once per process: missing credentials or a
+    failed connection leave ``client`` as None until restart.
+    """
+
     def __init__(self):
         self.client = None
-        self._init_client()
+        self._initialized = False
+        self._lock = threading.Lock()
 
     def _init_client(self):
-        import os
         try:
-            # Try Streamlit secrets first
-            if "supabase" in st.secrets:
-                url = st.secrets["supabase"]["url"]
-                key = st.secrets["supabase"]["key"]
-            else:
-                # Fallback to Environment Variables (common in Render/Docker)
-                url = os.environ.get("SUPABASE_URL")
-                key = os.environ.get("SUPABASE_KEY")
-            
+            url, key = supabase_credentials()
             if url and key:
+                from supabase import create_client
                 self.client = create_client(url, key)
             else:
-                print("Supabase credentials not found in secrets or environment variables.")
+                logger.info("Supabase credentials not found in secrets or environment variables.")
         except Exception as e:
-            print(f"Failed to initialize Supabase client: {e}")
+            logger.warning("Failed to initialize Supabase client: %s", e)
 
-    def get_client(self) -> Client:
-        if not self.client:
-            self._init_client()
+    def get_client(self):
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._init_client()
+                    self._initialized = True
         return self.client
 
 db = SupabaseDB()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BACKENDS
+# ═══════════════════════════════════════════════════════════════════
+
+class SupabaseBackend:
+    """users / user_configs tables in Supabase"""
+
+    name = 'supabase'
+
+    def __init__(self, database=db):
+        self.database = database
+
+    @property
+    def available(self):
+        return self.database.get_client() is not None
+
+    def get_config(self, email):
+        response = self.database.get_client().table("user_configs").select("config").eq("email", email).execute()
+        return response.data[0]['config'] if response.data else None
+
+    def save_profile(self, row):
+        self.database.get_client().table("user_configs").upsert(row).execute()
+
+    def get_user(self, email):
+        response = self.database.get_client().table("users").select(
+            "user_id, email, password_hash, name").eq("email", email).execute()
+        return response.data[0] if response.data else None
+
+    def insert_user(self, row):
+        self.database.get_client().table("users").insert(row).execute()
+
+
+class SQLiteBackend:
+    """
+    Local stand-in over a working copy of the data/inequality.db schema. One
+    connection per thread, WAL mode so the write-behind thread does not block
+    readers.
+    """
+
+    name = 'sqlite'
+    available = True
+
+    def __init__(self, path=None):
+        self.path = local_db_path(path)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " user_id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE NOT NULL,"
+            " password_hash TEXT NOT NULL, name TEXT, organization TEXT, country TEXT,"
+            " created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_configs ("
+            " email TEXT PRIMARY KEY, age_group TEXT, occupation TEXT,"
+            " config TEXT NOT NULL, last_updated TEXT)"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_config(self, email):
+        row = self._connection().execute(
+            "SELECT config FROM user_configs WHERE email = ?", (email,)).fetchone()
+        return json.loads(row['config']) if row else None
+
+    def save_profile(self, row):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO user_configs (email, age_group, occupation, config, last_updated)"
+            " VALUES (:email, :age_group, :occupation, :config, :last_updated)",
+            {**row, 'config': json.dumps(row['config'])}
+        )
+
+    def get_user(self, email):
+        row = self._connection().execute(
+            "SELECT user_id, email, password_hash, name FROM users WHERE email = ?", (email,)).fetchone()
+        return dict(row) if row else None
+
+    def insert_user(self, row):
+        try:
+            self._connection().execute(
+                "INSERT INTO users (email, password_hash, name, organization, country)"
+                " VALUES (:email, :password_hash, :name, :organization, :country)", row)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Email already exists ({e})") from e
+
+
+# ═══════════════════════════════════════════════════════════════════
+# READ CACHE + WRITE-BEHIND QUEUE
+# ═══════════════════════════════════════════════════════════════════
+
+class TTLCache:
+    """Small thread-safe key -> value cache with per-entry expiry"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self._entries.pop(key, None)
+                return default
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+
+class WriteBehindQueue:
+    """
+    Background writer: jobs run in order on one daemon thread, each retried
+    with exponential backoff before it is dropped (and logged).
+    """
+
+    def __init__(self, retries=WRITE_RETRIES, backoff=RETRY_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args):
+        self._queue.put((func, args))
+
+    def flush(self, timeout=None):
+        """Wait until every queued job has been written (or given up); True if drained"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        while True:
+            func, args = self._queue.get()
+            try:
+                for attempt in range(self.retries + 1):
+                    try:
+                        func(*args)
+                        break
+                    except Exception as e:
+                        if attempt == self.retries:
+                            self.failed += 1
+                            logger.warning("Write-behind gave up after %d attempts: %s", attempt + 1, e)
+                        else:
+                            time.sleep(self.backoff * 2 ** attempt)
+            finally:
+                self._queue.task_done()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PERSISTENCE
+# ═══════════════════════════════════════════════════════════════════
+
+class Persistence:
+    """Backend + config read cache + write-behind saves"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.configs = TTLCache(CONFIG_CACHE_TTL)  # email -> config JSON
+        self.writer = WriteBehindQueue()
+
+    @property
+    def available(self):
+        return self.backend.available
+
+    def get_user_config(self, email):
+        """Saved config for an email (cached for CONFIG_CACHE_TTL seconds; a fresh copy per call)"""
+        cached = self.configs.get(email)
+        if cached is None:
+            config = self.backend.get_config(email)
+            if config is None:
+                return None
+            cached = json.dumps(config)
+            self.configs.set(email, cached)
+        return json.loads(cached)
+
+    def save_user_profile(self, row):
+        """Queue a profile upsert; the cache is updated at once so reads see it"""
+        self.configs.set(row['email'], json.dumps(row['config']))
+        self.writer.submit(self.backend.save_profile, row)
+
+    def get_user(self, email):
+        return self.backend.get_user(email)
+
+    def register_user(self, row):
+        """Insert a user synchronously (the caller needs the uniqueness result)"""
+        self.backend.insert_user(row)
+
+
+def default_backend():
+    """SQLite only when PERSISTENCE_BACKEND=sqlite; Supabase otherwise"""
+    name = os.environ.get('PERSISTENCE_BACKEND', '').lower()
+    return SQLiteBackend() if name == 'sqlite' else SupabaseBackend()
+
+
+@st.cache_resource
+def get_persistence():
+    """Process-wide persistence layer (one backend, cache and writer thread)"""
+    return Persistence(default_backend())
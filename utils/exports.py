@@ -1,103 +1,72 @@
 import streamlit as st
 import pandas as pd
-import io
-import json
+
+from utils.image_renderer import get_image_renderer, IMAGE_MIME_TYPES
+from utils.table_export import TABLE_FORMATS, export_table, table_download_button
 
 def get_table_download_link(df, filename, format):
-    """Generates a link to download the dataframe in the specified format"""
-    output = io.BytesIO()
-    
-    if format == 'CSV':
-        df.to_csv(output, index=False)
-        mime = "text/csv"
-        ext = "csv"
-    elif format == 'Excel':
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Data')
-        mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        ext = "xlsx"
-    elif format == 'JSON':
-        df_json = df.to_json(orient="records", indent=4)
-        output.write(df_json.encode())
-        mime = "application/json"
-        ext = "json"
-    
-    return output.getvalue(), mime, f"{filename}.{ext}"
+    """Generates bytes for downloading the dataframe in the specified format"""
+    ext, mime = TABLE_FORMATS[format]
+    return export_table(df, format), mime, f"{filename}.{ext}"
 
-@st.cache_data(show_spinner="Generating image...")
 def get_plot_download_link(fig_json, filename, format):
     """Generates bytes for downloading the plotly figure in the specified format"""
-    import plotly.io as pio
-    import json
-    
-    # Load figure from JSON string (easier to hash)
-    fig = pio.from_json(fig_json)
-    
+    renderer = get_image_renderer()
     try:
-        # Plotly's to_image requires kaleido
-        img_bytes = fig.to_image(format=format.lower(), scale=2)
-        
-        if format == 'PNG':
-            mime = "image/png"
-        elif format == 'JPG':
-            mime = "image/jpeg"
-        elif format == 'SVG':
-            mime = "image/svg+xml"
-        elif format == 'PDF':
-            mime = "application/pdf"
-        
-        return img_bytes, mime, f"{filename}.{format.lower()}"
+        # Rendered by the shared kaleido worker; cached by figure hash
+        img_bytes = renderer.render(fig_json, format, scale=2)
+        return img_bytes, IMAGE_MIME_TYPES[format.lower()], f"{filename}.{format.lower()}"
     except Exception as e:
         return None, None, str(e)
 
+def image_download_buttons(fig, filename, formats=('PNG', 'JPG', 'JPEG'), width=None, height=None,
+                           scale=1, key=None, columns=None):
+    """
+    Renders one download button per image format. Images are rendered only
+    when a button is clicked (deferred download data), never on rerun.
+    """
+    renderer = get_image_renderer()
+    # Click-time render failures of this session, keyed per button; shown on the next rerun
+    failures = st.session_state.setdefault('_image_export_failures', {})
+    targets = columns or [st] * len(formats)
+    for fmt, target in zip(formats, targets):
+        btn_key = f"{key}_{fmt.lower()}" if key else None
+        if not renderer.available:
+            target.button(fmt, disabled=True, key=btn_key, help=renderer.error,
+                          use_container_width=True)
+            continue
+        failure_key = btn_key or f"{filename}.{fmt.lower()}"
+        if failure_key in failures:
+            st.error(f"⚠️ {fmt}: {failures.pop(failure_key)}")
+        target.download_button(
+            fmt,
+            renderer.deferred(fig, fmt, width=width, height=height, scale=scale,
+                              on_error=lambda message, k=failure_key: failures.__setitem__(k, message)),
+            f"{filename}.{fmt.lower()}",
+            IMAGE_MIME_TYPES[fmt.lower()],
+            key=btn_key,
+            on_click="ignore",
+            use_container_width=True
+        )
+
 def export_data_menu(df, filename="data_export", key=None):
-    """Renders a download menu for dataframes"""
+    """Renders a download menu for dataframes (files are generated on click)"""
     with st.popover("📥 Export Data", use_container_width=True):
         st.write("Choose format:")
-        col1, col2, col3 = st.columns(3)
+        cols = st.columns(3) + st.columns(3)
         
-        # CSV
-        data, mime, fname = get_table_download_link(df, filename, 'CSV')
-        col1.download_button("CSV", data, fname, mime, key=f"{key}_csv" if key else None, use_container_width=True)
-        
-        # Excel
-        data, mime, fname = get_table_download_link(df, filename, 'Excel')
-        col2.download_button("Excel", data, fname, mime, key=f"{key}_xlsx" if key else None, use_container_width=True)
-        
-        # JSON
-        data, mime, fname = get_table_download_link(df, filename, 'JSON')
-        col3.download_button("JSON", data, fname, mime, key=f"{key}_json" if key else None, use_container_width=True)
+        # Nothing is serialized here; each format is built (and cached) on click
+        for fmt, col in zip(TABLE_FORMATS, cols):
+            ext = TABLE_FORMATS[fmt][0]
+            table_download_button(df, filename, fmt, key=f"{key}_{ext}" if key else None, target=col)
 
 def export_plot_menu(fig, filename="plot_export", key=None):
     """Renders a download menu for Plotly figures with a downarrow icon"""
     with st.popover("🔽 Download Plot", use_container_width=True):
         st.write("Choose image format:")
-        
-        # Convert to JSON for caching
-        try:
-            fig_json = fig.to_json()
-        except:
-            st.error("Could not process plot for download.")
-            return
-            
         col1, col2 = st.columns(2)
         col3, col4 = st.columns(2)
         
         # Common formats supported by Kaleido
-        formats = ['PNG', 'JPG', 'SVG', 'PDF']
-        
-        for i, fmt in enumerate(formats):
-            target_col = [col1, col2, col3, col4][i]
-            data, mime, fname = get_plot_download_link(fig_json, filename, fmt)
-            
-            if data:
-                target_col.download_button(
-                    label=f"📥 {fmt}",
-                    data=data,
-                    file_name=fname,
-                    mime=mime,
-                    key=f"{key}_{fmt.lower()}" if key else None,
-                    use_container_width=True
-                )
-            else:
-                target_col.error(f"Failed {fmt}")
+        image_download_buttons(fig, filename, formats=('PNG', 'JPG', 'SVG', 'PDF'), scale=2,
+                               key=key, columns=[col1, col2, col3, col4])
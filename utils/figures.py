@@ -0,0 +1,177 @@
+"""
+Figure Factory
+Shared Plotly styling and trace building for the pages' charts.
+
+- Themes are registered once as Plotly templates (``sai_dark``). Streamlit
+  swaps the template layout for its own chart theme in the browser, so
+  ``themed_layout`` writes the template's layout onto each figure explicitly
+  instead of referencing it by name.
+- ``country_traces`` builds one trace per country from a single grouped pass
+  (rows are split once) instead of filtering the frame per country.
+- ``cached_figure`` keeps the JSON of built figures keyed by (slice, chart
+  type, theme, dataset version), so identical charts are not rebuilt on
+  every rerun.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+GRID_COLOR = 'rgba(100, 116, 139, 0.2)'
+AXIS_COLOR = '#94a3b8'
+TEXT_COLOR = '#e2e8f0'
+
+COUNTRY_HOVER = '<b>%{fullData.name}</b><br>Year: %{x}<br>Value: %{y:.2f}<extra></extra>'
+
+# theme -> (template name, template layout)
+THEMES = {
+    'dark': ('sai_dark', dict(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(color=TEXT_COLOR, size=12),
+        xaxis=dict(showgrid=True, gridcolor=GRID_COLOR, color=AXIS_COLOR),
+        yaxis=dict(showgrid=True, gridcolor=GRID_COLOR, color=AXIS_COLOR),
+        legend=dict(bgcolor='rgba(0,0,0,0)', font=dict(color=TEXT_COLOR, size=11)),
+    )),
+}
+
+for _name, _layout in THEMES.values():
+    pio.templates[_name] = go.layout.Template(layout=_layout)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LAYOUT
+# ═══════════════════════════════════════════════════════════════════
+
+def _merge(base, overrides):
+    """Recursive dict merge (overrides win; nested dicts are merged)"""
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def themed_layout(theme='dark', **overrides):
+    """Layout dict of a registered theme with per-chart overrides merged in"""
+    name, _ = THEMES[theme]
+    return _merge(pio.templates[name].layout.to_plotly_json(), overrides)
+
+
+def new_figure(traces=(), theme='dark', **layout):
+    """go.Figure with the given traces and the theme's layout (plus overrides)"""
+    return go.Figure(data=list(traces), layout=themed_layout(theme, **layout))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TRACES
+# ═══════════════════════════════════════════════════════════════════
+
+def country_traces(df, colors, x='year', y='value', group='country', order=None,
+                   style=None, **trace_kwargs):
+    """
+    One go.Scatter per group (named and legend-grouped by it), from a single
+    grouped pass over df.
+
+    Args:
+        df: Long-format rows
+        colors: {group: color}, or a list cycled over the trace order
+        order: Groups in trace order (default: order of first appearance);
+            groups without rows are skipped
+        style: Optional callable (position, group, color) -> extra Scatter
+            kwargs for that trace (e.g. fill or marker settings)
+        trace_kwargs: Scatter kwargs shared by every trace (mode, line, ...);
+            ``line`` is merged with the trace colour
+
+    Returns:
+        list of go.Scatter (x ascending within each trace)
+    """
+    codes, groups = pd.factorize(df[group], sort=False)
+    xs, ys = df[x].to_numpy(), df[y].to_numpy()
+    rows = np.lexsort((xs, codes))
+    bounds = np.searchsorted(codes[rows], np.arange(len(groups) + 1))
+    position = {name: k for k, name in enumerate(groups)}
+
+    line = trace_kwargs.pop('line', {})
+    trace_kwargs.setdefault('hovertemplate', COUNTRY_HOVER)
+    traces = []
+    for i, name in enumerate(groups if order is None else order):
+        k = position.get(name)
+        if k is None or bounds[k] == bounds[k + 1]:
+            continue
+        take = rows[bounds[k]:bounds[k + 1]]
+        color = colors.get(name) if isinstance(colors, dict) else colors[i % len(colors)]
+        traces.append(go.Scatter(
+            x=xs[take], y=ys[take], name=name, legendgroup=name,
+            line={**line, 'color': color},
+            **trace_kwargs,
+            **(style(i, name, color) if style else {})
+        ))
+    return traces
+
+
+# ═══════════════════════════════════════════════════════════════════
+# FIGURE CACHE
+# ═══════════════════════════════════════════════════════════════════
+
+class FigureCache:
+    """Thread-safe LRU of figure JSON keyed by (slice, chart type, theme, dataset version)"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(chart, slice_key, theme):
+        from utils.loaders import data_version
+        payload = repr((chart, slice_key, theme, data_version()))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_json(self, build, chart, slice_key, theme='dark'):
+        """Figure JSON for the key; build() -> go.Figure runs only on a miss"""
+        key = self.key(chart, slice_key, theme)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        payload = build().to_json()
+        with self._lock:
+            self._entries[key] = payload
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+
+@st.cache_resource
+def get_figure_cache():
+    """Process-wide figure cache"""
+    return FigureCache()
+
+
+def cached_figure(build, chart, slice_key, theme='dark'):
+    """
+    Figure for (chart, slice_key, theme), built once per dataset version.
+
+    Args:
+        build: Zero-argument callable returning the go.Figure
+        chart: Chart type name (e.g. 'country_lines')
+        slice_key: Hashable description of everything the chart depends on
+            (countries, indicator, years, labels, ...)
+        theme: Key of THEMES
+
+    Returns:
+        go.Figure rebuilt from the cached JSON (safe to modify)
+    """
+    payload = get_figure_cache().get_json(build, chart, slice_key, theme)
+    return go.Figure(json.loads(payload))
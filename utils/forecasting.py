@@ -0,0 +1,389 @@
+"""
+Forecasting Engine
+Batch projections for every (country, indicator) series of the curated dataset.
+
+Each annual series is fitted with lightweight statsmodels models
+- ETS: simple exponential smoothing (additive errors)
+- Damped trend: additive damped-trend ETS
+- ARIMA: automatic order (d from a KPSS test, then the lowest AICc over a
+  small (p, q) grid)
+Likelihoods are not comparable across these families, so the model is chosen
+by its error on the last observed years (each family fitted without them);
+the winner is then refitted on the full series and supplies the projection
+and its prediction interval. A series that mixes sources (which may differ in
+scale, e.g. World Bank 0-100 vs WID 0-1 Gini) is fitted on the observations
+from the source of its latest one only.
+
+Fitting runs offline (scripts/build_forecasts.py, parallel across cores) and
+is stored as a versioned artifact, data/processed/forecasts.csv, tagged with
+a digest of the curated dataset. Pages only read it (``load_forecasts``), so
+nothing is fitted at request time.
+"""
+
+import hashlib
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.loaders import PROCESSED_DIR, data_version
+
+FORECASTS_PATH = PROCESSED_DIR / "forecasts.csv"
+CURATED_PATH = PROCESSED_DIR / "curated_indicators.csv"
+
+DEFAULT_HORIZON = 6          # Years projected past each series' last observation
+DEFAULT_COVERAGE = 0.95      # Prediction interval coverage
+MIN_OBSERVATIONS = 8         # Shorter series are not projected
+ARIMA_GRID = [(0, 0), (1, 0), (0, 1), (1, 1)]
+HOLDOUT_YEARS = 3           # Years held back to choose between model families
+
+FORECAST_COLUMNS = ['country', 'country_code', 'indicator', 'year', 'forecast', 'lower', 'upper',
+                    'model', 'last_observed_year']
+
+
+# ═══════════════════════════════════════════════════════════════════
+# MODELS
+# ═══════════════════════════════════════════════════════════════════
+
+def _ets(y, horizon, alpha, damped=False):
+    from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+
+    model = ETSModel(y, error='add', trend='add' if damped else None, damped_trend=damped)
+    res = model.fit(disp=False)
+    frame = res.get_prediction(start=len(y), end=len(y) + horizon - 1).summary_frame(alpha=alpha)
+    label = 'Damped trend' if damped else 'ETS'
+    return frame['mean'].to_numpy(), frame['pi_lower'].to_numpy(), frame['pi_upper'].to_numpy(), label
+
+
+def _differencing_order(y):
+    """1 if a KPSS test rejects level stationarity at 5%, else 0"""
+    from statsmodels.tsa.stattools import kpss
+
+    try:
+        _, p_value, _, _ = kpss(y, regression='c', nlags='auto')
+    except (ValueError, OverflowError):
+        return 1
+    return int(p_value < 0.05)
+
+
+def _arima(y, horizon, alpha):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    d = _differencing_order(y)
+    best = None
+    for p, q in ARIMA_GRID:
+        try:
+            res = ARIMA(y, order=(p, d, q), trend='c' if d == 0 else 't').fit()
+        except (ValueError, np.linalg.LinAlgError):
+            continue
+        if np.isfinite(res.aicc) and (best is None or res.aicc < best[0]):
+            best = (res.aicc, res, (p, d, q))
+    if best is None:
+        raise ValueError("no ARIMA order converged")
+    _, res, order = best
+    frame = res.get_forecast(horizon).summary_frame(alpha=alpha)
+    return (frame['mean'].to_numpy(), frame['mean_ci_lower'].to_numpy(),
+            frame['mean_ci_upper'].to_numpy(), f"ARIMA{order}")
+
+
+def _import_statsmodels():
+    """Import the model modules up front: statsmodels registers 'always' warning filters on import"""
+    import statsmodels.tsa.arima.model  # noqa: F401
+    import statsmodels.tsa.exponential_smoothing.ets  # noqa: F401
+    import statsmodels.tsa.stattools  # noqa: F401
+
+
+MODELS = {
+    'ETS': lambda y, horizon, alpha: _ets(y, horizon, alpha),
+    'Damped trend': lambda y, horizon, alpha: _ets(y, horizon, alpha, damped=True),
+    'ARIMA': _arima,
+}
+
+
+def fit_series(years, values, horizon=DEFAULT_HORIZON, coverage=DEFAULT_COVERAGE, upper_bound=None):
+    """
+    Project one annual series with the model family that best predicts its
+    last HOLDOUT_YEARS observations.
+
+    Interior gaps are filled by linear interpolation before fitting.
+
+    Args:
+        years, values: Observations (years ascending, one value per year)
+        horizon: Years to project past the last observation
+        coverage: Prediction interval coverage
+        upper_bound: Optional cap for projections and intervals (e.g. 100 for shares)
+
+    Returns:
+        dict with years, forecast, lower, upper (arrays) and model, or None
+        when the series is too short or no model fits
+    """
+    years = np.asarray(years, dtype=int)
+    values = np.asarray(values, dtype=float)
+    if len(years) < MIN_OBSERVATIONS or np.ptp(values) == 0:
+        return None
+
+    grid = np.arange(years[0], years[-1] + 1)
+    y = pd.Series(np.interp(grid, years, values), index=pd.period_range(str(years[0]), periods=len(grid), freq='Y'))
+    alpha = 1 - coverage
+    train, test = y[:-HOLDOUT_YEARS], y[-HOLDOUT_YEARS:]
+
+    with warnings.catch_warnings():
+        _import_statsmodels()
+        warnings.simplefilter('ignore')
+        errors = {}
+        for name, fit in MODELS.items():
+            try:
+                mean = fit(train, HOLDOUT_YEARS, alpha)[0]
+            except Exception:
+                continue
+            if np.isfinite(mean).all():
+                errors[name] = np.abs(mean - test.to_numpy()).mean()
+
+        result = None
+        for name in sorted(errors, key=errors.get):
+            try:
+                mean, lower, upper, label = MODELS[name](y, horizon, alpha)
+            except Exception:
+                continue
+            if np.isfinite(mean).all():
+                result = (mean, lower, upper, label)
+                break
+    if result is None:
+        return None
+
+    mean, lower, upper, label = result
+    if values.min() >= 0:
+        # Non-negative quantities (shares, rates, levels) stay non-negative
+        mean, lower, upper = np.maximum(mean, 0), np.maximum(lower, 0), np.maximum(upper, 0)
+    if upper_bound is not None:
+        mean, lower, upper = np.minimum(mean, upper_bound), np.minimum(lower, upper_bound), np.minimum(upper, upper_bound)
+    return {
+        'years': np.arange(years[-1] + 1, years[-1] + 1 + horizon),
+        'forecast': mean,
+        'lower': lower,
+        'upper': upper,
+        'model': label,
+    }
+
+
+def _fit_batch(batch, horizon, coverage):
+    """Fit a list of (country, country_code, indicator, years, values); returns forecast rows"""
+    rows = []
+    for country, code, indicator, years, values in batch:
+        # "% of ..." indicators are shares of a whole
+        upper_bound = 100 if '% of' in indicator and values.max() <= 100 else None
+        result = fit_series(years, values, horizon, coverage, upper_bound)
+        if result is None:
+            continue
+        for year, mean, lower, upper in zip(result['years'], result['forecast'], result['lower'], result['upper']):
+            rows.append((country, code, indicator, int(year), float(mean), float(lower), float(upper),
+                         result['model'], int(years[-1])))
+    return rows
+
+
+def forecast_all(df, horizon=DEFAULT_HORIZON, coverage=DEFAULT_COVERAGE, workers=None):
+    """
+    Project every (country, indicator) series of a long-format frame.
+
+    Args:
+        df: Long-format data with country, country_code, indicator, year, value
+            and optionally source (each series is then fitted on the source of
+            its latest observation)
+        horizon, coverage: See fit_series
+        workers: Processes to fit in (default: all cores; 1 fits in-process)
+
+    Returns:
+        DataFrame with FORECAST_COLUMNS
+    """
+    rows = df.dropna(subset=['value'])
+    if 'source' in rows.columns:
+        rows = rows.sort_values(['year', 'source'])
+        rows = rows[rows['source'] == rows.groupby(['country', 'indicator'])['source'].transform('last')]
+    series = (rows
+              .groupby(['country', 'country_code', 'indicator', 'year'], sort=True)['value'].mean()
+              .reset_index())
+    tasks = [
+        (country, code, indicator, group['year'].to_numpy(), group['value'].to_numpy())
+        for (country, code, indicator), group in series.groupby(['country', 'country_code', 'indicator'], sort=True)
+        if len(group) >= MIN_OBSERVATIONS
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        rows = _fit_batch(tasks, horizon, coverage)
+    else:
+        # Interleaved batches balance long and short series across processes
+        batches = [tasks[i::workers * 4] for i in range(workers * 4)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = pool.map(_fit_batch, batches, [horizon] * len(batches), [coverage] * len(batches))
+            rows = [row for part in parts for row in part]
+
+    return pd.DataFrame(rows, columns=FORECAST_COLUMNS).sort_values(
+        ['indicator', 'country', 'year']).reset_index(drop=True)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ARTIFACT
+# ═══════════════════════════════════════════════════════════════════
+
+def dataset_digest(path=CURATED_PATH):
+    """Content digest of the curated dataset (stable across checkouts, unlike its mtime)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def write_artifact(frame, metadata, path, float_format='%.6g'):
+    """Write a processed-data artifact: '# key: value' metadata lines followed by the CSV"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', newline='') as f:
+        for key, value in metadata.items():
+            f.write(f"# {key}: {value}\n")
+        frame.to_csv(f, index=False, float_format=float_format)
+    os.replace(tmp, path)
+
+
+def read_artifact_metadata(path):
+    """An artifact's metadata lines as a dict ({} when it does not exist)"""
+    metadata = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                if not line.startswith('# '):
+                    break
+                key, _, value = line[2:].rstrip('\n').partition(': ')
+                metadata[key] = value
+    except FileNotFoundError:
+        pass
+    return metadata
+
+
+def artifact_version(path):
+    """Cache key for an artifact file (None when it does not exist)"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def write_forecasts(forecasts, source_digest, horizon, coverage, path=FORECASTS_PATH):
+    """Write the forecast artifact, tagged with the dataset digest and settings"""
+    write_artifact(forecasts, {
+        'source_digest': source_digest,
+        'built': datetime.now().isoformat(timespec='seconds'),
+        'horizon': horizon,
+        'coverage': coverage,
+        'models': 'ETS, Damped trend, ARIMA (chosen by holdout error)',
+        'series': forecasts.groupby(['country', 'indicator']).ngroups,
+    }, path)
+
+
+@st.cache_resource(max_entries=2)
+def _load_forecasts(version, file_version):
+    metadata = read_artifact_metadata(FORECASTS_PATH)
+    if not metadata:
+        return pd.DataFrame(columns=FORECAST_COLUMNS), metadata
+    metadata['stale'] = metadata.get('source_digest') != dataset_digest()
+    forecasts = pd.read_csv(FORECASTS_PATH, comment='#')
+    return forecasts, metadata
+
+
+def load_forecasts():
+    """
+    Projections for the current dataset version.
+
+    Returns:
+        (forecasts, metadata): forecasts has FORECAST_COLUMNS (empty when the
+        artifact has not been built); metadata holds the artifact's build
+        details plus 'stale' (True when it was built from an older dataset)
+    """
+    return _load_forecasts(data_version(), artifact_version(FORECASTS_PATH))
+
+
+def series_forecast(indicator, countries=None):
+    """Projection rows for one indicator, optionally limited to countries (names)"""
+    forecasts, _ = load_forecasts()
+    rows = forecasts[forecasts['indicator'] == indicator]
+    if countries is not None:
+        rows = rows[rows['country'].isin(countries)]
+    return rows
+
+
+def projection_caption(projections):
+    """One-line description of the projections shown (models, interval, fit cut-off)"""
+    _, metadata = load_forecasts()
+    models = ", ".join(sorted(projections['model'].str.split('(').str[0].unique()))
+    coverage = float(metadata.get('coverage', DEFAULT_COVERAGE))
+    first, last = int(projections['last_observed_year'].min()), int(projections['last_observed_year'].max())
+    observed = str(last) if first == last else f"{first}–{last}"
+    caption = (f"Dashed lines: model projections ({models}) from each country's last observation "
+               f"({observed}); shaded: {coverage:.0%} prediction intervals.")
+    if metadata.get('stale'):
+        caption += " ⚠️ Built from an earlier version of the dataset; rerun scripts/build_forecasts.py."
+    return caption
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PLOT OVERLAY
+# ═══════════════════════════════════════════════════════════════════
+
+def _rgba(hex_color, alpha):
+    hex_color = hex_color.lstrip('#')
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+    return f'rgba({r}, {g}, {b}, {alpha})'
+
+
+def add_projection_traces(fig, projections, colors, observed=None, band=True):
+    """
+    Overlay projections on a Plotly figure: a dashed line per country plus its
+    shaded prediction interval.
+
+    Args:
+        fig: go.Figure to add traces to
+        projections: Rows from series_forecast
+        colors: {country: '#rrggbb'} (countries without a color are skipped)
+        observed: Optional long-format observations (country, year, value); the
+            dashed line then starts at each country's last observed point
+        band: Draw the prediction interval
+    """
+    import plotly.graph_objects as go
+
+    for country, rows in projections.groupby('country', sort=False):
+        color = colors.get(country)
+        if color is None:
+            continue
+        years = rows['year'].tolist()
+        values = rows['forecast'].tolist()
+        if observed is not None:
+            history = observed[observed['country'] == country].dropna(subset=['value'])
+            if not history.empty:
+                last = history.loc[history['year'].idxmax()]
+                years, values = [int(last['year'])] + years, [float(last['value'])] + values
+
+        if band:
+            fig.add_trace(go.Scatter(
+                x=list(rows['year']) + list(rows['year'])[::-1],
+                y=list(rows['upper']) + list(rows['lower'])[::-1],
+                fill='toself',
+                fillcolor=_rgba(color, 0.15),
+                line=dict(width=0),
+                hoverinfo='skip',
+                showlegend=False,
+                legendgroup=country,
+            ))
+        fig.add_trace(go.Scatter(
+            x=years,
+            y=values,
+            mode='lines',
+            name=f"{country} (projected)",
+            line=dict(color=color, width=2, dash='dash'),
+            legendgroup=country,
+            hovertemplate='<b>%{fullData.name}</b><br>Year: %{x}<br>Projected: %{y:.2f}<extra></extra>',
+        ))
@@ -0,0 +1,191 @@
+"""
+Chart Image Renderer
+Long-lived kaleido worker for on-demand Plotly image export.
+
+Static image export is expensive: every cold ``fig.to_image`` call starts a
+headless browser and rasterizes the figure, which used to happen on every
+rerun for every download button. The renderer instead
+
+- starts kaleido once per process (its persistent sync server when available),
+- renders only when a download is actually requested, on a single worker thread,
+- caches the bytes by a hash of the figure JSON + output options.
+
+Availability is probed once per process with a tiny test render (kaleido may
+be installed without a usable browser), in the background so no page waits on
+it. A failed on-demand render is reported for that download only; a render
+that times out has its stuck worker replaced.
+"""
+
+import hashlib
+import importlib.util
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import streamlit as st
+
+from utils.profiling import stage
+
+logger = logging.getLogger(__name__)
+
+_PROBE_FIGURE = '{"data": [], "layout": {}}'
+
+IMAGE_MIME_TYPES = {
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+    'jpg': 'image/jpeg',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+
+class ImageRenderer:
+    """
+    Renders Plotly figures to image bytes through one persistent kaleido worker.
+    Thread-safe; results are kept in an LRU cache keyed by figure hash.
+    """
+
+    def __init__(self, max_cached=64, timeout=60):
+        self.max_cached = max_cached
+        self.timeout = timeout
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # kaleido is not thread-safe; a single worker serializes all renders
+        self._executor = self._new_worker()
+        self._server_started = False
+        self.error = None  # reason the renderer is unavailable
+
+        # Startup probe: a 1x1 render queued on the worker; read by `available`
+        self._available = None
+        self._probe_started = time.monotonic()
+        self._probe = None
+        if importlib.util.find_spec('kaleido') is None:
+            self._set_unavailable("Install kaleido for image export")
+        else:
+            self._probe = self._executor.submit(self._render, _PROBE_FIGURE, 'png', 1, 1, 1)
+
+    @staticmethod
+    def _new_worker():
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix='kaleido')
+
+    def _set_unavailable(self, error):
+        self.error = error
+        self._available = False
+        logger.warning(error)
+
+    @property
+    def available(self):
+        """
+        True once the startup probe render has succeeded. Never blocks: False
+        (with ``error`` explaining why) while the probe is still running.
+        """
+        if self._available is None:
+            probe = self._probe
+            if probe.done():
+                try:
+                    probe.result()
+                    self._available, self.error = True, None
+                except Exception as e:
+                    self._set_unavailable(f"Image export unavailable: {e}")
+            elif time.monotonic() - self._probe_started > self.timeout:
+                self._set_unavailable(f"Image export unavailable: test render took over {self.timeout}s")
+                self._recycle_worker()
+            else:
+                self.error = "Image export is starting up; try again in a moment"
+                return False
+        return self._available
+
+    def _recycle_worker(self):
+        """Replace a worker stuck in a render (the stuck thread is abandoned, not joined)"""
+        with self._lock:
+            stuck, self._executor = self._executor, self._new_worker()
+            self._server_started = False
+        stuck.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def cache_key(fig_json, fmt, width=None, height=None, scale=1):
+        payload = f"{fmt}|{width}|{height}|{scale}|".encode() + fig_json.encode()
+        return hashlib.sha256(payload).hexdigest()
+
+    def _start_server(self):
+        """Start kaleido's persistent browser once (kaleido >= 1.0; older versions persist by default)"""
+        if self._server_started:
+            return
+        import kaleido
+        start = getattr(kaleido, 'start_sync_server', None)
+        if start is not None:
+            try:
+                start(silence_warnings=True)
+            except RuntimeError:
+                pass  # Already running (e.g. started by another session)
+        self._server_started = True
+
+    def _render(self, fig_json, fmt, width, height, scale):
+        import plotly.io as pio
+        self._start_server()
+        fig = pio.from_json(fig_json)
+        return pio.to_image(fig, format=fmt, width=width, height=height, scale=scale)
+
+    def render(self, fig, fmt='png', width=None, height=None, scale=1):
+        """
+        Render a figure (go.Figure or its JSON string) to image bytes.
+
+        Args:
+            fig: Plotly figure or figure JSON
+            fmt: png, jpeg/jpg, svg or pdf
+            width, height: Output size in pixels (figure layout size if None)
+            scale: Resolution multiplier
+
+        Returns:
+            bytes
+        """
+        fmt = 'jpeg' if fmt.lower() == 'jpg' else fmt.lower()
+        fig_json = fig if isinstance(fig, str) else fig.to_json()
+        key = self.cache_key(fig_json, fmt, width, height, scale)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        with stage(f"kaleido.render.{fmt}"):
+            future = self._executor.submit(self._render, fig_json, fmt, width, height, scale)
+            try:
+                data = future.result(timeout=self.timeout)
+            except FuturesTimeout:
+                if not future.cancel():  # already running: the worker is stuck in it
+                    self._recycle_worker()
+                raise TimeoutError(f"render took over {self.timeout}s") from None
+
+        with self._lock:
+            self._cache[key] = data
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return data
+
+    def deferred(self, fig, fmt='png', width=None, height=None, scale=1, on_error=None):
+        """
+        Zero-argument callable that renders on demand (for st.download_button
+        data). It runs outside the script, so a failure cannot be shown there:
+        it is logged, passed to ``on_error(message)`` (e.g. to report it on the
+        next rerun) and re-raised briefly for Streamlit's download error. The
+        renderer stays available for other figures.
+        """
+        def render():
+            try:
+                return self.render(fig, fmt, width=width, height=height, scale=scale)
+            except Exception as e:
+                message = f"Image export failed: {e}"
+                logger.warning(message)
+                if on_error is not None:
+                    on_error(message)
+                raise RuntimeError(message) from None
+        return render
+
+
+@st.cache_resource
+def get_image_renderer():
+    """Get cached image renderer instance (one kaleido worker per process)"""
+    return ImageRenderer()
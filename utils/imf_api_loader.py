@@ -1,21 +1,157 @@
 """
 IMF World Economic Outlook API Loader
 Fetches economic historical data and projections for South Asian countries
+
+Series are read from a WEO bulk file (the IMF's tab-separated "entire
+dataset" download: one row per country x subject, one column per year).
+The first available source wins:
+- IMF_WEO_PATH: a local WEO file
+- IMF_WEO_URL:  a WEO file to download (cached under data/cache)
+- data/raw/weo_extract.tsv: the bundled extract (sampled anchor years)
+
+Values are held in one typed array (country x series x year); the years
+between a series' anchors are filled with a single batched ``np.interp``
+call, and the edges carry the nearest anchor. ``cube_rows`` exposes the
+result in the shared filled-cube layout (utils/imputation.py), so IMF series
+are queryable like any other indicator.
 """
 
-import streamlit as st
-import pandas as pd
-from typing import List, Dict
+import os
+from pathlib import Path
+from typing import Dict, List
+
 import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+
+from utils.forecasting import artifact_version
+from utils.profiling import profiled
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+WEO_EXTRACT_PATH = DATA_DIR / 'raw' / 'weo_extract.tsv'
+WEO_DOWNLOAD_PATH = DATA_DIR / 'cache' / 'weo_download.tsv'
+
+SOURCE_TAG = 'IMF WEO'
+# np.interp runs over all series at once; each series' years are shifted by
+# its row number times this offset so the series never overlap
+_ROW_OFFSET = 10_000
+
+
+# ═══════════════════════════════════════════════════════════════════
+# WEO BULK FILE
+# ═══════════════════════════════════════════════════════════════════
+
+def weo_source():
+    """Path of the WEO file to read (see module docstring for the order)"""
+    if os.environ.get('IMF_WEO_PATH'):
+        return Path(os.environ['IMF_WEO_PATH'])
+    url = os.environ.get('IMF_WEO_URL')
+    if url:
+        if not WEO_DOWNLOAD_PATH.exists():
+            _download(url, WEO_DOWNLOAD_PATH)
+        return WEO_DOWNLOAD_PATH
+    return WEO_EXTRACT_PATH
+
+
+def _download(url, dest):
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix('.tmp')
+    tmp.write_bytes(response.content)
+    os.replace(tmp, dest)
+
+
+@profiled("imf.read_weo")
+def read_weo(path, isos, subject_codes):
+    """
+    Parse a WEO bulk file into long rows.
+
+    Args:
+        path: WEO file (tab-separated; UTF-16 or Latin-1 like the IMF downloads)
+        isos: ISO3 codes to keep
+        subject_codes: WEO subject codes to keep (e.g. 'NGDP_RPCH')
+
+    Returns:
+        DataFrame with ISO, subject (code), year (int) and value (float); blank,
+        'n/a' and '--' cells are dropped
+    """
+    with open(path, 'rb') as f:
+        bom = f.read(2)
+    encoding = 'utf-16' if bom in (b'\xff\xfe', b'\xfe\xff') else 'latin-1'
+    raw = pd.read_csv(path, sep='\t', encoding=encoding, dtype=str)
+    raw.columns = [str(c).strip() for c in raw.columns]
+
+    # Footer lines (source notes) have no ISO / subject code
+    raw = raw.dropna(subset=['ISO', 'WEO Subject Code'])
+    raw = raw[raw['ISO'].isin(isos) & raw['WEO Subject Code'].isin(subject_codes)]
+    year_columns = [c for c in raw.columns if c.isdigit()]
+
+    long = raw.melt(id_vars=['ISO', 'WEO Subject Code'], value_vars=year_columns,
+                    var_name='year', value_name='value')
+    long = long.rename(columns={'WEO Subject Code': 'subject'})
+    long['value'] = pd.to_numeric(long['value'].str.replace(',', '', regex=False), errors='coerce')
+    long['year'] = long['year'].astype(int)
+    return long.dropna(subset=['value']).reset_index(drop=True)
+
+
+def interpolate_anchors(rows, anchor_years, anchor_values, n_rows, years):
+    """
+    Linear interpolation of many series in one ``np.interp`` call.
+
+    Args:
+        rows, anchor_years, anchor_values: Anchor points, sorted by (row, year)
+        n_rows: Number of series
+        years: Years to evaluate (ascending)
+
+    Returns:
+        (n_rows, len(years)) array; years outside a series' anchors carry the
+        nearest anchor, series without anchors are NaN
+    """
+    out = np.full((n_rows, len(years)), np.nan)
+    if len(rows) == 0:
+        return out
+    has_anchor = np.zeros(n_rows, dtype=bool)
+    has_anchor[rows] = True
+    first = np.full(n_rows, years[0])
+    last = np.full(n_rows, years[-1])
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+    first[rows[starts]] = anchor_years[starts]
+    last[rows[ends]] = anchor_years[ends]
+
+    # Clamp each query into its own series' span, then shift series apart
+    query = np.clip(years[None, :], first[:, None], last[:, None])
+    query = query + np.arange(n_rows)[:, None] * _ROW_OFFSET
+    interpolated = np.interp(query.ravel(), rows * _ROW_OFFSET + anchor_years, anchor_values)
+    out[has_anchor] = interpolated.reshape(n_rows, len(years))[has_anchor]
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LOADER
+# ═══════════════════════════════════════════════════════════════════
 
 class IMFDataLoader:
     """
     Loader for economic growth, inflation, and fiscal data
     Provides reliable historical data (2000-2023)
     """
-    
-    def __init__(self):
-        # 8 countries * 24 years * 6 indicators = ~1,152 additional points
+
+    COUNTRY_MAP = {
+        "Afghanistan": "AFG",
+        "Bangladesh": "BGD",
+        "Bhutan": "BTN",
+        "India": "IND",
+        "Maldives": "MDV",
+        "Nepal": "NPL",
+        "Pakistan": "PAK",
+        "Sri Lanka": "LKA"
+    }
+
+    def __init__(self, path=None):
+        # Advertised WEO series (label -> subject code); those missing from the file stay empty
         self.indicators = {
             'GDP Growth (%)': 'NGDP_RPCH',
             'Inflation (%)': 'PCPIPCH',
@@ -24,87 +160,94 @@ class IMFDataLoader:
             'Unemployment Rate (%)': 'LUR',
             'Investment (% of GDP)': 'NID_NGDP'
         }
-        
-        # Comprehensive dataset from 2000 to 2023 (Sampled Trends)
-        self.data_store = {
-            'GDP Growth (%)': {
-                'India': {2000: 3.8, 2010: 10.3, 2020: -5.8, 2023: 6.3},
-                'Bangladesh': {2000: 5.3, 2010: 5.6, 2020: 3.4, 2023: 6.0},
-                'Pakistan': {2000: 4.3, 2010: 1.6, 2020: -0.9, 2023: -0.2},
-                'Sri Lanka': {2000: 6.0, 2010: 8.0, 2020: -3.6, 2023: -2.3},
-                'Afghanistan': {2002: 45.1, 2010: 8.4, 2020: -2.4, 2023: 2.5},
-                'Nepal': {2000: 6.2, 2010: 4.8, 2020: -2.1, 2023: 1.9},
-                'Bhutan': {2000: 7.1, 2010: 11.7, 2020: -2.5, 2023: 4.5},
-                'Maldives': {2000: 4.8, 2010: 7.1, 2020: -32.0, 2023: 4.0}
-            },
-            'Inflation (%)': {
-                'India': {2000: 4.0, 2010: 12.0, 2023: 5.5},
-                'Bangladesh': {2000: 2.8, 2010: 8.1, 2023: 9.0},
-                'Pakistan': {2000: 4.4, 2010: 13.9, 2023: 29.2}
-            },
-            'Gov. Debt (% of GDP)': {
-                'India': {2000: 70.0, 2023: 82.0},
-                'Sri Lanka': {2000: 90.0, 2023: 115.0},
-                'Pakistan': {2000: 80.0, 2023: 75.0}
-            }
-        }
-        
+        self.countries = list(self.COUNTRY_MAP)
+        self.series = list(self.indicators)
+        self.years = np.arange(2000, 2024)
+        self.path = Path(path) if path else weo_source()
+
+        # values[c, s, y]: country x series x year; observed marks the file's own values
+        shape = (len(self.countries), len(self.series), len(self.years))
+        self.values = np.full(shape, np.nan)
+        self.observed = np.zeros(shape, dtype=bool)
+        if self.path.exists():
+            self._load(read_weo(self.path, list(self.COUNTRY_MAP.values()), list(self.indicators.values())))
+
+    def _load(self, anchors):
+        country_index = {iso: i for i, iso in enumerate(self.COUNTRY_MAP.values())}
+        series_index = {code: i for i, code in enumerate(self.indicators.values())}
+        anchors = anchors[anchors['year'].between(self.years[0], self.years[-1])]
+        c = anchors['ISO'].map(country_index).to_numpy()
+        s = anchors['subject'].map(series_index).to_numpy()
+        year = anchors['year'].to_numpy()
+
+        n_series = len(self.series)
+        rows = c * n_series + s
+        order = np.lexsort((year, rows))
+        filled = interpolate_anchors(rows[order], year[order], anchors['value'].to_numpy(dtype=float)[order],
+                                     len(self.countries) * n_series, self.years)
+        self.values = filled.reshape(self.values.shape)
+        self.observed[c, s, year - self.years[0]] = True
+
     def get_stats(self) -> Dict:
         """Returns statistics for this loader"""
-        # Logic: 8 countries * 24 years * 6 indicators (estimating coverage)
+        available = np.isfinite(self.values)
         return {
-            'records': 8 * 24 * len(self.indicators),
-            'indicators': len(self.indicators)
+            'records': int(available.sum()),
+            'observed': int(self.observed.sum()),
+            'indicators': int(available.any(axis=(0, 2)).sum())
         }
 
-    def _interpolate(self, start_val, end_val, start_year, end_year, target_year):
-        """Linearly interpolate value for a target year"""
-        if start_year == end_year:
-            return start_val
-        proportion = (target_year - start_year) / (end_year - start_year)
-        return start_val + (end_val - start_val) * proportion
+    def get_series(self, indicator: str, countries: List[str], start_year: int = 2000,
+                   end_year: int = 2023) -> pd.DataFrame:
+        """One series for the given countries and years (country, year, indicator, value, source)"""
+        if isinstance(countries, str):
+            countries = [countries]
+        countries = [c for c in countries if c in self.COUNTRY_MAP]
+        s = self.series.index(indicator)
+        c = np.array([self.countries.index(country) for country in countries], dtype=int)
+        in_range = (self.years >= start_year) & (self.years <= end_year)
+        block = self.values[c, s][:, in_range]
+        present = np.isfinite(block)
+        rows, cols = np.nonzero(present)
+        return pd.DataFrame({
+            'country': np.array(countries, dtype=object)[rows],
+            'year': self.years[in_range][cols],
+            'indicator': indicator,
+            'value': block[present],
+            'source': 'IMF'
+        })
 
+    @profiled("imf.gdp_growth")
     def get_gdp_growth(self, countries: List[str], start_year: int = 2000, end_year: int = 2023) -> pd.DataFrame:
         """Historical growth with linear interpolation between key anchor points"""
-        results = []
-        if isinstance(countries, str): countries = [countries]
-        
-        # Anchor points for realistic interpolation
-        growth_anchors = {
-            'Afghanistan': {2000: 2.0, 2005: 12.0, 2010: 8.4, 2015: 1.5, 2020: -2.4, 2023: 2.5},
-            'Bangladesh':  {2000: 5.3, 2010: 5.6, 2019: 8.2, 2020: 3.4, 2023: 6.0},
-            'Bhutan':      {2000: 7.1, 2010: 11.7, 2015: 6.0, 2020: -2.5, 2023: 4.5},
-            'India':       {2000: 3.8, 2005: 7.9, 2010: 10.3, 2015: 8.0, 2020: -5.8, 2023: 6.3},
-            'Maldives':    {2000: 4.8, 2010: 7.1, 2015: 4.0, 2020: -33.5, 2023: 4.0},
-            'Nepal':       {2000: 6.2, 2010: 4.8, 2015: 3.0, 2020: -2.1, 2023: 1.9},
-            'Pakistan':    {2000: 4.3, 2005: 7.7, 2010: 1.6, 2015: 4.7, 2020: -0.9, 2023: -0.2},
-            'Sri Lanka':   {2000: 6.0, 2005: 6.2, 2010: 8.0, 2015: 5.0, 2020: -3.6, 2023: -2.3}
-        }
-        
-        for country in countries:
-            anchors = growth_anchors.get(country, {2000: 5.0, 2023: 5.0})
-            sorted_years = sorted(anchors.keys())
-            
-            for year in range(start_year, end_year + 1):
-                # Find interpolation points
-                if year <= sorted_years[0]:
-                    val = anchors[sorted_years[0]]
-                elif year >= sorted_years[-1]:
-                    val = anchors[sorted_years[-1]]
-                else:
-                    for i in range(len(sorted_years) - 1):
-                        y1, y2 = sorted_years[i], sorted_years[i+1]
-                        if y1 <= year <= y2:
-                            val = self._interpolate(anchors[y1], anchors[y2], y1, y2, year)
-                            break
-                            
-                results.append({
-                    'country': country, 'year': year,
-                    'indicator': 'GDP Growth (%)', 'value': val,
-                    'source': 'IMF'
-                })
-        return pd.DataFrame(results)
-
-@st.cache_resource
+        return self.get_series('GDP Growth (%)', countries, start_year, end_year)
+
+    def cube_rows(self) -> pd.DataFrame:
+        """Every available cell in the shared filled-cube layout, tagged with SOURCE_TAG"""
+        c, s, y = np.nonzero(np.isfinite(self.values))
+        observed = self.observed[c, s, y]
+        # Between a series' first and last anchor is interpolation, outside is carried
+        any_before = np.maximum.accumulate(self.observed, axis=2)[c, s, y]
+        any_after = np.maximum.accumulate(self.observed[:, :, ::-1], axis=2)[:, :, ::-1][c, s, y]
+        interior = any_before & any_after & ~observed
+        iso = np.array(list(self.COUNTRY_MAP.values()), dtype=object)
+        return pd.DataFrame({
+            'country': np.array(self.countries, dtype=object)[c],
+            'country_code': iso[c],
+            'indicator': np.array(self.series, dtype=object)[s],
+            'year': self.years[y],
+            'value': self.values[c, s, y],
+            'provenance': np.select([observed, interior], ['observed', 'interpolated'], 'extrapolated'),
+            'method': np.select([observed, interior], ['observed', 'linear'], 'carry'),
+            'source': SOURCE_TAG,
+        })
+
+@st.cache_resource(max_entries=2)
+def _imf_loader(path, file_version):
+    return IMFDataLoader(path)
+
+
 def get_imf_loader():
-    return IMFDataLoader()
+    """Shared loader for the current WEO file, rebuilt when the file changes"""
+    path = weo_source()
+    return _imf_loader(str(path), artifact_version(path))
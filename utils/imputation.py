@@ -0,0 +1,354 @@
+"""
+Imputation Engine
+One gap-filled indicator cube (country x indicator x year, 2000-2024) with a
+provenance flag per cell, shared by the pages instead of ad hoc fills.
+
+Each series is filled in order of preference
+- observed: the curated value (never modified)
+- interior gaps: linear or PCHIP interpolation between the surrounding
+  observations, only when both come from the same source (provenance
+  'interpolated'); a gap across a change of source (which may also be a
+  change of scale, e.g. World Bank 0-100 vs WID 0-1 Gini) stays missing
+- before the first / after the last observation: cross-country regression on
+  the other countries' mean for the indicator (anchored at the nearest
+  observation), when that fits the series' own history well; otherwise the
+  nearest observation carried up to ``max_gap`` years (provenance
+  'extrapolated')
+Everything else stays missing. Shares ("% of ...") are capped at 100 and
+non-negative series stay non-negative. Every cell carries its own source:
+observed cells their curated source, imputed cells the source of the
+observations they were filled from, marked "(imputed)".
+
+All series are filled at once with array operations. The cube is built
+offline (scripts/build_imputation.py) as data/processed/filled_indicators.csv,
+tagged with a digest of the curated dataset; ``load_filled`` reads it (or
+fills in-process when it is missing or stale) and appends the IMF WEO and
+UNDP HDR series, so every cell carries a source tag.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.forecasting import (CURATED_PATH, artifact_version, dataset_digest, read_artifact_metadata,
+                               write_artifact)
+from utils.imf_api_loader import get_imf_loader, weo_source
+from utils.un_data_loader import get_un_loader, hdr_source
+from utils.loaders import PROCESSED_DIR, data_version, load_inequality_data
+from utils.persistent_cache import persistent_cache
+
+FILLED_PATH = PROCESSED_DIR / "filled_indicators.csv"
+
+YEARS = np.arange(2000, 2025)    # The curated dataset's range
+INTERPOLATION_METHODS = ('linear', 'pchip')
+DEFAULT_METHOD = 'linear'
+CARRY_MAX_GAP = 5                # Years an edge observation may be carried
+REGRESSION_MIN_OVERLAP = 6       # Observed years needed to fit the cross-country regression
+REGRESSION_MIN_R2 = 0.6          # Fit needed before extrapolating with it
+
+PROVENANCE = ('observed', 'interpolated', 'extrapolated')
+IMPUTED_SUFFIX = ' (imputed)'  # appended to the source of imputed cells
+FILLED_COLUMNS = ['country', 'country_code', 'indicator', 'year', 'value', 'provenance', 'method', 'source']
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CUBE
+# ═══════════════════════════════════════════════════════════════════
+
+def build_cube(df):
+    """
+    Long-format rows as a dense series x year array.
+
+    Returns:
+        (keys, values, sources, labels): keys has one row per (country,
+        indicator) series with its country_code; values is (len(keys),
+        len(YEARS)), NaN where unobserved; sources holds each cell's source
+        as a code into labels (-1 where unobserved)
+    """
+    rows = df.dropna(subset=['value'])
+    rows = rows[rows['year'].between(YEARS[0], YEARS[-1])]
+    codes, labels = pd.factorize(rows['source'])
+    cells = rows.assign(source_code=codes).groupby(['country', 'indicator', 'year'], sort=True).agg(
+        value=('value', 'mean'), source_code=('source_code', 'first'))
+    series = cells['value'].unstack('year').reindex(columns=YEARS)
+    sources = cells['source_code'].unstack('year').reindex(columns=YEARS)
+
+    keys = series.index.to_frame(index=False)
+    tags = rows.groupby(['country', 'indicator'])['country_code'].first().reindex(series.index)
+    keys.insert(1, 'country_code', tags.to_numpy())
+    return (keys, series.to_numpy(dtype=float),
+            sources.fillna(-1).to_numpy(dtype=int), np.asarray(labels, dtype=object))
+
+
+def _neighbours(observed):
+    """Column of the previous and next observation of every cell (-1 / n_years when there is none)"""
+    n = observed.shape[1]
+    cols = np.arange(n)
+    prev = np.maximum.accumulate(np.where(observed, cols, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(observed, cols, n)[:, ::-1], axis=1)[:, ::-1]
+    return prev, nxt
+
+
+def _take(values, cols):
+    """values[i, cols[i, j]] for every cell (cols clipped into range)"""
+    cols = np.clip(cols, 0, values.shape[1] - 1)
+    return np.take_along_axis(values, cols, axis=1)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# FILL METHODS
+# ═══════════════════════════════════════════════════════════════════
+
+def _linear(values, prev, nxt):
+    """Straight line between the previous and next observation of every cell"""
+    cols = np.arange(values.shape[1])
+    y0, y1 = _take(values, prev), _take(values, nxt)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = (cols - prev) / (nxt - prev)
+    return y0 + weight * (y1 - y0)
+
+
+def _pchip(values, observed, interior):
+    """
+    Shape-preserving cubic (PCHIP) through each series' observations.
+    Series sharing a missing-year pattern are interpolated in one call.
+    """
+    from scipy.interpolate import PchipInterpolator
+
+    out = np.full(values.shape, np.nan)
+    patterns, inverse = np.unique(observed, axis=0, return_inverse=True)
+    for k, pattern in enumerate(patterns):
+        rows = np.flatnonzero(inverse.ravel() == k)
+        gaps = interior[rows[0]]
+        if pattern.sum() < 2 or not gaps.any():
+            continue
+        curve = PchipInterpolator(YEARS[pattern], values[np.ix_(rows, pattern)], axis=1)
+        out[np.ix_(rows, gaps)] = curve(YEARS[gaps])
+    return out
+
+
+def _regression(filled, observed, groups):
+    """
+    Least-squares fit of every series on the mean of the other countries'
+    series of the same indicator (observed or interpolated) in the same year.
+
+    Args:
+        filled: Cube with interior gaps filled
+        observed: Mask of observed cells (the fit's targets)
+        groups: Indicator group number of each series
+
+    Returns:
+        (predicted, usable): the fit's value for every cell (NaN where no other
+        country has data) and whether each series' fit may be used
+    """
+    known = np.isfinite(filled)
+    v = np.where(known, filled, 0.0)
+    sums = np.zeros((groups.max() + 1, filled.shape[1]))
+    counts = np.zeros_like(sums)
+    np.add.at(sums, groups, v)
+    np.add.at(counts, groups, known)
+
+    others = counts[groups] - known
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x = np.where(others > 0, (sums[groups] - v) / others, np.nan)
+
+        pair = observed & np.isfinite(x)
+        m = pair.sum(axis=1)
+        mx = np.where(pair, x, 0.0).sum(axis=1) / m
+        my = np.where(pair, filled, 0.0).sum(axis=1) / m
+        dx = np.where(pair, x - mx[:, None], 0.0)
+        dy = np.where(pair, filled - my[:, None], 0.0)
+        sxx, syy, sxy = (dx * dx).sum(axis=1), (dy * dy).sum(axis=1), (dx * dy).sum(axis=1)
+        slope = sxy / sxx
+        r2 = sxy ** 2 / (sxx * syy)
+
+    usable = (m >= REGRESSION_MIN_OVERLAP) & (sxx > 0) & (syy > 0) & (r2 >= REGRESSION_MIN_R2)
+    predicted = (my - slope * mx)[:, None] + slope[:, None] * x
+    return predicted, usable
+
+
+def _bounds(keys, values):
+    """Per-series (lower, upper) limits for filled values"""
+    with np.errstate(invalid='ignore'):
+        vmin, vmax = np.nanmin(values, axis=1), np.nanmax(values, axis=1)
+    lower = np.where(vmin >= 0, 0.0, -np.inf)
+    # "% of ..." indicators are shares of a whole
+    is_share = keys['indicator'].str.contains('% of', regex=False).to_numpy()
+    upper = np.where(is_share & (vmax <= 100), 100.0, np.inf)
+    return lower, upper
+
+
+def fill_cube(df, method=DEFAULT_METHOD, max_gap=CARRY_MAX_GAP, regression=True):
+    """
+    Gap-fill every (country, indicator) series of a long-format frame.
+
+    Args:
+        df: Long-format data with country, country_code, indicator, year, value, source
+        method: Interior interpolation, 'linear' or 'pchip'
+        max_gap: Years the first / last observation may be carried outward
+        regression: Extrapolate with the cross-country regression where it fits
+
+    Returns:
+        DataFrame with FILLED_COLUMNS, one row per observed or filled cell;
+        'method' is 'observed', the interpolation method, 'regression' or 'carry'
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method {method!r}; use one of {INTERPOLATION_METHODS}")
+
+    keys, values, sources, labels = build_cube(df)
+    n = len(YEARS)
+    observed = np.isfinite(values)
+    prev, nxt = _neighbours(observed)
+    prev_source, next_source = _take(sources, prev), _take(sources, nxt)
+    # Interior gaps are filled only between two observations of the same source
+    interior = ~observed & (prev >= 0) & (nxt < n) & (prev_source == next_source)
+    edge = ~observed & (observed.any(axis=1)[:, None]) & ((prev < 0) | (nxt >= n))
+    # Series drawing on several sources: no curve through all of them
+    mixed = (np.where(observed, sources, sources.max(initial=0) + 1).min(axis=1)
+             != np.where(observed, sources, -1).max(axis=1))
+
+    filled = values.copy()
+    methods = np.where(observed, 'observed', '').astype(object)
+    gap_values = _linear(values, prev, nxt)
+    if method == 'pchip':
+        gap_values = np.where(mixed[:, None], gap_values, _pchip(values, observed, interior))
+    filled[interior] = gap_values[interior]
+    methods[interior] = method
+
+    by_regression = np.zeros_like(observed)
+    if regression and len(keys):
+        groups = keys['indicator'].factorize()[0]
+        predicted, usable = _regression(filled, observed, groups)
+        # Anchor at the nearest observation so the fill continues the series without a jump
+        residual = values - predicted
+        predicted = predicted + np.where(prev >= 0, _take(residual, prev), _take(residual, nxt))
+        by_regression = edge & (usable & ~mixed)[:, None] & np.isfinite(predicted)
+        filled[by_regression] = predicted[by_regression]
+        methods[by_regression] = 'regression'
+
+    cols = np.arange(n)
+    carried = edge & ~by_regression
+    forward = carried & (prev >= 0) & (cols - prev <= max_gap)
+    backward = carried & (nxt < n) & (nxt - cols <= max_gap)
+    filled[forward] = _take(values, prev)[forward]
+    filled[backward] = _take(values, nxt)[backward]
+    methods[forward | backward] = 'carry'
+
+    lower, upper = _bounds(keys, values)
+    filled = np.where(observed, values, np.clip(filled, lower[:, None], upper[:, None]))
+
+    rows, cells = np.nonzero(np.isfinite(filled))
+    out = keys.iloc[rows].reset_index(drop=True)
+    out['year'] = YEARS[cells]
+    out['value'] = filled[rows, cells]
+    out['provenance'] = np.select(
+        [observed[rows, cells], interior[rows, cells]], ['observed', 'interpolated'], 'extrapolated')
+    out['method'] = methods[rows, cells]
+    # Source of the cell, or of the observation it was filled from (previous, else next)
+    cell_source = np.where(observed, sources, np.where(prev >= 0, prev_source, next_source))[rows, cells]
+    out['source'] = labels[cell_source]
+    return mark_imputed(out[FILLED_COLUMNS])
+
+
+def mark_imputed(rows):
+    """Append IMPUTED_SUFFIX to the source of every non-observed row"""
+    imputed = (rows['provenance'] != 'observed') & ~rows['source'].str.endswith(IMPUTED_SUFFIX)
+    return rows.assign(source=rows['source'].where(~imputed, rows['source'] + IMPUTED_SUFFIX))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ARTIFACT
+# ═══════════════════════════════════════════════════════════════════
+
+def write_filled(filled, source_digest, method, max_gap, path=FILLED_PATH):
+    """Write the filled cube, tagged with the dataset digest, settings and cell counts"""
+    counts = filled['provenance'].value_counts()
+    write_artifact(filled, {
+        'source_digest': source_digest,
+        'built': datetime.now().isoformat(timespec='seconds'),
+        'method': method,
+        'max_gap': max_gap,
+        **{label: int(counts.get(label, 0)) for label in PROVENANCE},
+    }, path, float_format=None)  # Full precision: observed values must round-trip exactly
+
+
+@persistent_cache
+def compute_filled_cube(method=DEFAULT_METHOD, max_gap=CARRY_MAX_GAP):
+    """Fill the curated dataset in-process (used when the artifact is missing or stale)"""
+    return fill_cube(load_inequality_data(), method, max_gap)
+
+
+def _external_series():
+    """Series from loaders outside the curated dataset, in the filled layout"""
+    return [
+        mark_imputed(get_imf_loader().cube_rows()),  # interpolated between WEO anchors by the loader
+        fill_cube(get_un_loader().cube_frame()),  # HDR indices, gap-filled like the curated series
+    ]
+
+
+@st.cache_resource(max_entries=2)
+def _load_filled(version, file_version, weo_version, hdr_version):
+    metadata = read_artifact_metadata(FILLED_PATH)
+    if metadata and CURATED_PATH.exists() and metadata.get('source_digest') == dataset_digest():
+        filled = pd.read_csv(FILLED_PATH, comment='#')
+    else:
+        filled = compute_filled_cube()
+        metadata = {'method': DEFAULT_METHOD, 'max_gap': str(CARRY_MAX_GAP)}
+    filled = pd.concat([filled, *_external_series()], ignore_index=True)
+    return filled[FILLED_COLUMNS], metadata
+
+
+@st.cache_resource(max_entries=2)
+def _value_index(*versions):
+    filled, _ = _load_filled(*versions)
+    return filled.set_index(['country', 'indicator', 'year'])['value'].sort_index()
+
+
+def filled_version():
+    """Version key of the filled cube (dataset, artifact, WEO and HDR files), e.g. for export signatures"""
+    return data_version(), artifact_version(FILLED_PATH), artifact_version(weo_source()), artifact_version(hdr_source())
+
+
+def load_filled():
+    """
+    The filled cube for the current dataset version.
+
+    Returns:
+        (filled, metadata): filled has FILLED_COLUMNS, including the IMF WEO
+        and HDR series (utils/imf_api_loader.py, utils/un_data_loader.py);
+        metadata holds the artifact's build settings and cell counts
+        ({method, max_gap} only when it was filled in-process)
+    """
+    return _load_filled(*filled_version())
+
+
+def filled_series(indicator, countries=None, year_range=None):
+    """Filled rows for one indicator, optionally limited to countries (names) and a year range"""
+    filled, _ = load_filled()
+    mask = (filled['indicator'] == indicator).to_numpy()
+    if countries is not None:
+        mask = mask & filled['country'].isin(countries).to_numpy()
+    if year_range is not None:
+        mask = mask & filled['year'].between(*year_range).to_numpy()
+    return filled[mask]
+
+
+def filled_value(country, indicator, year, default=None):
+    """One cell of the filled cube (``default`` when it stays missing)"""
+    index = _value_index(*filled_version())
+    value = index.get((country, indicator, int(year)))
+    return default if value is None or pd.isna(value) else float(value)
+
+
+def provenance_caption(rows):
+    """One-line note on how many values shown are imputed, or None when all are observed"""
+    imputed = rows[rows['provenance'] != 'observed']
+    if imputed.empty:
+        return None
+    counts = imputed['provenance'].value_counts()
+    parts = [f"{counts[label]} {label}" for label in PROVENANCE[1:] if label in counts]
+    methods = ", ".join(sorted(imputed['method'].unique()))
+    return (f"{len(imputed)} of {len(rows)} values imputed ({', '.join(parts)}; {methods}). "
+            "Observed values are unchanged.")
@@ -0,0 +1,427 @@
+"""
+Income Distribution Engine
+Closed-form income distributions for the Income Simulator.
+Percentile <-> income lookups are analytic (no sampling), so they are exact,
+reproducible and cheap enough to run on every rerun.
+
+- LognormalDistribution: two-parameter curve (synthetic default or share-calibrated)
+- ShareCalibratedDistributions: Lorenz curves fitted to WID percentile shares,
+  one per country-year, stored as coefficient arrays
+
+Conventions:
+- Percentiles are on the 0-100 scale used throughout the simulator
+- Income shares are fractions (0.1554 = 15.54%), as stored by WID
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import streamlit as st
+from scipy.special import ndtr, ndtri
+
+# Synthetic curve used by the simulator when no country calibration is available
+DEFAULT_MU = 2.5
+DEFAULT_SIGMA = 0.6
+
+# Percentiles are clipped away from 0/100 so quantiles stay finite
+_P_EPS = 1e-4
+
+
+def parse_percentile_group(group):
+    """
+    Convert a WID percentile group code into fractional bounds.
+    'p90p100' -> (0.9, 1.0), 'p99.9p100' -> (0.999, 1.0)
+    """
+    lower, upper = group.lstrip('p').split('p')
+    return float(lower) / 100, float(upper) / 100
+
+
+def _to_unit(p):
+    """Percent (0-100) -> clipped fraction (0-1)"""
+    return np.clip(np.asarray(p, dtype=float) / 100, _P_EPS, 1 - _P_EPS)
+
+
+@lru_cache(maxsize=64)
+def _pdf_grid(mu, sigma, x_max, n):
+    """Normalized lognormal PDF on a fixed grid, shared by every render"""
+    x = np.linspace(0, x_max, n)
+    pdf = np.zeros_like(x)
+    mask = x > 0
+    pdf[mask] = np.exp(-((np.log(x[mask]) - mu) ** 2) / (2 * sigma ** 2)) / (x[mask] * sigma * np.sqrt(2 * np.pi))
+    pdf = pdf / pdf.max()
+    x.setflags(write=False)
+    pdf.setflags(write=False)
+    return x, pdf
+
+
+class LognormalDistribution:
+    """
+    Lognormal income distribution with analytic quantile, CDF and Lorenz curve.
+    Can be calibrated to observed income shares (e.g. WID p0p50 / p90p100).
+    """
+
+    def __init__(self, mu=DEFAULT_MU, sigma=DEFAULT_SIGMA):
+        self.mu = float(mu)
+        self.sigma = float(sigma)
+
+    @property
+    def cache_key(self):
+        return ('lognormal', self.mu, self.sigma)
+
+    def quantile(self, p):
+        """Income at percentile p (0-100). Vectorized."""
+        return np.exp(self.mu + self.sigma * ndtri(_to_unit(p)))
+
+    def cdf(self, x):
+        """Percentile (0-100) of income x. Vectorized."""
+        x = np.asarray(x, dtype=float)
+        with np.errstate(divide='ignore'):
+            z = (np.log(np.where(x > 0, x, 0)) - self.mu) / self.sigma
+        return ndtr(z) * 100
+
+    def lorenz(self, p):
+        """Cumulative income share held by the bottom p percent"""
+        return ndtr(ndtri(_to_unit(p)) - self.sigma)
+
+    def mean(self):
+        return float(np.exp(self.mu + self.sigma ** 2 / 2))
+
+    def gini(self):
+        return float(2 * ndtr(self.sigma / np.sqrt(2)) - 1)
+
+    def pdf_grid(self, x_max=30, n=500):
+        """Cached (x, normalized pdf) arrays for plotting. Do not mutate."""
+        return _pdf_grid(self.mu, self.sigma, float(x_max), int(n))
+
+    @classmethod
+    def from_shares(cls, shares, mean=None):
+        """
+        Calibrate sigma from income shares of bottom or top groups.
+
+        For a lognormal, L(p) = Phi(Phi^-1(p) - sigma), so every group anchored
+        at 0 or 100 gives sigma in closed form; the estimates are averaged.
+        If ``mean`` income is given, mu is set so the distribution reproduces it;
+        otherwise the default location is kept.
+
+        Args:
+            shares: {percentile_group: share}, e.g. {'p0p50': 0.155, 'p90p100': 0.568}
+            mean: Optional average income of the whole population
+        """
+        estimates = []
+        for group, share in shares.items():
+            if share is None or not np.isfinite(share) or not 0 < share < 1:
+                continue
+            lower, upper = parse_percentile_group(group)
+            if lower == 0 and upper < 1:
+                estimates.append(ndtri(upper) - ndtri(share))
+            elif upper == 1 and lower > 0:
+                estimates.append(ndtri(lower) - ndtri(1 - share))
+
+        sigma = float(np.mean(estimates)) if estimates else DEFAULT_SIGMA
+        sigma = max(sigma, 1e-3)
+
+        if mean is not None and mean > 0:
+            mu = float(np.log(mean) - sigma ** 2 / 2)
+        else:
+            mu = DEFAULT_MU
+        return cls(mu, sigma)
+
+
+@lru_cache(maxsize=1)
+def get_default_distribution():
+    """The simulator's synthetic reference distribution"""
+    return LognormalDistribution(DEFAULT_MU, DEFAULT_SIGMA)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# WID-CALIBRATED DISTRIBUTIONS
+# ═══════════════════════════════════════════════════════════════════
+
+def _pdf_from_cdf(dist, x_max, n):
+    """Normalized density on a grid, differentiated from an analytic CDF"""
+    x = np.linspace(0, x_max, n)
+    pdf = np.gradient(dist.cdf(x), x)
+    pdf = np.clip(pdf, 0, None)
+    peak = pdf.max()
+    return x, (pdf / peak if peak > 0 else pdf)
+
+
+class ShareCalibratedDistributions:
+    """
+    Continuous income distributions fitted to WID percentile shares.
+
+    Each country-year is modelled in probit space: the Lorenz curve is
+    L(p) = Phi(z - s(z)) with z = Phi^-1(p), where the "local sigma" s(z) is a
+    monotone cubic (PCHIP) through the values implied by the observed shares at
+    p = 50%, 90% and 99%, relaxing smoothly to a constant in both tails. A
+    constant s(z) is exactly a lognormal; letting it vary reproduces every
+    observed share exactly while keeping the quantile function smooth:
+
+        Q(p) = mean * exp(z*s - s^2/2) * (1 - s'(z))
+
+    All fits are computed once, in batch, and kept as (n, 3) coefficient arrays
+    (knot values + slopes) plus tail scales and the mean, so lookups for any mix
+    of country-years are vectorized array operations. Fits whose quantile
+    function would not be increasing fall back to the closest lognormal.
+    """
+
+    KNOT_P = np.array([0.5, 0.9, 0.99])
+    KNOT_Z = ndtri(KNOT_P)
+    # Bisection bounds for income -> percentile (z = +/-8.5 ~ 1e-17 tail mass)
+    _Z_RANGE = 8.5
+
+    def __init__(self, share_table):
+        """
+        Args:
+            share_table: DataFrame indexed by (country, year) with columns
+                p0p50, p50p90, p90p100, p99p100 (fractions) and mean_income,
+                as returned by SouthAsiaDataLoader.load_income_share_table()
+        """
+        table = share_table.copy()
+        brackets = table[['p0p50', 'p50p90', 'p90p100']]
+        # Normalize so the three brackets sum to exactly 100% of income
+        total = brackets.sum(axis=1, min_count=3).fillna(1.0)
+        lorenz_knots = np.column_stack([
+            table['p0p50'] / total,
+            (table['p0p50'] + table['p50p90']) / total,
+            1 - table['p99p100'] / total
+        ])
+
+        with np.errstate(invalid='ignore'):
+            sigma = self.KNOT_Z - ndtri(lorenz_knots)
+        sigma[~(sigma > 0)] = np.nan
+        # Fill a missing knot from its neighbours; drop rows with no usable share
+        sigma = _fill_knots(sigma)
+        keep = ~np.isnan(sigma).any(axis=1)
+
+        self.index = table.index[keep]
+        self.sigma = sigma[keep]
+        self.slope = self._pchip_slopes(self.sigma)
+        mean = table['mean_income'].to_numpy(dtype=float)[keep]
+        self.mean = np.where(mean > 0, mean, np.nan)
+        self.has_income = ~np.isnan(self.mean)
+        # Rows without a mean income are expressed in multiples of the mean
+        self.scale = np.where(self.has_income, self.mean, 1.0)
+
+        self._fallback_to_lognormal(self._fit_tails())
+        self._pdf_cache = {}
+        self._rows = {key: i for i, key in enumerate(self.index)}
+        self._years_by_country = {}
+        for (country, year), i in self._rows.items():
+            self._years_by_country.setdefault(country, []).append((year, i))
+
+    # ---------- fitting ----------
+
+    def _pchip_slopes(self, sigma):
+        """Fritsch-Carlson (PCHIP) slopes at each knot, including one-sided end slopes"""
+        h = np.diff(self.KNOT_Z)
+        d = np.diff(sigma, axis=1) / h
+        w1, w2 = 2 * h[1] + h[0], h[1] + 2 * h[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mid = (w1 + w2) / (w1 / d[:, 0] + w2 / d[:, 1])
+        mid = np.where(d[:, 0] * d[:, 1] > 0, mid, 0.0)
+
+        def end_slope(d_near, d_far, h_near, h_far):
+            m = ((2 * h_near + h_far) * d_near - h_near * d_far) / (h_near + h_far)
+            m = np.where(np.sign(m) != np.sign(d_near), 0.0, m)
+            overshoot = (np.sign(d_near) != np.sign(d_far)) & (np.abs(m) > 3 * np.abs(d_near))
+            return np.where(overshoot, 3 * d_near, m)
+
+        return np.column_stack([
+            end_slope(d[:, 0], d[:, 1], h[0], h[1]),
+            mid,
+            end_slope(d[:, 1], d[:, 0], h[1], h[0])
+        ])
+
+    def _tail_scale_limits(self):
+        """
+        Upper bounds for the tail decay lengths: in the tails s(z) relaxes
+        exponentially from the end slope to a constant, which must stay positive.
+        """
+        floor = 0.05
+        m_lo, m_hi = self.slope[:, 0], self.slope[:, -1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tau_lo = np.where(m_lo > 0, (self.sigma[:, 0] - floor) / m_lo, np.inf)
+            tau_hi = np.where(m_hi < 0, (self.sigma[:, -1] - floor) / -m_hi, np.inf)
+        return np.clip(tau_lo, 1e-3, None), np.clip(tau_hi, 1e-3, None)
+
+    def _fit_tails(self):
+        """
+        Pick the shortest tail decay length that keeps the quantile function
+        increasing, adjusting the (free) end slopes when no length works; rows
+        that never qualify are returned for the lognormal fallback.
+        """
+        end_slopes = self.slope[:, [0, -1]].copy()
+        secants = np.diff(self.sigma, axis=1)[:, [0, -1]] / np.diff(self.KNOT_Z)[[0, -1]]
+        unresolved = np.ones(len(self.sigma), dtype=bool)
+        self.tau_lo = np.ones(len(self.sigma))
+        self.tau_hi = np.ones(len(self.sigma))
+        # Blend the end slopes from PCHIP towards the adjacent secant, then flat
+        for weight in (1.0, 0.5, 0.0, None):
+            blended = secants * 0.0 if weight is None else \
+                weight * end_slopes + (1 - weight) * secants
+            self.slope[unresolved, 0] = blended[unresolved, 0]
+            self.slope[unresolved, -1] = blended[unresolved, 1]
+            lo_max, hi_max = self._tail_scale_limits()
+            for tau in (1.0, 1.5, 2.0, 3.0, 4.0):
+                self.tau_lo = np.where(unresolved, np.minimum(tau, lo_max), self.tau_lo)
+                self.tau_hi = np.where(unresolved, np.minimum(tau, hi_max), self.tau_hi)
+                pending = np.flatnonzero(unresolved)
+                unresolved[pending] = ~self._is_monotone(pending)
+                if not unresolved.any():
+                    return unresolved
+        return unresolved
+
+    def _is_monotone(self, rows=None):
+        """True where the fitted quantile function is strictly increasing"""
+        z = np.linspace(-self._Z_RANGE / 2, self._Z_RANGE / 2, 2000)
+        if rows is None:
+            rows = np.arange(len(self.sigma))
+        rows = np.asarray(rows)[:, None]
+        s, ds = self._local_sigma(rows, z[None, :])
+        log_q = z * s - s ** 2 / 2 + np.log(np.clip(1 - ds, 1e-300, None))
+        return (ds < 1).all(axis=1) & (np.diff(log_q, axis=1) > 0).all(axis=1)
+
+    def _fallback_to_lognormal(self, rows):
+        """Replace ill-shaped fits by the best constant-sigma (lognormal) curve"""
+        if rows.any():
+            self.sigma[rows] = self.sigma[rows].mean(axis=1, keepdims=True)
+            self.slope[rows] = 0.0
+            self.tau_lo[rows] = self.tau_hi[rows] = 1.0
+
+    # ---------- evaluation ----------
+
+    def _local_sigma(self, rows, z):
+        """Hermite evaluation of s(z) and s'(z) for broadcast (rows, z)"""
+        rows, z = np.broadcast_arrays(rows, z)
+        knots = self.KNOT_Z
+        k = np.clip(np.searchsorted(knots, z, side='right') - 1, 0, len(knots) - 2)
+        h = knots[k + 1] - knots[k]
+        t = np.clip((z - knots[k]) / h, 0, 1)
+        y0, y1 = self.sigma[rows, k], self.sigma[rows, k + 1]
+        m0, m1 = self.slope[rows, k], self.slope[rows, k + 1]
+
+        t2, t3 = t * t, t * t * t
+        s = (2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * h * m0 \
+            + (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * h * m1
+        ds = ((6 * t2 - 6 * t) * y0 + (3 * t2 - 4 * t + 1) * h * m0
+              + (-6 * t2 + 6 * t) * y1 + (3 * t2 - 2 * t) * h * m1) / h
+        # Tails: slope decays exponentially from the end knots (C1, bounded sigma)
+        below, above = z < knots[0], z > knots[-1]
+        tau_lo, tau_hi = self.tau_lo[rows], self.tau_hi[rows]
+        decay_lo = np.exp(np.minimum(z - knots[0], 0) / tau_lo)
+        decay_hi = np.exp(-np.maximum(z - knots[-1], 0) / tau_hi)
+        m_lo, m_hi = self.slope[rows, 0], self.slope[rows, -1]
+        s = np.where(below, self.sigma[rows, 0] - m_lo * tau_lo * (1 - decay_lo), s)
+        s = np.where(above, self.sigma[rows, -1] + m_hi * tau_hi * (1 - decay_hi), s)
+        ds = np.where(below, m_lo * decay_lo, np.where(above, m_hi * decay_hi, ds))
+        return s, ds
+
+    def quantile(self, rows, p):
+        """Income at percentile p (0-100) for fit rows. Broadcasts rows against p."""
+        z = ndtri(_to_unit(p))
+        rows = np.asarray(rows)
+        s, ds = self._local_sigma(rows, z)
+        return self.scale[rows] * np.exp(z * s - s ** 2 / 2) * (1 - ds)
+
+    def lorenz(self, rows, p):
+        """Cumulative income share of the bottom p percent"""
+        z = ndtri(_to_unit(p))
+        s, _ = self._local_sigma(np.asarray(rows), z)
+        return ndtr(z - s)
+
+    def percentile_of(self, rows, income, iterations=60):
+        """Percentile (0-100) of an income level; vectorized bisection in z"""
+        rows, income = np.broadcast_arrays(np.asarray(rows), np.asarray(income, dtype=float))
+        ratio = income / self.scale[rows]
+        lo = np.full(ratio.shape, -self._Z_RANGE)
+        hi = np.full(ratio.shape, self._Z_RANGE)
+        for _ in range(iterations):
+            mid = (lo + hi) / 2
+            s, ds = self._local_sigma(rows, mid)
+            below = np.exp(mid * s - s ** 2 / 2) * (1 - ds) < ratio
+            lo = np.where(below, mid, lo)
+            hi = np.where(below, hi, mid)
+        return np.where(np.isnan(ratio), np.nan, ndtr((lo + hi) / 2) * 100)
+
+    # ---------- lookup ----------
+
+    def row_for(self, country, year=None):
+        """Fit row for a country-year (nearest available year; latest if year is None)"""
+        options = self._years_by_country.get(country)
+        if not options:
+            return None
+        if year is None:
+            return max(options)[1]
+        return min(options, key=lambda yi: (abs(yi[0] - year), -yi[0]))[1]
+
+    def get(self, country, year=None):
+        """CalibratedDistribution for a country-year, or None if no shares exist"""
+        row = self.row_for(country, year)
+        return None if row is None else CalibratedDistribution(self, row)
+
+    def countries(self):
+        return sorted(self._years_by_country)
+
+
+class CalibratedDistribution:
+    """
+    A single country-year view of ShareCalibratedDistributions.
+    Exposes the same interface as LognormalDistribution.
+    """
+
+    def __init__(self, engine, row):
+        self.engine = engine
+        self.row = row
+        self.country, self.year = engine.index[row]
+        self.has_income = bool(engine.has_income[row])
+
+    @property
+    def cache_key(self):
+        return ('wid', self.country, int(self.year))
+
+    def quantile(self, p):
+        return self.engine.quantile(self.row, p)
+
+    def cdf(self, x):
+        return self.engine.percentile_of(self.row, x)
+
+    def lorenz(self, p):
+        return self.engine.lorenz(self.row, p)
+
+    def mean(self):
+        return float(self.engine.scale[self.row])
+
+    def pdf_grid(self, x_max=None, n=500):
+        """Cached (x, normalized pdf) arrays for plotting. Do not mutate."""
+        x_max = float(x_max if x_max is not None else self.quantile(99.5))
+        key = (self.row, x_max, int(n))
+        cache = self.engine._pdf_cache
+        if key not in cache:
+            cache[key] = _pdf_from_cdf(self, x_max, int(n))
+        return cache[key]
+
+
+def _fill_knots(sigma):
+    """Fill NaN knot values from the nearest valid knot in the same row"""
+    sigma = sigma.copy()
+    for j in range(1, sigma.shape[1]):
+        sigma[:, j] = np.where(np.isnan(sigma[:, j]), sigma[:, j - 1], sigma[:, j])
+    for j in range(sigma.shape[1] - 2, -1, -1):
+        sigma[:, j] = np.where(np.isnan(sigma[:, j]), sigma[:, j + 1], sigma[:, j])
+    return sigma
+
+
+@st.cache_resource
+def get_wid_distributions():
+    """Fit every country-year in the WID share table once per process"""
+    from utils.data_loader import SouthAsiaDataLoader
+    return ShareCalibratedDistributions(SouthAsiaDataLoader().load_income_share_table())
+
+
+def distribution_from_key(key):
+    """Rebuild a distribution from its ``cache_key`` (lets st.cache_data key on plain tuples)"""
+    kind, *params = key
+    if kind == 'wid':
+        return get_wid_distributions().get(*params)
+    return LognormalDistribution(*params)
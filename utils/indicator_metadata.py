@@ -4,6 +4,10 @@ Provides user-friendly organization and descriptions for the curated indicators
 including Inequality, Education, Jobs, and Digital access.
 """
 
+import re
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import streamlit as st
@@ -24,7 +28,13 @@ INDICATOR_CATEGORIES = {
             "Bottom 50% Income Share",
             "Gini index",
             "Income share held by highest 10%",
-            "Income share held by lowest 20%"
+            "Income share held by lowest 20%",
+            "Gini (from WID shares)",
+            "Theil Index",
+            "Palma Ratio",
+            "S80/S20 Ratio",
+            "Top 10% / Bottom 50% Ratio",
+            "Top 1% / Bottom 50% Ratio"
         ]
     },
     
@@ -109,6 +119,12 @@ INDICATOR_DESCRIPTIONS = {
     "Top 1% Income Share": "The share of total national income earned by the richest 1% of the population.",
     "Middle 40% Income Share": "The share of income earned by the middle 40% (between the bottom 50% and top 10%).",
     "Bottom 50% Income Share": "The share of total national income earned by the poorest 50% of the population.",
+    "Gini (from WID shares)": "Gini index (0-100) computed from WID income shares, available for every year WID reports shares.",
+    "Theil Index": "Entropy-based inequality measure. 0 = perfect equality; higher values mean income is more concentrated.",
+    "Palma Ratio": "Income share of the richest 10% divided by the share of the poorest 40%.",
+    "S80/S20 Ratio": "Income share of the richest 20% divided by the share of the poorest 20%.",
+    "Top 10% / Bottom 50% Ratio": "How many times larger the richest 10%'s income share is than the poorest 50%'s.",
+    "Top 1% / Bottom 50% Ratio": "How many times larger the richest 1%'s income share is than the poorest 50%'s.",
     "Mean Income": "The average income per person in the country.",
     "Median Income": "The income level that divides the population into two equal groups (50th percentile).",
     "GDP Per Capita": "Total economic output (GDP) divided by the total population.",
@@ -125,58 +141,126 @@ INDICATOR_DESCRIPTIONS = {
 
 
 # ═══════════════════════════════════════════════════════════════════
-# HELPER FUNCTIONS
+# COMPILED PATTERN MATCHING
 # ═══════════════════════════════════════════════════════════════════
 
-# Removed cache to ensure data sync
-def get_available_indicators_by_category(df=None):
+class KeywordMatcher:
     """
-    Get indicators organized by category, filtered to only show those with actual data.
-    Now uses both explicit lists and pattern matching.
+    Case-insensitive substring matcher compiled into a single regex.
+    Equivalent to ``any(k.lower() in text.lower() for k in keywords)`` but
+    scans each string once and reports every keyword group that matched.
     """
-    if df is None:
-        from utils.loaders import load_inequality_data
-        df = load_inequality_data()
-    
-    available_indicators = set(df['indicator'].unique())
-    
+
+    def __init__(self, keyword_groups):
+        # keyword_groups: {group_key: [keywords...]}, group order is preserved
+        self.groups = list(keyword_groups.keys())
+        keyword_to_groups = {}
+        for idx, keywords in enumerate(keyword_groups.values()):
+            for kw in keywords:
+                keyword_to_groups.setdefault(kw.lower(), set()).add(idx)
+
+        # A hit on a keyword implies a hit on every keyword it contains
+        self._closure = {
+            kw: frozenset().union(*(g for other, g in keyword_to_groups.items() if other in kw))
+            for kw in keyword_to_groups
+        }
+
+        # Zero-width lookahead finds the longest keyword at every position,
+        # so overlapping keywords ("income share" / "share held by") all register
+        alternation = "|".join(re.escape(kw) for kw in sorted(keyword_to_groups, key=len, reverse=True))
+        self._regex = re.compile(f"(?=({alternation}))") if alternation else None
+
+    def match_groups(self, text):
+        """Return the sorted indices of all groups with a keyword in ``text``"""
+        if self._regex is None:
+            return ()
+        hits = set()
+        for kw in self._regex.findall(str(text).lower()):
+            hits |= self._closure[kw]
+        return tuple(sorted(hits))
+
+    def matches(self, text):
+        """True if any keyword occurs in ``text``"""
+        return self._regex is not None and self._regex.search(str(text).lower()) is not None
+
+    def contains(self, series):
+        """Vectorized ``matches`` over a Series (each distinct value is scanned once)"""
+        codes, uniques = pd.factorize(series)
+        # NaN rows get code -1, which indexes the trailing False slot
+        flags = np.array([self.matches(u) for u in uniques] + [False], dtype=bool)
+        return pd.Series(flags[codes], index=series.index)
+
+
+_CATEGORY_NAMES = list(INDICATOR_CATEGORIES.keys())
+_CATEGORY_EXACT = [set(info['indicators']) for info in INDICATOR_CATEGORIES.values()]
+_CATEGORY_MATCHER = KeywordMatcher(
+    {category: info.get('patterns', []) for category, info in INDICATOR_CATEGORIES.items()}
+)
+OTHER_CATEGORY = "📊 Other"
+
+
+@lru_cache(maxsize=4096)
+def _categories_for(indicator_name):
+    """Indices of every category an indicator belongs to (explicit list or pattern)"""
+    hits = set(_CATEGORY_MATCHER.match_groups(indicator_name))
+    hits.update(i for i, exact in enumerate(_CATEGORY_EXACT) if indicator_name in exact)
+    return tuple(sorted(hits))
+
+
+@lru_cache(maxsize=32)
+def _categorize_indicator_set(indicators):
+    """Category mapping for one dataset version, keyed by its frozen indicator set"""
+    buckets = {i: [] for i in range(len(_CATEGORY_NAMES))}
+    unmapped = []
+    for ind in indicators:
+        hits = _categories_for(ind)
+        if not hits:
+            unmapped.append(ind)
+        for i in hits:
+            buckets[i].append(ind)
+
     filtered_categories = {}
-    mapped_indicators = set()
-    
-    for category, info in INDICATOR_CATEGORIES.items():
-        # 1. Exact matches from the indicators list
-        indicator_list = info.get('indicators', [])
-        found_exact = [ind for ind in indicator_list if ind in available_indicators]
-        
-        # 2. Pattern matches for raw names
-        patterns = info.get('patterns', [])
-        found_patterns = []
-        for ind in available_indicators:
-            if ind not in indicator_list: # Don't double count
-                if any(p.lower() in str(ind).lower() for p in patterns):
-                    found_patterns.append(ind)
-        
-        # Combine
-        all_found = sorted(list(set(found_exact + found_patterns)))
-        
-        if all_found:
+    for i, category in enumerate(_CATEGORY_NAMES):
+        if buckets[i]:
             filtered_categories[category] = {
-                'description': info['description'],
-                'indicators': all_found
+                'description': INDICATOR_CATEGORIES[category]['description'],
+                'indicators': sorted(buckets[i])
             }
-            mapped_indicators.update(all_found)
-    
+
     # Fallback for unmapped indicators
-    unmapped = available_indicators - mapped_indicators
     if unmapped:
         filtered_categories["📊 Other Metrics"] = {
             'description': "Additional indicators and metrics",
-            'indicators': sorted(list(unmapped))
+            'indicators': sorted(unmapped)
         }
-    
+
     return filtered_categories
 
 
+# ═══════════════════════════════════════════════════════════════════
+# HELPER FUNCTIONS
+# ═══════════════════════════════════════════════════════════════════
+
+def get_available_indicators_by_category(df=None):
+    """
+    Get indicators organized by category, filtered to only show those with actual data.
+    Uses both explicit lists and pattern matching; the mapping is cached per
+    distinct indicator set, so reruns on the same dataset are dictionary lookups.
+    """
+    if df is None:
+        from utils.loaders import load_inequality_data
+        df = load_inequality_data()
+    
+    available_indicators = frozenset(df['indicator'].dropna().unique())
+    cached = _categorize_indicator_set(available_indicators)
+    
+    # Hand out copies so callers cannot mutate the cached mapping
+    return {
+        category: {'description': info['description'], 'indicators': list(info['indicators'])}
+        for category, info in cached.items()
+    }
+
+
 def get_indicator_description(indicator_name):
     """Get plain-English description for an indicator"""
     return INDICATOR_DESCRIPTIONS.get(indicator_name, f"Data for {indicator_name}")
@@ -192,9 +276,16 @@ def get_all_curated_indicators():
 
 def get_category_for_indicator(indicator_name):
     """Find which category an indicator belongs to"""
-    for category, info in INDICATOR_CATEGORIES.items():
-        if indicator_name in info['indicators']:
-            return category
-        if any(p.lower() in str(indicator_name).lower() for p in info.get('patterns', [])):
-            return category
-    return "📊 Other"
+    hits = _categories_for(indicator_name)
+    return _CATEGORY_NAMES[hits[0]] if hits else OTHER_CATEGORY
+
+
+def categorize(series):
+    """
+    Vectorized get_category_for_indicator for a whole column.
+    Each distinct indicator is resolved once and broadcast back to the rows.
+    """
+    codes, uniques = pd.factorize(series)
+    labels = np.array([get_category_for_indicator(u) for u in uniques] + [OTHER_CATEGORY], dtype=object)
+    # NaN rows get code -1, which indexes the trailing OTHER_CATEGORY slot
+    return pd.Series(labels[codes], index=series.index, name='category')
@@ -0,0 +1,207 @@
+"""
+Indicator Insights Engine
+Precomputed dominance tables for the Indicator Insights sunburst.
+
+Every (indicator, year) cross-section of the sunburst indicators is
+normalized once for all South Asian countries, and the per-country
+inequality-dominance scores and top drivers are derived for every year.
+The page then only slices the tables for the selected year and countries
+(a subset of countries is re-normalized among itself, see ``year_view``).
+
+Normalization (0-100 dominance):
+- Gini indicators keep their own scale (already 0-100)
+- HDI (0-1) is multiplied by 100
+- everything else is min-max scaled across countries within the year
+  (50 when all countries share one value)
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.indicator_metadata import KeywordMatcher
+from utils.loaders import data_version, load_inequality_data
+from utils.persistent_cache import persistent_cache
+
+# Indicator labels shown in the sunburst
+SUNBURST_ALLOWED_LABELS = {
+    "Gini index (World Bank estimate)",
+    "GINI index (World Bank estimate)",
+    "Gini index",
+    "Income share held by highest 10%",
+    "Income share held by highest 20%",
+    "Income share held by lowest 20%",
+    "Poverty headcount ratio at national poverty lines (% of population)",
+    "GDP per capita (current US$)",
+    "GDP growth (annual %)",
+    "Unemployment, total (% of total labor force) (modeled ILO estimate)",
+    "Vulnerable employment, total (% of total employment) (modeled ILO estimate)",
+    "Labor force, total",
+    "Individuals using the Internet (% of population)",
+    "Literacy rate, adult total (% of people ages 15 and above)",
+    "Inflation, consumer prices (annual %)",
+    "HDI"  # optional (only if present in the merged data)
+}
+
+# Indicators that carry the inequality signal
+INEQ_KEYWORDS = [
+    "gini",
+    "income share",
+    "poverty",
+    "unemployment",
+    "vulnerable employment",
+]
+INEQ_MATCHER = KeywordMatcher({"inequality": INEQ_KEYWORDS})
+
+TOP_DRIVERS = 3
+
+
+def normalize_dominance(df):
+    """
+    0-100 dominance of each value within its (indicator, year) cross-section.
+
+    Args:
+        df: Long-format rows with indicator, year and value (no zeros)
+
+    Returns:
+        ndarray aligned with ``df``
+    """
+    name = df["indicator"].str.strip().str.lower()
+    is_gini = name.str.contains("gini", regex=False).to_numpy()
+    is_hdi = ((name == "hdi") | name.str.contains("human development index", regex=False)).to_numpy()
+
+    values = df["value"].to_numpy(dtype=float)
+    grouped = df.groupby(["indicator", "year"])["value"]
+    vmin = grouped.transform("min").to_numpy(dtype=float)
+    vmax = grouped.transform("max").to_numpy(dtype=float)
+    spread = vmax - vmin
+    with np.errstate(invalid="ignore", divide="ignore"):
+        minmax = np.where(spread > 0, (values - vmin) / spread * 100, 50.0)
+
+    return np.select([is_gini, is_hdi], [values, values * 100], minmax)
+
+
+def _country_scores(scored):
+    """Per (year, country): inequality score, its share of total dominance and top drivers"""
+    keys = ["year", "country"]
+    totals = scored.groupby(keys).agg(
+        total=("normalized_value", "sum"),
+        has_ineq=("is_ineq", "any"),
+    )
+    totals["score"] = scored[scored["is_ineq"]].groupby(keys)["normalized_value"].sum()
+    totals["score"] = totals["score"].fillna(0.0)
+    totals["ineq_share"] = np.where(totals["total"] > 0, totals["score"] / totals["total"] * 100, 0.0)
+
+    # Drivers: strongest inequality indicators, else the strongest indicators overall
+    has_ineq = scored.set_index(keys).index.map(totals["has_ineq"]).to_numpy(dtype=bool)
+    candidates = scored[scored["is_ineq"].to_numpy() | ~has_ineq]
+    candidates = candidates.sort_values("normalized_value", ascending=False, kind="stable")
+    drivers = candidates.groupby(keys, sort=False).head(TOP_DRIVERS).groupby(keys)["indicator"].agg(list)
+    totals["top_drivers"] = drivers
+
+    return totals[["score", "ineq_share", "top_drivers"]]
+
+
+def _dominance(values):
+    """Normalized dominance per row, NaN for rows not shown (zero value or zero dominance)"""
+    shown = values["value"].to_numpy() != 0
+    normalized = np.full(len(values), np.nan)
+    normalized[shown] = normalize_dominance(values[shown])
+    normalized[~(normalized > 0)] = np.nan
+    return normalized
+
+
+def _with_scores(countries, values):
+    """Join score, ineq_share and top_drivers onto a (year, country)-indexed coverage table"""
+    scored = values.dropna(subset=["normalized_value"])
+    countries = countries.join(_country_scores(scored))
+    countries[["score", "ineq_share"]] = countries[["score", "ineq_share"]].fillna(0.0)
+    countries["top_drivers"] = [d if isinstance(d, list) else [] for d in countries["top_drivers"]]
+    return countries
+
+
+@persistent_cache
+def compute_insights_tables():
+    """
+    Build the Indicator Insights tables from the curated dataset.
+
+    Returns:
+        dict with
+        - 'values': one row per (year, country, indicator) with value,
+          normalized_value (NaN where the row is not shown: zero values or
+          zero dominance) and is_ineq
+        - 'countries': per (year, country) indicators_available, data_points,
+          score, ineq_share and top_drivers
+        - 'years': per year value_count, ind_count and coverage score
+          (value_count x ind_count, used to pick the default year)
+    """
+    df = load_inequality_data()
+    df = df.dropna(subset=["country", "year", "indicator", "value"])
+    df = df[df["indicator"].isin(SUNBURST_ALLOWED_LABELS)]
+    values = df[["year", "country", "indicator", "value"]].reset_index(drop=True)
+    values["year"] = values["year"].astype(int)
+    values["is_ineq"] = INEQ_MATCHER.contains(values["indicator"]).to_numpy()
+
+    values["normalized_value"] = _dominance(values)
+
+    countries = values.groupby(["year", "country"]).agg(
+        indicators_available=("indicator", "nunique"),
+        data_points=("value", "count"),
+    )
+    countries = _with_scores(countries, values)
+
+    years = values.groupby("year").agg(value_count=("value", "count"), ind_count=("indicator", "nunique"))
+    years["score"] = years["value_count"] * years["ind_count"]
+
+    return {
+        "values": values,
+        "countries": countries.reset_index(),
+        "years": years,
+    }
+
+
+@st.cache_resource(max_entries=2)
+def _load_insights_tables(version):
+    return compute_insights_tables()
+
+
+def get_insights_tables():
+    """Get the Indicator Insights tables for the current dataset version"""
+    return _load_insights_tables(data_version())
+
+
+def best_coverage_year(years):
+    """Year with the most data (values x indicators) in a tables['years'] slice"""
+    if years.empty:
+        return None
+    return int(years["score"].idxmax())
+
+
+def year_view(tables, year, countries=None):
+    """
+    Rows and per-country scores for one year, optionally limited to countries.
+
+    The precomputed tables are normalized across all countries; when only a
+    subset is in view, that slice is re-normalized among itself so dominance
+    stays relative to the countries shown.
+
+    Returns:
+        (values, country_scores): slices shaped like tables['values'] and
+        tables['countries']
+    """
+    values = tables["values"]
+    values = values[values["year"] == year]
+    scores = tables["countries"]
+    scores = scores[scores["year"] == year]
+    if not countries:
+        return values, scores
+
+    in_view = values["country"].isin(countries)
+    if in_view.all():
+        return values, scores[scores["country"].isin(countries)]
+
+    values = values[in_view].copy()
+    values["normalized_value"] = _dominance(values)
+    coverage = scores[scores["country"].isin(countries)].set_index(["year", "country"])
+    coverage = coverage[["indicators_available", "data_points"]]
+    return values, _with_scores(coverage, values).reset_index()
@@ -1,13 +1,54 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 import json
 from pathlib import Path
 
+from utils.persistent_cache import persistent_cache
+from utils.profiling import profiled
+
 # Data directories
 DATA_DIR = Path(__file__).parent.parent / 'data'
 PROCESSED_DIR = DATA_DIR / 'processed'
 GEO_DIR = DATA_DIR / 'geo'
 
+def data_version():
+    """Version stamp of the curated dataset; changes whenever the file is rewritten"""
+    try:
+        stat = (PROCESSED_DIR / "curated_indicators.csv").stat()
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+@persistent_cache
+@profiled("loaders.parse_curated_csv")
+def _read_curated_csv(csv_path):
+    """Parse and clean the curated CSV (shared across workers via the persistent cache)"""
+    df = pd.read_csv(csv_path)
+    
+    # Validate required columns
+    required_cols = ['country', 'year', 'indicator', 'value']
+    missing_cols = set(required_cols) - set(df.columns)
+    if missing_cols:
+        raise ValueError(f"Missing required columns: {missing_cols}")
+    
+    # Ensure correct data types
+    df['year'] = pd.to_numeric(df['year'], errors='coerce')
+    df['value'] = pd.to_numeric(df['value'], errors='coerce')
+    
+    # Remove rows with missing critical data
+    df = df.dropna(subset=['country', 'year', 'indicator', 'value'])
+    
+    # Clean country codes if they exist
+    if 'country_code' in df.columns:
+        df['country_code'] = df['country_code'].str.upper().str.strip()
+        
+    # Filter for year range 2000-2024
+    df = df[(df['year'] >= 2000) & (df['year'] <= 2024)]
+    
+    return df
+
+@profiled()
 @st.cache_data(ttl=3600)  # Cache for 1 hour to prevent excessive file reads
 def load_inequality_data():
     """Load the curated inequality dataset (12 focused indicators)"""
@@ -20,31 +61,11 @@ def load_inequality_data():
             st.info("Please run the curation script: scripts/curate_indicator_dataset.py")
             return pd.DataFrame()
         
-        df = pd.read_csv(csv_path)
-        
-        # Validate required columns
-        required_cols = ['country', 'year', 'indicator', 'value']
-        missing_cols = set(required_cols) - set(df.columns)
-        if missing_cols:
-            st.error(f"Missing required columns: {missing_cols}")
-            return pd.DataFrame()
-        
-        # Ensure correct data types
-        df['year'] = pd.to_numeric(df['year'], errors='coerce')
-        df['value'] = pd.to_numeric(df['value'], errors='coerce')
-        
-        # Remove rows with missing critical data
-        df = df.dropna(subset=['country', 'year', 'indicator', 'value'])
-        
-        # Clean country codes if they exist
-        if 'country_code' in df.columns:
-            df['country_code'] = df['country_code'].str.upper().str.strip()
-            
-        # Filter for year range 2000-2024
-        df = df[(df['year'] >= 2000) & (df['year'] <= 2024)]
-        
-        return df
+        return _read_curated_csv(str(csv_path))
         
+    except ValueError as e:
+        st.error(str(e))
+        return pd.DataFrame()
     except Exception as e:
         st.error(f"❌ Error loading curated data: {str(e)}")
         return pd.DataFrame()
@@ -55,6 +76,37 @@ def load_all_indicators():
     """Load all indicators (redirected to curated set for consistency)"""
     return load_inequality_data()
 
+# Years expected per country-indicator series (2000-2024)
+EXPECTED_YEARS = 25
+
+@profiled()
+@persistent_cache
+def compute_quality_audit():
+    """Completeness audit (country x indicator) of the curated dataset"""
+    df = load_inequality_data()
+    if df.empty:
+        return pd.DataFrame()
+    
+    # Group by Country + Indicator
+    aggregations = dict(
+        record_count=('value', 'count'),
+        min_year=('year', 'min'),
+        max_year=('year', 'max')
+    )
+    if 'source' in df.columns:
+        # Take first source found for each country-indicator pair
+        aggregations['source'] = ('source', 'first')
+    audit = df.groupby(['country', 'indicator']).agg(**aggregations).reset_index()
+    
+    # Calculate completeness (capped at 100%)
+    audit['completeness'] = (audit['record_count'] / EXPECTED_YEARS * 100).clip(upper=100)
+    if 'source' in audit.columns:
+        audit['source'] = audit['source'].fillna('World Bank / Derived')
+    else:
+        audit['source'] = 'World Bank / Derived'
+    audit['issues'] = np.where(audit['completeness'] < 50, "Low coverage", "Good")
+    return audit
+
 @st.cache_data(ttl=3600)
 def load_quality_audit():
     """Load data quality audit"""
@@ -68,6 +120,7 @@ def load_quality_audit():
         st.warning(f"Error loading quality audit: {str(e)}")
         return pd.DataFrame()
 
+@profiled()
 @st.cache_resource
 def load_geojson():
     """Load GeoJSON file for South Asian countries"""
@@ -0,0 +1,289 @@
+"""
+Persistent Cache Tier
+Cross-process, restart-surviving cache for expensive ``utils`` computations.
+
+``st.cache_data`` keeps results inside one process, so every Render worker
+(and every restart) recomputes the same pivots, audits and API summaries.
+Functions decorated with ``@persistent_cache`` also store their results on
+local disk, keyed by function, arguments and dataset version, where every
+worker on the host can reuse them.
+
+Backends (``CACHE_BACKEND`` environment variable):
+- ``diskcache``: diskcache.Cache with LRU eviction (default when installed)
+- ``sqlite``:    stdlib SQLite file with LRU eviction (default otherwise)
+- ``none``:      disable the persistent tier
+Further backends can be added with ``register_cache_backend``.
+
+``CACHE_DIR`` (default ``data/cache``) and ``CACHE_SIZE_MB`` (default 512)
+control where entries live and the size bound.
+
+Arguments whose names start with an underscore are not hashed, matching the
+``st.cache_data`` convention (e.g. ``_self``).
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / 'data' / 'cache'
+DEFAULT_SIZE_MB = 512
+
+_MISS = object()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BACKENDS
+# ═══════════════════════════════════════════════════════════════════
+
+class SQLiteCacheBackend:
+    """
+    Size-bounded LRU cache in a single SQLite file (WAL mode), safe to share
+    between processes. One connection per thread.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.path = Path(directory) / 'cache.sqlite3'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+                " expires REAL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _MISS
+        value, expires = row
+        now = time.time()
+        if expires is not None and expires < now:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return _MISS
+        conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        return pickle.loads(value)
+
+    def set(self, key, value, expire=None):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, len(blob), now + expire if expire else None, now)
+        )
+        self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop expired entries, then least recently used ones until under the size bound"""
+        conn.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+    def stats(self):
+        count, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'backend': 'sqlite', 'entries': count, 'bytes': size, 'path': str(self.path)}
+
+
+class DiskCacheBackend:
+    """diskcache.Cache with least-recently-used eviction"""
+
+    def __init__(self, directory, max_bytes):
+        import diskcache
+        self._cache = diskcache.Cache(
+            str(directory), size_limit=max_bytes, eviction_policy='least-recently-used')
+
+    def get(self, key):
+        return self._cache.get(key, default=_MISS)
+
+    def set(self, key, value, expire=None):
+        self._cache.set(key, value, expire=expire)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return {'backend': 'diskcache', 'entries': len(self._cache),
+                'bytes': self._cache.volume(), 'path': self._cache.directory}
+
+
+_BACKENDS = {
+    'sqlite': SQLiteCacheBackend,
+    'diskcache': DiskCacheBackend,
+}
+
+
+def register_cache_backend(name, factory):
+    """Register a backend: factory(directory, max_bytes) -> object with get/set/clear/stats"""
+    _BACKENDS[name] = factory
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _default_backend_name():
+    try:
+        import diskcache  # noqa: F401
+        return 'diskcache'
+    except ImportError:
+        return 'sqlite'
+
+
+def get_cache_backend():
+    """The process-wide persistent cache backend (None when disabled or unavailable)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get('CACHE_BACKEND', '').lower() or _default_backend_name()
+                directory = os.environ.get('CACHE_DIR') or DEFAULT_CACHE_DIR
+                max_bytes = int(float(os.environ.get('CACHE_SIZE_MB', DEFAULT_SIZE_MB)) * 1024 * 1024)
+                backend = False
+                if name in _BACKENDS:
+                    try:
+                        backend = _BACKENDS[name](directory, max_bytes)
+                    except Exception as e:
+                        print(f"Persistent cache disabled ({name}): {e}")
+                _backend = backend
+    return _backend or None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# KEYS + DECORATOR
+# ═══════════════════════════════════════════════════════════════════
+
+def _hash_value(digest, value):
+    """Feed a stable representation of ``value`` into ``digest``"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(type(value).__name__.encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(repr((list(names), list(value.index.names))).encode())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}[{len(value)}]".encode())
+        for item in value:
+            _hash_value(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"dict[{len(value)}]".encode())
+        for k in sorted(value, key=repr):
+            _hash_value(digest, k)
+            _hash_value(digest, value[k])
+    elif isinstance(value, (set, frozenset)):
+        digest.update(f"set[{len(value)}]".encode())
+        for item in sorted(value, key=repr):
+            _hash_value(digest, item)
+    else:
+        digest.update(repr((type(value).__name__, value)).encode())
+
+
+def cache_key(func, args, kwargs, versioned=True):
+    """Key for a call: function, hashed arguments (minus _-prefixed ones) and data version"""
+    from utils.loaders import data_version  # utils.loaders itself uses this module
+
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    digest = hashlib.sha256(f"{func.__module__}.{func.__qualname__}".encode())
+    if versioned:
+        digest.update(f"|version={data_version()}".encode())
+    for name, value in bound.arguments.items():
+        if name.startswith('_'):
+            continue
+        digest.update(f"|{name}=".encode())
+        _hash_value(digest, value)
+    return digest.hexdigest()
+
+
+def is_cached(func, *args, **kwargs):
+    """True if a @persistent_cache function already has a stored result for these arguments"""
+    backend = get_cache_backend()
+    if backend is None:
+        return False
+    original = func.uncached
+    versioned = func.versioned
+    try:
+        return backend.get(cache_key(original, args, kwargs, versioned)) is not _MISS
+    except Exception:
+        return False
+
+
+def persistent_cache(func=None, *, ttl=None, versioned=True, cache_if=None):
+    """
+    Cache a function's results in the persistent (cross-process) tier.
+
+    Args:
+        ttl: Seconds an entry stays valid (None: until evicted or the key changes)
+        versioned: Include the curated dataset version in the key, so results
+            computed from an older dataset are never reused
+        cache_if: Optional predicate on the result; results failing it (e.g. an
+            empty frame from a failed download) are returned but not stored
+
+    Cache failures never break the call: the function simply runs uncached.
+    """
+    def decorate(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            backend = get_cache_backend()
+            if backend is None:
+                return f(*args, **kwargs)
+            try:
+                key = cache_key(f, args, kwargs, versioned)
+                value = backend.get(key)
+            except Exception:
+                key, value = None, _MISS
+            if value is not _MISS:
+                return value
+
+            value = f(*args, **kwargs)
+            if key is not None and (cache_if is None or cache_if(value)):
+                try:
+                    backend.set(key, value, expire=ttl)
+                except Exception:
+                    pass  # Unpicklable result or backend error: keep the computed value
+            return value
+
+        wrapper.uncached = f
+        wrapper.versioned = versioned
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
@@ -0,0 +1,240 @@
+"""
+Render Profiling
+Lightweight stage timing for pages and loaders, enabled by environment variables:
+
+- PROFILE_STAGES=1         record stages and show a timing panel in the sidebar
+- PROFILE_LOG=<path>       also append one JSON line per stage ('-' for stdout)
+- PROFILE_METRICS=<path>   also write Prometheus text-format metrics to a file
+                           (node-exporter textfile style; api.py serves /metrics)
+
+Usage:
+    with stage("dashboard.filter"):        # block
+        ...
+    @profiled("worldbank.fetch")           # function
+    def fetch(...): ...
+    lap("Figures")                         # page section since the previous lap
+
+Each record holds wall time, call count and resident-memory delta. When
+profiling is off, stage() and profiled() cost one attribute check.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import streamlit as st
+
+ENABLED = os.environ.get('PROFILE_STAGES', '').lower() in ('1', 'true', 'yes', 'on')
+LOG_PATH = os.environ.get('PROFILE_LOG')
+METRICS_PATH = os.environ.get('PROFILE_METRICS')
+
+# Rewrite the Prometheus file at most this often (seconds)
+_METRICS_INTERVAL = 1.0
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _rss_bytes():
+    """Current resident set size (Linux /proc; peak RSS elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# ═══════════════════════════════════════════════════════════════════
+# COLLECTORS
+# ═══════════════════════════════════════════════════════════════════
+
+class _Totals:
+    """Process-wide per-stage counters (for Prometheus output)"""
+
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+        self._last_write = 0.0
+
+    def add(self, name, seconds, rss_delta):
+        with self.lock:
+            entry = self.stats.setdefault(name, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += rss_delta
+
+    def prometheus(self):
+        with self.lock:
+            items = sorted(self.stats.items())
+        lines = [
+            "# HELP saii_stage_calls_total Calls of an instrumented stage",
+            "# TYPE saii_stage_calls_total counter",
+        ]
+        lines += [f'saii_stage_calls_total{{stage="{n}"}} {c}' for n, (c, _, _) in items]
+        lines += [
+            "# HELP saii_stage_seconds_total Wall time spent in an instrumented stage",
+            "# TYPE saii_stage_seconds_total counter",
+        ]
+        lines += [f'saii_stage_seconds_total{{stage="{n}"}} {s:.6f}' for n, (_, s, _) in items]
+        lines += [
+            "# HELP saii_stage_rss_delta_bytes_total Resident memory change across a stage",
+            "# TYPE saii_stage_rss_delta_bytes_total counter",
+        ]
+        lines += [f'saii_stage_rss_delta_bytes_total{{stage="{n}"}} {m}' for n, (_, _, m) in items]
+        return "\n".join(lines) + "\n"
+
+    def maybe_write(self, force=False):
+        if not METRICS_PATH:
+            return
+        now = time.time()
+        if not force and now - self._last_write < _METRICS_INTERVAL:
+            return
+        self._last_write = now
+        tmp = f"{METRICS_PATH}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus())
+        os.replace(tmp, METRICS_PATH)
+
+
+_totals = _Totals()
+_log_lock = threading.Lock()
+# Per-thread page run (Streamlit executes each rerun on its own script thread)
+_local = threading.local()
+
+
+def _write_log(record):
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        if LOG_PATH == '-':
+            print(line, flush=True)
+        else:
+            with open(LOG_PATH, 'a') as f:
+                f.write(line + "\n")
+
+
+def _record(name, seconds, rss_delta, depth):
+    _totals.add(name, seconds, rss_delta)
+    run = getattr(_local, 'run', None)
+    if run is not None:
+        entry = run['stages'].setdefault(name, {'depth': depth, 'calls': 0, 'seconds': 0.0, 'rss_delta': 0})
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['rss_delta'] += rss_delta
+    if LOG_PATH:
+        _write_log({
+            'ts': time.time(),
+            'page': run['page'] if run else None,
+            'stage': name,
+            'seconds': round(seconds, 6),
+            'rss_delta_bytes': rss_delta,
+            'thread': threading.current_thread().name,
+        })
+    if depth == 0:
+        _totals.maybe_write()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PUBLIC API
+# ═══════════════════════════════════════════════════════════════════
+
+@contextmanager
+def _timed(name):
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _local.depth = depth
+        _record(name, seconds, _rss_bytes() - rss_before, depth)
+
+
+@contextmanager
+def _noop():
+    yield
+
+
+def stage(name):
+    """Context manager timing a named stage (no-op unless PROFILE_STAGES is set)"""
+    return _timed(name) if ENABLED else _noop()
+
+
+def profiled(name=None):
+    """Decorator timing every call of a function as one stage"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+        stage_name = name or f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timed(stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_page(page):
+    """
+    Begin profiling a page rerun: resets the per-run stages and places the
+    timing panel in the sidebar (filled in at every lap).
+    """
+    if not ENABLED:
+        return
+    with st.sidebar:
+        expander = st.expander("⏱️ Render timing", expanded=False)
+    _local.run = {
+        'page': page,
+        'start': time.perf_counter(),
+        'lap': time.perf_counter(),
+        'rss_lap': _rss_bytes(),
+        'stages': OrderedDict(),
+        'panel': expander.empty(),
+    }
+    _local.depth = 0
+
+
+def lap(name):
+    """Record the page section that ran since the previous lap (or start_page)"""
+    run = getattr(_local, 'run', None) if ENABLED else None
+    if run is None:
+        return
+    now, rss = time.perf_counter(), _rss_bytes()
+    seconds, rss_delta = now - run['lap'], rss - run['rss_lap']
+    run['lap'], run['rss_lap'] = now, rss
+    _record(f"{run['page']}: {name}", seconds, rss_delta, 0)
+    # Only laps redraw the panel: stages may run inside st.cache_data functions,
+    # where emitting elements would be replayed on every cache hit
+    _refresh_panel(run)
+
+
+def _refresh_panel(run):
+    import pandas as pd
+
+    rows = [{
+        'Stage': "  " * info['depth'] + name,
+        'Calls': info['calls'],
+        'Total ms': round(info['seconds'] * 1000, 1),
+        'Mean ms': round(info['seconds'] * 1000 / info['calls'], 2),
+        'Mem Δ MB': round(info['rss_delta'] / 1024 ** 2, 2),
+    } for name, info in run['stages'].items()]
+    elapsed = (time.perf_counter() - run['start']) * 1000
+    try:
+        with run['panel'].container():
+            st.caption(f"{run['page']}: {elapsed:.0f} ms so far, RSS {_rss_bytes() / 1024 ** 2:.0f} MB")
+            st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    except Exception:
+        pass  # No script context (e.g. a worker thread); totals and logs still recorded
+
+
+def prometheus_metrics():
+    """Prometheus text exposition of the process-wide stage counters"""
+    return _totals.prometheus()
@@ -0,0 +1,172 @@
+"""
+Ranking Component
+Ranks, bar widths, colours and tiers for the ranking views (Dashboard
+ranking list, Map Analysis rankings table, Temporal Comparison tiers).
+
+Everything is computed column-wise, and each view is rendered as a single
+element (one HTML block or one st.dataframe) instead of one element per
+country.
+"""
+
+import html
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Bar colours for ranks 1-3; lower ranks use the neutral colour
+PODIUM_COLORS = ['#10b981', '#3b82f6', '#8b5cf6']
+DEFAULT_BAR_COLOR = '#64748b'
+
+# Sankey link colours by tier movement
+FLOW_COLORS = {
+    'same': 'rgba(150, 150, 150, 0.3)',
+    'worse': 'rgba(231, 76, 60, 0.5)',
+    'better': 'rgba(46, 204, 113, 0.5)',
+}
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RANKS
+# ═══════════════════════════════════════════════════════════════════
+
+def rank_table(df, value_column='value', higher_is_better=True, method='first'):
+    """
+    Sort rows best-first and add rank, bar_pct and bar_color.
+
+    Bars: when higher is better, each value as a share of the largest; when
+    lower is better, its position between the worst (0%) and best (100%).
+
+    Args:
+        df: One row per country (rows without a value are dropped)
+        value_column: Column to rank on
+        higher_is_better: Direction of the indicator
+        method: Ties: 'first' (list position) or 'min' (shared rank)
+
+    Returns:
+        Sorted copy of df with rank (int), bar_pct (0-100) and bar_color
+    """
+    table = df.dropna(subset=[value_column])
+    table = table.sort_values(value_column, ascending=not higher_is_better, kind='stable').reset_index(drop=True)
+    if table.empty:
+        return table.assign(rank=pd.Series(dtype=int), bar_pct=pd.Series(dtype=float),
+                            bar_color=pd.Series(dtype=object))
+
+    values = table[value_column].to_numpy(dtype=float)
+    table['rank'] = table[value_column].rank(ascending=not higher_is_better, method=method).astype(int)
+
+    vmin, vmax = values.min(), values.max()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if higher_is_better:
+            pct = values / vmax * 100
+        elif vmax != vmin:
+            pct = (vmax - values) / (vmax - vmin) * 100
+        else:
+            pct = np.full(len(values), 100.0)
+    table['bar_pct'] = np.clip(np.nan_to_num(pct), 0, 100)
+
+    palette = np.array(PODIUM_COLORS + [DEFAULT_BAR_COLOR], dtype=object)
+    table['bar_color'] = palette[np.minimum(table['rank'].to_numpy(), len(palette)) - 1]
+    return table
+
+
+def render_ranking_list(table, value_column='value', label_column='country', value_format='{:.2f}'):
+    """Render a rank_table as one HTML list (rank, label, value and a bar per row)"""
+    if table.empty:
+        return
+    rows = (
+        '<div style="margin-bottom: 12px;">'
+        '<div style="display: flex; justify-content: space-between; margin-bottom: 4px;">'
+        '<span style="color: #e2e8f0; font-size: 0.9rem; font-weight: 500;">#'
+        + table['rank'].astype(str) + ' ' + table[label_column].astype(str).map(html.escape)
+        + '</span><span style="color: #ffffff; font-weight: 600; font-size: 0.9rem;">'
+        + table[value_column].map(value_format.format)
+        + '</span></div>'
+        '<div style="background: rgba(100, 116, 139, 0.2); border-radius: 4px; height: 6px; overflow: hidden;">'
+        '<div style="background: ' + table['bar_color'] + '; height: 100%; width: '
+        + table['bar_pct'].round(2).astype(str)
+        + '%; border-radius: 4px;"></div></div></div>'
+    )
+    st.markdown(f'<div class="ranking-list">{"".join(rows)}</div>', unsafe_allow_html=True)
+
+
+def ranking_column_config(bar_column='Standing', value_column=None, value_format='%.2f',
+                          higher_is_better=True):
+    """
+    st.dataframe column_config showing rank_table's bar_pct as a progress bar
+    (pass the same higher_is_better as rank_table; it sets the bar's help text)
+    """
+    bar_help = ("Value as a share of the highest country's value" if higher_is_better
+                else "Position between the worst (0%) and best (100%) country")
+    config = {
+        'Rank': st.column_config.NumberColumn('Rank', format='#%d', width='small'),
+        bar_column: st.column_config.ProgressColumn(
+            bar_column, min_value=0, max_value=100, format='%.0f%%', help=bar_help
+        ),
+    }
+    if value_column:
+        config[value_column] = st.column_config.NumberColumn(value_column, format=value_format)
+    return config
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TIERS
+# ═══════════════════════════════════════════════════════════════════
+
+def tier_labels(n_countries):
+    """Tier names: three tiers for fewer than 8 countries, quartiles otherwise"""
+    if n_countries < 8:
+        return ['Top Tier', 'Middle Tier', 'Bottom Tier']
+    return ['Top 25%', 'Upper Middle', 'Lower Middle', 'Bottom 25%']
+
+
+def assign_tiers(rank_then, rank_now, labels):
+    """
+    Tier of every rank in two periods (quantiles of the ranks).
+
+    Returns:
+        (tiers_then, tiers_now, fallback): categorical Series; fallback is True
+        when the ranks could not be split into quantiles and equal-width rank
+        bins were used instead
+    """
+    try:
+        return (pd.qcut(rank_then, q=len(labels), labels=labels, duplicates='drop'),
+                pd.qcut(rank_now, q=len(labels), labels=labels, duplicates='drop'),
+                False)
+    except ValueError:
+        max_rank = max(rank_then.max(), rank_now.max())
+        bins = [0] + [max_rank * (i + 1) / len(labels) for i in range(len(labels))]
+        return (pd.cut(rank_then, bins=bins, labels=labels, include_lowest=True),
+                pd.cut(rank_now, bins=bins, labels=labels, include_lowest=True),
+                True)
+
+
+def tier_flows(tiers_then, tiers_now, labels):
+    """
+    Sankey links between THEN tiers (nodes 0..k-1) and NOW tiers (k..2k-1).
+
+    Returns:
+        dict with source, target, value and color lists; links are grey within
+        a tier, red to a worse tier and green to a better one
+    """
+    k = len(labels)
+    src = pd.Categorical(tiers_then, categories=labels).codes
+    tgt = pd.Categorical(tiers_now, categories=labels).codes
+    valid = (src >= 0) & (tgt >= 0)
+    pairs, counts = np.unique(np.column_stack([src[valid], tgt[valid]]).reshape(-1, 2), axis=0, return_counts=True)
+    src, tgt = pairs[:, 0], pairs[:, 1]
+    colors = np.select([src == tgt, tgt > src], [FLOW_COLORS['same'], FLOW_COLORS['worse']], FLOW_COLORS['better'])
+    return {
+        'source': src.tolist(),
+        'target': (tgt + k).tolist(),
+        'value': counts.tolist(),
+        'color': colors.tolist(),
+    }
+
+
+def tier_movement(tiers_then, tiers_now, rank_change):
+    """Movement label per country (same tier / better rank / worse rank)"""
+    same = np.asarray(tiers_then == tiers_now, dtype=bool)
+    improved = np.asarray(rank_change > 0, dtype=bool)
+    return np.select([same, improved], ['➡️ Stayed in Same Tier', '⬆️ Improved (Better Rank)'],
+                     '⬇️ Worsened (Worse Rank)')
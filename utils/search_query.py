@@ -0,0 +1,314 @@
+"""
+Smart Search Query Compiler
+Turns a free-text Smart Search query into a structured filter plan and runs
+it against an indexed indicator cube.
+
+A plan is a plain dict with a ``type`` (help, navigation, comparison, export,
+ranking, multi_search) and the entities it selects: countries, indicators,
+years / time_range, category, ranking order + top-k. All keyword tables are
+compiled once into single-pass matchers; plans and their results are cached
+per normalized query, so repeated and near-identical searches (bookmarks,
+history clicks, extra spaces or capitals) cost nothing.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from utils.indicator_metadata import KeywordMatcher
+from utils.loaders import data_version
+from utils.search_service import get_search_service
+from utils.utils import human_indicator
+
+# ═══════════════════════════════════════════════════════════════════
+# QUERY VOCABULARY
+# ═══════════════════════════════════════════════════════════════════
+
+# Navigation commands (first match in this order wins)
+COMMAND_KEYWORDS = {
+    # Core pages
+    'map': 'pages/3_Map_Analysis.py',
+    'correlation': 'pages/4_Correlations.py',
+    'dashboard': 'pages/1_Dashboard.py',
+    'simulator': 'pages/5_Income_Simulator.py',
+    'temporal': 'pages/8_Temporal_Comparison.py',
+    'quality': 'pages/6_Data_Quality.py',
+    'insights': 'pages/7_Indicator_Insights.py',
+    'help': 'pages/9_Help.py',
+    'home': 'home.py',
+
+    # Aliases
+    'income': 'pages/5_Income_Simulator.py',
+    'compare': 'pages/8_Temporal_Comparison.py',
+    'data': 'pages/6_Data_Quality.py',
+    'sunburst': 'pages/7_Indicator_Insights.py',
+    'overview': 'pages/1_Dashboard.py',
+    'summary': 'pages/1_Dashboard.py',
+}
+
+# Category keywords
+CATEGORY_KEYWORDS = {
+    'poverty': 'Poverty',
+    'inequality': 'Income Inequality',
+    'income': 'Income & Growth',
+    'education': 'Education',
+    'employment': 'Employment',
+    'infrastructure': 'Infrastructure',
+    'health': 'Health',
+    'economic': 'Income & Growth',
+    'labor': 'Employment',
+}
+
+# Time range shortcuts: keyword -> (start, end) given (min_year, max_year)
+TIME_RANGES = {
+    'recent': lambda lo, hi: (hi - 4, hi),
+    'last 5 years': lambda lo, hi: (hi - 4, hi),
+    'last decade': lambda lo, hi: (hi - 9, hi),
+    'last 10 years': lambda lo, hi: (hi - 9, hi),
+    '2020s': lambda lo, hi: (2020, hi),
+    '2010s': lambda lo, hi: (2010, 2019),
+    '2000s': lambda lo, hi: (2000, 2009),
+    'all time': lambda lo, hi: (lo, hi),
+    'full range': lambda lo, hi: (lo, hi),
+    'complete': lambda lo, hi: (lo, hi),
+}
+
+INTENT_KEYWORDS = {
+    'help': ['how to', 'what is', 'explain', 'help', 'tutorial'],
+    'comparison': ['compare', 'vs', 'versus'],
+    'export': ['export', 'download', 'save'],
+    'ranking': ['top', 'bottom', 'best', 'worst', 'rank', 'highest', 'lowest'],
+}
+# Ranking words that sort ascending (everything else ranks highest first)
+ASCENDING_RANK_WORDS = ('bottom', 'lowest')
+
+DEFAULT_TOP_K = 5
+
+_YEAR_RANGE = re.compile(r'(\d{4})\s*(?:-|to)+\s*(\d{4})')
+_YEAR = re.compile(r'\b((?:19|20)\d{2})\b')
+_TOP_K = re.compile(r'\b(?:top|bottom|best|worst|highest|lowest)\s+(\d{1,2})\b')
+
+
+def normalize_query(query):
+    """Canonical form used as the cache key: lowercase, unified dashes, single spaces"""
+    text = str(query).lower().replace('–', '-').replace('—', '-')
+    text = re.sub(r'[^\w\s%/&-]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# COMPILER
+# ═══════════════════════════════════════════════════════════════════
+
+class SearchQueryCompiler:
+    """
+    Compiles queries into filter plans for one dataset version and executes
+    them against an indexed (indicator, country, year) cube.
+    Plans and results are shared between sessions; treat them as read-only.
+    """
+
+    def __init__(self, service, max_cached=512):
+        self.service = service
+        self.max_cached = max_cached
+        self._plans = OrderedDict()
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._commands = KeywordMatcher({k: [k] for k in COMMAND_KEYWORDS})
+        self._categories = KeywordMatcher({k: [k] for k in CATEGORY_KEYWORDS})
+        self._time_ranges = KeywordMatcher({k: [k] for k in TIME_RANGES})
+        self._intents = KeywordMatcher(INTENT_KEYWORDS)
+        self._countries = KeywordMatcher({c: [c] for c in service.countries})
+
+        # Indicator search is "query is a substring of the name" (raw or human
+        # readable): scan one joined haystack instead of every name per query
+        names = [f"{ind.lower()}\n{human_indicator(ind).lower()}" for ind in service.indicators]
+        self._haystack = "\x00".join(names)
+        self._offsets = np.cumsum([0] + [len(name) + 1 for name in names[:-1]])
+
+        # Indexed cube for plan execution
+        df = service.df
+        self.cube = df.set_index(['indicator', 'country', 'year'])['value'].sort_index()
+
+    # ---------- entity extraction ----------
+
+    def _find_indicators(self, needle):
+        if not needle:
+            return []
+        hits, start = set(), self._haystack.find(needle)
+        while start != -1:
+            idx = self._offsets.searchsorted(start, side='right') - 1
+            hits.add(self.service.indicators[idx])
+            start = self._haystack.find(needle, start + 1)
+        return sorted(hits)
+
+    def _time_range(self, text):
+        lo, hi = self.service.min_year, self.service.max_year
+        hits = self._time_ranges.match_groups(text)
+        if hits:
+            return TIME_RANGES[self._time_ranges.groups[hits[0]]](lo, hi)
+        match = _YEAR_RANGE.search(text)
+        if match:
+            start, end = int(match.group(1)), int(match.group(2))
+            if lo <= start <= hi and lo <= end <= hi:
+                return (start, end)
+        return None
+
+    # ---------- compilation ----------
+
+    def _compile(self, text, query):
+        intents = {self._intents.groups[i] for i in self._intents.match_groups(text)}
+        countries = [self.service.countries[i] for i in self._countries.match_groups(text)]
+
+        # Priority 1: Help commands
+        if 'help' in intents:
+            return {'type': 'help', 'query': query, 'page': 'pages/9_Help.py'}
+
+        # Priority 2: Navigation commands
+        commands = self._commands.match_groups(text)
+        if commands:
+            keyword = self._commands.groups[commands[0]]
+            return {'type': 'navigation', 'page': COMMAND_KEYWORDS[keyword], 'keyword': keyword}
+
+        # Priority 3: Comparisons of two or more countries
+        if 'comparison' in intents and len(countries) >= 2:
+            return {'type': 'comparison', 'countries': countries, 'action': 'navigate',
+                    'page': 'pages/1_Dashboard.py', 'indicator': self.service.gini_indicator}
+
+        # Priority 4: Export commands
+        if 'export' in intents:
+            return {'type': 'export',
+                    'message': 'Navigate to Dashboard or Map page, then use the download buttons for PNG, SVG, HTML, or JSON export.'}
+
+        time_range = self._time_range(text)
+        categories = self._categories.match_groups(text)
+        category = CATEGORY_KEYWORDS[self._categories.groups[categories[0]]] if categories else None
+        indicators = self._find_indicators(text) or self._find_indicators(self._residual(text))
+        years = [int(y) for y in _YEAR.findall(text)
+                 if self.service.min_year <= int(y) <= self.service.max_year]
+
+        # Priority 5: Ranking / top-k
+        if 'ranking' in intents:
+            top_k = _TOP_K.search(text)
+            return {
+                'type': 'ranking',
+                'query': query,
+                'message': 'Navigate to Dashboard for country rankings and comparisons.',
+                'indicator': indicators[0] if indicators else self.service.gini_indicator,
+                'countries': countries,
+                'year': years[-1] if years else (time_range[1] if time_range else None),
+                'ascending': any(w in text for w in ASCENDING_RANK_WORDS),
+                'k': int(top_k.group(1)) if top_k else DEFAULT_TOP_K,
+            }
+
+        # Priority 6+: Entity search
+        return {
+            'type': 'multi_search',
+            'countries': countries,
+            'indicators': indicators,
+            'years': years,
+            'time_range': time_range,
+            'category': category,
+            'query': query
+        }
+
+    def _residual(self, text):
+        """Query text with recognised non-indicator words removed"""
+        words = set(COMMAND_KEYWORDS) | set(TIME_RANGES) | {w for ws in INTENT_KEYWORDS.values() for w in ws}
+        words |= {c.lower() for c in self.service.countries}
+        residual = text
+        for word in sorted(words, key=len, reverse=True):
+            residual = re.sub(rf'\b{re.escape(word)}\b', ' ', residual)
+        residual = _YEAR.sub(' ', _YEAR_RANGE.sub(' ', residual))
+        residual = re.sub(r'\b\d{1,2}\b', ' ', residual)
+        residual = re.sub(r'\s+', ' ', residual).strip()
+        return residual if len(residual) >= 3 else ''
+
+    def compile(self, query):
+        """Filter plan for a query (None for blank queries). Cached per normalized query."""
+        text = normalize_query(query)
+        if not text:
+            return None
+        with self._lock:
+            if text in self._plans:
+                self._plans.move_to_end(text)
+                return self._plans[text]
+        plan = self._compile(text, query)
+        with self._lock:
+            _remember(self._plans, text, plan, self.max_cached)
+        return plan
+
+    # ---------- execution ----------
+
+    def select(self, indicators, countries=None, years=None):
+        """Cube values for indicators, optionally limited to countries and a (start, end) year range"""
+        cube = self.cube
+        idx = cube.index
+        mask = idx.get_level_values('indicator').isin(indicators)
+        if countries:
+            mask = mask & idx.get_level_values('country').isin(countries)
+        if years:
+            year_values = idx.get_level_values('year')
+            mask = mask & (year_values >= years[0]) & (year_values <= years[1])
+        return cube[mask]
+
+    def rank(self, indicator, countries=None, year=None, ascending=False, k=DEFAULT_TOP_K):
+        """Top-k countries by their latest value of ``indicator`` up to ``year``"""
+        values = self.select([indicator], countries or None)
+        if year is not None:
+            values = values[values.index.get_level_values('year') <= year]
+        # Latest available value per country
+        latest = values.groupby(level='country').tail(1).droplevel('indicator').reset_index()
+        latest = latest.sort_values('value', ascending=ascending).head(k)
+        return latest.rename(columns={'country': 'Country', 'year': 'Year', 'value': 'Value'})
+
+    def _execute(self, plan):
+        kind = plan['type']
+        if kind == 'ranking':
+            return self.rank(plan['indicator'], plan['countries'], plan['year'],
+                             plan['ascending'], plan['k'])
+
+        if kind == 'comparison':
+            values = self.select([plan['indicator']], plan['countries'])
+            return values.droplevel('indicator').unstack('country')
+
+        if kind == 'multi_search' and (plan['indicators'] or plan['countries']):
+            indicators = plan['indicators'] or [self.service.gini_indicator]
+            years = plan['time_range'] or ((min(plan['years']), max(plan['years'])) if plan['years'] else None)
+            return self.select(indicators, plan['countries'] or None, years).reset_index()
+
+        return None
+
+    def run(self, query):
+        """(plan, result frame or None) for a query; both cached per normalized query"""
+        plan = self.compile(query)
+        if plan is None:
+            return None, None
+        text = normalize_query(query)
+        with self._lock:
+            if text in self._results:
+                self._results.move_to_end(text)
+                return plan, self._results[text]
+        result = self._execute(plan)
+        with self._lock:
+            _remember(self._results, text, result, self.max_cached)
+        return plan, result
+
+
+def _remember(cache, key, value, max_size):
+    cache[key] = value
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+@st.cache_resource(max_entries=2)
+def _build_query_compiler(version):
+    return SearchQueryCompiler(get_search_service())
+
+
+def get_query_compiler():
+    """Get the query compiler for the current dataset version"""
+    return _build_query_compiler(data_version())
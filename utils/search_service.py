@@ -0,0 +1,192 @@
+"""
+Smart Search Data Service
+One shared copy of the curated dataset for the Smart Search page, plus
+everything the page used to recompute on each rerun: quick stats, the
+detected Gini indicator and the bookmarked views (high/low inequality
+countries, top movers, time windows).
+
+Built once per dataset version (see utils.loaders.data_version), so every
+bookmark resolves as a dictionary lookup.
+"""
+
+import streamlit as st
+
+from utils.loaders import load_inequality_data, data_version
+
+# Bookmark thresholds on the average survey Gini, 0-100 (with a looser fallback)
+HIGH_INEQUALITY_GINI = 40
+LOW_INEQUALITY_GINI = 30
+FALLBACK_GINI = 35
+THRESHOLD_GINI_SOURCE = 'World Bank'
+
+# Countries listed in the "Top Movers" bookmark, ranked on a yearly single-source Gini
+TOP_MOVERS = 3
+MOVERS_GINI_INDICATOR = 'Gini (from WID shares)'
+
+
+class SearchDataService:
+    """
+    Read-only search view of the curated dataset.
+    Do not mutate ``df``; it is shared by every session.
+    """
+
+    def __init__(self, df, version=None):
+        self.df = df
+        self.version = version
+
+        self.countries = df['country'].unique().tolist()
+        self.indicators = df['indicator'].unique().tolist()
+        self.min_year = int(df['year'].min()) if not df.empty else 2000
+        self.max_year = int(df['year'].max()) if not df.empty else 2024
+        self.stats = {
+            'countries': df['country'].nunique(),
+            'indicators': df['indicator'].nunique(),
+            'records': len(df),
+        }
+
+        self.gini_indicator = self._detect_gini_indicator()
+        # The detected indicator may mix sources on different scales (World Bank
+        # 0-100, WID 0-1), so thresholds and movers each use one source only
+        gini = self._single_source(df[df['indicator'] == self.gini_indicator], THRESHOLD_GINI_SOURCE)
+        self.average_gini = gini.groupby('country')['value'].mean()
+        self.movers_indicator = (MOVERS_GINI_INDICATOR if MOVERS_GINI_INDICATOR in self.indicators
+                                 else self.gini_indicator)
+        movers = self._single_source(df[df['indicator'] == self.movers_indicator])
+        self.country_sets = {
+            'high_inequality': self._threshold_countries(lambda g: g > HIGH_INEQUALITY_GINI,
+                                                         lambda g: g > FALLBACK_GINI),
+            'low_inequality': self._threshold_countries(lambda g: g < LOW_INEQUALITY_GINI,
+                                                        lambda g: g < FALLBACK_GINI),
+            'top_movers': self._top_movers(movers),
+        }
+        self.bookmarks = self._build_bookmarks()
+
+    # ---------- precomputation ----------
+
+    def _detect_gini_indicator(self):
+        """Detect GINI indicator name from actual data"""
+        if 'gini_index' in self.indicators:
+            return 'gini_index'
+        for ind in self.indicators:
+            if 'gini' in ind.lower():
+                return ind
+        return self.indicators[0] if self.indicators else 'gini_index'
+
+    @staticmethod
+    def _single_source(rows, preferred=None):
+        """Rows of ``preferred`` source when present, else of the most common source"""
+        if 'source' not in rows.columns or rows['source'].nunique() <= 1:
+            return rows
+        counts = rows['source'].value_counts()
+        return rows[rows['source'] == (preferred if preferred in counts.index else counts.index[0])]
+
+    def _threshold_countries(self, test, fallback_test):
+        """Countries whose average Gini passes ``test``; all countries if none do"""
+        avg = self.average_gini
+        if avg.empty:
+            return list(self.countries)
+        matched = avg[test(avg)].index.tolist() or avg[fallback_test(avg)].index.tolist()
+        return matched or list(self.countries)
+
+    def _top_movers(self, gini):
+        """Countries with the largest absolute Gini change over the last decade"""
+        recent = gini[gini['year'] >= self.max_year - 9].sort_values('year')
+        if recent.empty:
+            return list(self.countries)
+        ends = recent.groupby('country')['value'].agg(['first', 'last'])
+        change = (ends['last'] - ends['first']).abs().sort_values(ascending=False)
+        return change.index[:TOP_MOVERS].tolist() or list(self.countries)
+
+    def _build_bookmarks(self):
+        min_year, max_year = self.min_year, self.max_year
+        countries = self.countries
+        gini = self.gini_indicator
+        last_decade = (max(min_year, max_year - 9), max_year)
+        return {
+            "All Countries Overview": {
+                "description": "Dashboard view with all countries, GINI index, last 10 years",
+                "countries": countries,
+                "indicator": gini,
+                "year_range": last_decade,
+                "page": "pages/1_Dashboard.py"
+            },
+            "High Inequality Focus": {
+                "description": f"Countries with GINI > {HIGH_INEQUALITY_GINI} (severe inequality)",
+                "countries": self.country_sets['high_inequality'],
+                "indicator": gini,
+                "year_range": last_decade,
+                "page": "pages/1_Dashboard.py"
+            },
+            "Low Inequality Focus": {
+                "description": f"Countries with GINI < {LOW_INEQUALITY_GINI} (more equitable distribution)",
+                "countries": self.country_sets['low_inequality'],
+                "indicator": gini,
+                "year_range": last_decade,
+                "page": "pages/1_Dashboard.py"
+            },
+            "Top Movers (Last Decade)": {
+                "description": f"The {TOP_MOVERS} countries whose GINI changed most over the last 10 years",
+                "countries": self.country_sets['top_movers'],
+                "indicator": self.movers_indicator,
+                "year_range": last_decade,
+                "page": "pages/8_Temporal_Comparison.py"
+            },
+            "Recent Analysis (2020-2024)": {
+                "description": "Focus on most recent 5 years of data",
+                "countries": countries,
+                "indicator": gini,
+                "year_range": (max(2020, min_year), max_year),
+                "page": "pages/1_Dashboard.py"
+            },
+            "Last Decade (2015-2024)": {
+                "description": "Ten-year analysis of inequality trends",
+                "countries": countries,
+                "indicator": gini,
+                "year_range": (max(2015, min_year), max_year),
+                "page": "pages/1_Dashboard.py"
+            },
+            "Complete Timeline (2000-2024)": {
+                "description": "Full 24-year historical analysis",
+                "countries": countries,
+                "indicator": gini,
+                "year_range": (min_year, max_year),
+                "page": "pages/1_Dashboard.py"
+            },
+            "Geographic Visualization": {
+                "description": "Latest year choropleth map view",
+                "countries": countries,
+                "indicator": gini,
+                "year_range": (max_year, max_year),
+                "page": "pages/3_Map_Analysis.py"
+            },
+            "Correlation Analysis": {
+                "description": "Explore relationships between inequality and drivers",
+                "page": "pages/4_Correlations.py"
+            },
+            "Indicator Insights (Sunburst)": {
+                "description": "Multi-dimensional indicator dominance patterns",
+                "countries": countries,
+                "page": "pages/7_Indicator_Insights.py"
+            },
+            "Temporal Comparison Tool": {
+                "description": "Compare different time periods side-by-side",
+                "countries": countries,
+                "indicator": gini,
+                "page": "pages/8_Temporal_Comparison.py"
+            }
+        }
+
+    # ---------- lookups ----------
+
+    def bookmark(self, name):
+        return self.bookmarks[name]
+
+
+@st.cache_resource(max_entries=2)
+def _build_search_service(version):
+    return SearchDataService(load_inequality_data(), version)
+
+
+def get_search_service():
+    """Get the search service for the current dataset version"""
+    return _build_search_service(data_version())
@@ -0,0 +1,296 @@
+"""
+Income Simulator Scoring Engine
+Vectorized version of the simulator's percentile model: scores any number of
+profiles in one pass and returns the per-component breakdown for each.
+Used for single profiles (via calculate_percentile) and for what-if sweeps.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Country calibration used when no live context is available
+COUNTRY_DATA = {
+    'Bangladesh': {'base': 25, 'education_weight': 0.32, 'urban_bonus': 8},
+    'Bhutan': {'base': 23, 'education_weight': 0.30, 'urban_bonus': 7},
+    'India': {'base': 22, 'education_weight': 0.35, 'urban_bonus': 12},
+    'Maldives': {'base': 28, 'education_weight': 0.33, 'urban_bonus': 14},
+    'Nepal': {'base': 22, 'education_weight': 0.32, 'urban_bonus': 7},
+    'Pakistan': {'base': 20, 'education_weight': 0.30, 'urban_bonus': 10},
+    'Sri Lanka': {'base': 25, 'education_weight': 0.32, 'urban_bonus': 11},
+    'Afghanistan': {'base': 18, 'education_weight': 0.28, 'urban_bonus': 8}
+}
+
+SECTOR_SCORES = {"Agriculture": 0, "Industry": 8, "Services": 12, "Public Sector": 15, "Unemployed": -5}
+AGE_SCORES = {"Youth (<25)": -4, "Adult (25-60)": 6, "Senior (>60)": 2}
+
+OCCUPATIONS = list(SECTOR_SCORES.keys())
+AGE_GROUPS = list(AGE_SCORES.keys())
+
+# Profile fields, in calculate_percentile argument order
+PROFILE_FIELDS = ['country', 'edu', 'digital', 'gender', 'urban', 'occupation', 'credit', 'age']
+
+COMPONENTS = [
+    "Base Value", "Education", "Digital Skills", "Occupation",
+    "Urban Advantage", "Credit Access", "Age Factor", "Gender Impact"
+]
+
+# Numeric live-context keys read by the model (missing -> NaN)
+CONTEXT_KEYS = [
+    'gdp', 'net_migration', 'unemp_youth', 'unemp_advanced', 'unemployment_rate',
+    'vulnerable_emp', 'wage_worker', 'ag_value_added_gdp', 'employers_share',
+    'credit_depth', 'financial_sector_credit', 'borrowers_density', 'credit_info_depth',
+    'private_credit_bureau', 'public_credit_registry', 'financial_sector_rating',
+    'atm_density', 'remittances_gdp', 'business_density',
+    'primary_enrollment', 'primary_gender_enrollment', 'secondary_enrollment',
+    'secondary_gender_enrollment', 'secondary_gpi', 'tertiary_enrollment',
+    'tertiary_gender_enrollment', 'tertiary_gpi', 'primary_completion',
+    'gii', 'urban_pct', 'poverty_rate'
+]
+
+
+def _bonus(condition, amount):
+    """amount where condition holds, else 0 (NaN comparisons are False)"""
+    return np.where(condition, amount, 0.0)
+
+
+def _context_arrays(countries, occupations, live_context, country_contexts):
+    """
+    Broadcast live context values to one array per key.
+    Contexts are resolved once per distinct country, not per profile.
+    """
+    live_context = live_context or {}
+    country_contexts = country_contexts or {}
+
+    codes, uniques = pd.factorize(countries)
+    contexts = [country_contexts.get(c, live_context) for c in uniques]
+
+    ctx = {}
+    for key in CONTEXT_KEYS:
+        per_country = np.array([c.get(key, np.nan) for c in contexts], dtype=float)
+        ctx[key] = per_country[codes] if len(per_country) else np.full(len(codes), np.nan)
+
+    # Employment share of each profile's own sector (NaN when sector_shares is absent)
+    occ_codes, occ_uniques = pd.factorize(occupations)
+    share_table = np.full((len(uniques), len(occ_uniques)), np.nan)
+    for i, c in enumerate(contexts):
+        shares = c.get('sector_shares')
+        if shares is not None:
+            share_table[i] = [shares.get(o, 30) for o in occ_uniques]
+    ctx['sector_share'] = share_table[codes, occ_codes] if share_table.size else np.full(len(codes), np.nan)
+    ctx['has_sector_shares'] = np.array([c.get('sector_shares') is not None for c in contexts], dtype=bool)[codes] \
+        if contexts else np.zeros(len(codes), dtype=bool)
+    return ctx
+
+
+def score_profiles(profiles, live_context=None, country_contexts=None):
+    """
+    Score many profiles at once.
+
+    Args:
+        profiles: DataFrame (or dict of arrays) with the PROFILE_FIELDS columns.
+            gender and urban are 0/1 flags, credit is boolean.
+        live_context: Context dict applied to every profile (see calculate_percentile)
+        country_contexts: Optional {country: context} overriding live_context per country
+
+    Returns:
+        DataFrame aligned with ``profiles`` holding one column per COMPONENTS entry,
+        'raw_percentile', 'percentile' (clipped 0-100) and, when a poverty rate is
+        known, 'poverty_rate', 'poverty_distance' and 'poverty_status'.
+    """
+    profiles = pd.DataFrame(profiles)
+    index = profiles.index
+    n = len(profiles)
+
+    country = profiles['country'].to_numpy(dtype=object)
+    edu = profiles['edu'].to_numpy(dtype=float)
+    digital = profiles['digital'].to_numpy(dtype=float)
+    gender = profiles['gender'].to_numpy(dtype=float)
+    urban = profiles['urban'].to_numpy(dtype=float)
+    occupation = profiles['occupation'].to_numpy(dtype=object) if 'occupation' in profiles else np.full(n, "Services", dtype=object)
+    credit = profiles['credit'].to_numpy(dtype=bool) if 'credit' in profiles else np.zeros(n, dtype=bool)
+    age = profiles['age'].to_numpy(dtype=object) if 'age' in profiles else np.full(n, "Adult", dtype=object)
+
+    ctx = _context_arrays(country, occupation, live_context, country_contexts)
+    has = {k: ~np.isnan(v) for k, v in ctx.items() if v.dtype == float}
+
+    defaults = pd.DataFrame.from_dict(COUNTRY_DATA, orient='index')
+    calib = defaults.reindex(country).fillna(defaults.loc['India'])
+
+    # 1. BASE VALUE (GDP-Driven)
+    base = np.where(
+        has['gdp'],
+        15 + np.log10(np.maximum(np.nan_to_num(ctx['gdp'], nan=100), 100) / 100) * 5,
+        calib['base'].to_numpy(dtype=float)
+    )
+    base = base - _bonus(ctx['net_migration'] < -500000, 1)  # Brain-drain penalty
+    weight = calib['education_weight'].to_numpy(dtype=float)
+
+    # 2. OCCUPATION & EMPLOYMENT QUALITY
+    sector_base = pd.Series(occupation).map(SECTOR_SCORES).fillna(10).to_numpy(dtype=float)
+    unemployed = occupation == "Unemployed"
+
+    occ_unemployed = (
+        -5.0
+        + _bonus((age == "Youth (<25)") & (ctx['unemp_youth'] > 20), 2)
+        + _bonus((edu > 12) & (ctx['unemp_advanced'] > 15), 1)
+        + np.nan_to_num(ctx['unemployment_rate'] / 10)
+    )
+
+    scarcity = np.maximum(0.8, 1.5 - ctx['sector_share'] / 100)
+    occ_employed_live = (
+        sector_base * scarcity
+        - np.nan_to_num(ctx['vulnerable_emp'] / 100 * 3)
+        + np.nan_to_num(ctx['wage_worker'] / 100 * 2)
+        + _bonus((occupation == "Agriculture") & (ctx['ag_value_added_gdp'] > 15), 1)
+        + np.where(np.isin(occupation, ["Services", "Industry"]) & has['employers_share'],
+                   np.nan_to_num(ctx['employers_share'] / 5), 0.0)
+    )
+    occ_val = np.where(
+        unemployed, occ_unemployed,
+        np.where(ctx['has_sector_shares'], occ_employed_live, sector_base)
+    )
+
+    # 3. FINANCIAL ACCESS (Multi-dimensional Banking Infrastructure)
+    borrowers = ctx['borrowers_density']
+    atm = ctx['atm_density']
+    bd = ctx['business_density']
+    credit_live = (
+        6.0
+        + np.nan_to_num(np.minimum(3, ctx['credit_depth'] / 30))
+        + _bonus(ctx['financial_sector_credit'] > 50, 0.5)
+        + np.where(borrowers > 100, 2.0, np.where(borrowers > 50, 1.0, 0.0))
+        + np.nan_to_num((ctx['credit_info_depth'] / 8) * 1.5)
+        + _bonus(ctx['private_credit_bureau'] > 30, 1)
+        + _bonus(ctx['public_credit_registry'] > 10, 0.5)
+        + np.nan_to_num(((ctx['financial_sector_rating'] - 2) / 4) * 2)
+        + np.where(atm < 20, 2.0, np.where(atm < 50, 1.0, 0.0))
+        + np.where(ctx['remittances_gdp'] > 5, np.nan_to_num(np.minimum(2, ctx['remittances_gdp'] / 10)), 0.0)
+        + np.where(bd > 5, 1.5, np.where(bd > 2, 0.5, 0.0))
+    )
+    credit_val = np.where(credit, credit_live, 0.0)
+
+    age_val = pd.Series(age).map(AGE_SCORES).fillna(4).to_numpy(dtype=float)
+
+    # 4. EDUCATION (Quality & Scarcity Adjusted)
+    female = gender == 1
+    edu_contrib = (edu / 20) * 40 * weight
+    edu_contrib = edu_contrib + _bonus(ctx['primary_enrollment'] < 90, 2)
+    edu_contrib = edu_contrib + _bonus(ctx['primary_gender_enrollment'] < 85, 1.5)
+
+    secondary = edu >= 6
+    s_mult = np.where(has['secondary_enrollment'], np.maximum(1.0, 1.5 - ctx['secondary_enrollment'] / 100), 1.0)
+    edu_contrib = np.where(secondary, edu_contrib * s_mult, edu_contrib)
+    edu_contrib = edu_contrib + _bonus(secondary & (ctx['secondary_gender_enrollment'] < 50), 3)
+    edu_contrib = edu_contrib + _bonus(secondary & female & (ctx['secondary_gpi'] < 0.9), 2)
+
+    tertiary = edu > 12
+    t_mult = np.where(has['tertiary_enrollment'], np.maximum(1.0, 3.0 - ctx['tertiary_enrollment'] / 40), 1.0)
+    edu_contrib = np.where(tertiary, edu_contrib * t_mult, edu_contrib)
+    edu_contrib = edu_contrib + _bonus(tertiary & (ctx['tertiary_gender_enrollment'] < 20), 5)
+    edu_contrib = edu_contrib + _bonus(tertiary & female & (ctx['tertiary_gpi'] < 0.8), 3)
+
+    edu_contrib = edu_contrib + _bonus(ctx['primary_completion'] < 80, 2)
+
+    # 5. DIGITAL SKILLS
+    digital_contrib = (digital / 100) * 15
+
+    # 6. GENDER IMPACT
+    gender_penalty = np.where(has['gii'], ctx['gii'] * 18, 8.0)
+    gender_contrib = gender * -gender_penalty
+
+    # 7. LOCATION (Urban Scarcity Driven)
+    urban_bonus = np.where(has['urban_pct'], 20 * (1 - ctx['urban_pct'] / 100),
+                           calib['urban_bonus'].to_numpy(dtype=float))
+    urban_contrib = urban * urban_bonus
+
+    result = pd.DataFrame({
+        "Base Value": base,
+        "Education": edu_contrib,
+        "Digital Skills": digital_contrib,
+        "Occupation": occ_val,
+        "Urban Advantage": urban_contrib,
+        "Credit Access": credit_val,
+        "Age Factor": age_val,
+        "Gender Impact": gender_contrib
+    }, index=index)
+    result['raw_percentile'] = result[COMPONENTS].sum(axis=1)
+    result['percentile'] = result['raw_percentile'].clip(0, 100)
+
+    # 8. POVERTY BENCHMARKING
+    if has['poverty_rate'].any():
+        dist = result['raw_percentile'].to_numpy() - ctx['poverty_rate']
+        result['poverty_rate'] = ctx['poverty_rate']
+        result['poverty_distance'] = dist
+        result['poverty_status'] = np.where(
+            np.isnan(dist), None,
+            np.where(dist < 0, "Below Poverty Line",
+                     np.where(dist < 15, "Near Poverty Line", "Above Poverty Line"))
+        )
+    return result
+
+
+def profile_grid(base_profile, **axes):
+    """
+    Cartesian what-if grid around one profile.
+    profile_grid(p, edu=range(21), digital=range(0, 101, 5)) -> 21 x 21 profiles
+    """
+    names = list(axes.keys())
+    rows = itertools.product(*(list(v) for v in axes.values()))
+    grid = pd.DataFrame(list(rows), columns=names)
+    for field in PROFILE_FIELDS:
+        if field not in grid.columns and field in base_profile:
+            grid[field] = base_profile[field]
+    return grid
+
+
+def sensitivity_surface(base_profile, x_field, x_values, y_field, y_values, live_context=None):
+    """Percentile matrix (len(y_values) x len(x_values)) over two profile fields"""
+    grid = profile_grid(base_profile, **{y_field: y_values, x_field: x_values})
+    scores = score_profiles(grid, live_context)
+    return pd.DataFrame(
+        scores['percentile'].to_numpy().reshape(len(y_values), len(x_values)),
+        index=list(y_values), columns=list(x_values)
+    )
+
+
+# Values each factor is swept over in the tornado chart
+TORNADO_SWINGS = {
+    'edu': ("Education", [0, 20]),
+    'digital': ("Digital Skills", [0, 100]),
+    'occupation': ("Occupation", OCCUPATIONS),
+    'age': ("Age Group", AGE_GROUPS),
+    'credit': ("Credit Access", [False, True]),
+    'urban': ("Location", [0, 1]),
+    'gender': ("Gender", [0, 1])
+}
+
+
+def tornado_sensitivity(base_profile, live_context=None, swings=None):
+    """
+    One-at-a-time sensitivity of the percentile to each factor.
+    All variants are scored in a single batch.
+
+    Returns:
+        DataFrame with factor, low, high, base and range, sorted by range (largest first)
+    """
+    swings = swings or TORNADO_SWINGS
+    variants = [dict(base_profile, _factor='__base__')]
+    for field, (_, values) in swings.items():
+        for v in values:
+            variants.append(dict(base_profile, **{field: v}, _factor=field))
+
+    frame = pd.DataFrame(variants)
+    frame['percentile'] = score_profiles(frame, live_context)['percentile'].to_numpy()
+    base_p = float(frame.loc[frame['_factor'] == '__base__', 'percentile'].iloc[0])
+
+    stats = frame[frame['_factor'] != '__base__'].groupby('_factor', sort=False)['percentile'].agg(['min', 'max'])
+    table = pd.DataFrame({
+        'factor': [swings[f][0] for f in stats.index],
+        'low': stats['min'].to_numpy(),
+        'high': stats['max'].to_numpy(),
+        'base': base_p
+    })
+    table['range'] = table['high'] - table['low']
+    return table.sort_values('range', ascending=False).reset_index(drop=True)
@@ -1,6 +1,12 @@
 # utils/state.py
+import hashlib
+import threading
+from collections import OrderedDict
+
 import streamlit as st
 
+from utils.utils import get_color_scale
+
 def get_analysis_config():
     """Return analysis_config dict or None."""
     return st.session_state.get("analysis_config")
@@ -13,3 +19,103 @@ def require_analysis_config():
         st.info("Click 'home' in the sidebar to configure your analysis")
         st.stop()
     return config
+
+def default_analysis_config(df):
+    """Home page defaults: all countries, last 20 years, Top 10% share (else Gini, else first indicator)."""
+    all_countries = sorted(df['country'].unique())
+    all_indicators = sorted(df['indicator'].unique())
+    min_year = int(df['year'].min())
+    max_year = int(df['year'].max())
+
+    # Prioritize Top 10% Income Share, then Gini, then first available
+    if 'Top 10% Income Share' in all_indicators:
+        default_indicator = 'Top 10% Income Share'
+    elif 'gini_index' in all_indicators:
+        default_indicator = 'gini_index'
+    else:
+        default_indicator = all_indicators[0] if all_indicators else None
+
+    return {
+        'countries': all_countries,
+        'year_range': (max(min_year, max_year - 20), max_year),
+        'indicator': default_indicator,
+        'color_scale': get_color_scale(default_indicator) if default_indicator else 'Viridis',
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CONFIG HASH + PAGE ARTIFACTS
+# ═══════════════════════════════════════════════════════════════════
+# Pages rerun top to bottom on every widget interaction. Derived artifacts
+# (filtered slices, aggregates, figures) are memoized against the inputs they
+# depend on, so an unrelated widget (e.g. a colour scheme) reuses them.
+# The objects live in one process-wide store shared by sessions;
+# session_state only keeps each artifact's key, never the frames themselves.
+
+ANALYSIS_KEYS = ('countries', 'indicator', 'year_range')
+ARTIFACT_REFS = '_artifact_refs'
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:16]
+
+
+def config_hash(config=None, keys=ANALYSIS_KEYS):
+    """Stable hash of the analysis config's filters (timestamp and styling excluded)"""
+    config = config if config is not None else (get_analysis_config() or {})
+    normalized = []
+    for key in keys:
+        value = config.get(key)
+        if isinstance(value, (list, tuple)):
+            value = tuple(value)
+        normalized.append((key, value))
+    return _digest(tuple(normalized))
+
+
+class ArtifactStore:
+    """Thread-safe LRU of derived page artifacts keyed by input hash"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+@st.cache_resource
+def get_artifact_store():
+    """Process-wide artifact store"""
+    return ArtifactStore()
+
+
+def page_artifact(page, name, build, *inputs):
+    """
+    A page's derived artifact, rebuilt only when its inputs change.
+
+    Args:
+        page: Page name (namespaces the artifact)
+        name: Artifact name within the page
+        build: Zero-argument callable computing the artifact
+        inputs: Small values the artifact depends on (config_hash(), widget
+            values, ...); the dataset version is always included
+
+    Returns:
+        The shared object; treat it as read-only (``.copy(deep=False)`` before
+        adding columns)
+    """
+    from utils.loaders import data_version
+
+    key = _digest((page, name, data_version(), inputs))
+    st.session_state.setdefault(ARTIFACT_REFS, {})[f"{page}/{name}"] = key
+    return get_artifact_store().get_or_build(key, build)
@@ -0,0 +1,259 @@
+"""
+Table Export Service
+On-demand, chunked serialization of dataframes for download buttons.
+
+- Formats are generated only when a download is clicked (deferred data)
+- Rows are written in chunks into a spooled temp file, so large exports never
+  build one giant string in memory
+- Excel uses a constant-memory writer (xlsxwriter, else openpyxl write-only)
+- Outputs are cached by (data version, filter signature, format, metadata);
+  per-click fields such as an export timestamp are passed as a ``stamp`` and
+  never cached
+
+Formats: CSV, TSV, JSON, Excel, Parquet, Arrow (IPC file)
+"""
+
+import hashlib
+import io
+import json
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from utils.loaders import data_version
+from utils.profiling import stage
+
+# Rows serialized per chunk
+CHUNK_ROWS = 50_000
+# Spill spooled output to disk beyond this size
+_SPOOL_BYTES = 32 * 1024 * 1024
+
+TABLE_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'TSV': ('tsv', 'text/tab-separated-values'),
+    'JSON': ('json', 'application/json'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+
+def _chunks(df):
+    for start in range(0, len(df), CHUNK_ROWS):
+        yield df.iloc[start:start + CHUNK_ROWS]
+
+
+# ═══════════════════════════════════════════════════════════════════
+# WRITERS
+# ═══════════════════════════════════════════════════════════════════
+
+def _write_delimited(df, out, sep, metadata):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    if metadata:
+        # Metadata as comment lines above the header
+        text.write("\n".join(f"# {k}: {v}" for k, v in metadata.items()) + "\n")
+    if df.empty:
+        df.to_csv(text, index=False, sep=sep)
+    for i, chunk in enumerate(_chunks(df)):
+        chunk.to_csv(text, index=False, sep=sep, header=(i == 0))
+    text.flush()
+    text.detach()
+
+
+def _write_json(df, out, metadata):
+    out.write(b'{"metadata": ' + json.dumps(metadata, default=str).encode() + b', "data": [' if metadata else b'[')
+    first = True
+    for chunk in _chunks(df):
+        records = chunk.to_json(orient='records', date_format='iso')[1:-1]
+        if records:
+            if not first:
+                out.write(b',')
+            out.write(records.encode())
+            first = False
+    out.write(b']}' if metadata else b']')
+
+
+def _excel_rows(df):
+    """Header + rows as plain Python values (NaN -> blank cell)"""
+    yield list(map(str, df.columns))
+    for chunk in _chunks(df):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def _write_excel(df, out, metadata, extra_sheets):
+    sheets = {'Data': df}
+    if metadata:
+        sheets['Metadata'] = pd.DataFrame([metadata])
+    sheets.update(extra_sheets or {})
+
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        # constant_memory flushes each row to disk as soon as it is written
+        workbook = xlsxwriter.Workbook(out, {'constant_memory': True, 'in_memory': False})
+        for name, sheet_df in sheets.items():
+            worksheet = workbook.add_worksheet(name)
+            for r, row in enumerate(_excel_rows(sheet_df)):
+                worksheet.write_row(r, 0, row)
+        workbook.close()
+    else:
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        for name, sheet_df in sheets.items():
+            worksheet = workbook.create_sheet(name)
+            for row in _excel_rows(sheet_df):
+                worksheet.append(row)
+        workbook.save(out)
+
+
+def _arrow_schema(df, metadata):
+    import pyarrow as pa
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    if metadata:
+        schema = schema.with_metadata({**(schema.metadata or {}),
+                                       b'export_metadata': json.dumps(metadata, default=str).encode()})
+    return schema
+
+
+def _write_arrow(df, out, metadata, parquet):
+    import pyarrow as pa
+    schema = _arrow_schema(df, metadata)
+    if parquet:
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(out, schema)
+    else:
+        writer = pa.ipc.new_file(out, schema)
+    with writer:
+        for chunk in _chunks(df):
+            # One row group / record batch per chunk
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_table(df, fmt, metadata=None, extra_sheets=None):
+    """
+    Serialize a dataframe in one of TABLE_FORMATS.
+
+    Args:
+        df: Data to export
+        fmt: Key of TABLE_FORMATS
+        metadata: Optional {name: value} written as comment lines (CSV/TSV),
+            a wrapper object (JSON), a sheet (Excel) or schema metadata (Parquet/Arrow)
+        extra_sheets: Optional {sheet name: DataFrame} added to Excel exports
+
+    Returns:
+        bytes
+    """
+    if fmt not in TABLE_FORMATS:
+        raise ValueError(f"Format must be one of: {list(TABLE_FORMATS.keys())}")
+
+    with stage(f"table_export.{fmt}"), tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES) as out:
+        if fmt in ('CSV', 'TSV'):
+            _write_delimited(df, out, ',' if fmt == 'CSV' else '\t', metadata)
+        elif fmt == 'JSON':
+            _write_json(df, out, metadata)
+        elif fmt == 'Excel':
+            _write_excel(df, out, metadata, extra_sheets)
+        else:
+            _write_arrow(df, out, metadata, parquet=(fmt == 'Parquet'))
+        out.seek(0)
+        return out.read()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# CACHED EXPORTER
+# ═══════════════════════════════════════════════════════════════════
+
+def frame_signature(df):
+    """Content hash of a dataframe, for exports without an explicit filter signature"""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    digest.update("|".join(map(str, df.columns)).encode())
+    return digest.hexdigest()
+
+
+class TableExporter:
+    """
+    Caches export bytes by (data version, filter signature, format, metadata)
+    within a byte budget, evicting least recently used outputs first.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, df, fmt, signature=None, metadata=None, extra_sheets=None, version=None, stamp=None):
+        """
+        Export bytes for ``df`` in ``fmt``, reusing a cached copy when the same
+        data version, filter signature and metadata were exported before.
+
+        Args:
+            signature: Hashable description of the filters that produced df;
+                falls back to a content hash when None
+            version: Data version; defaults to the curated dataset's version
+            stamp: Optional callable -> {name: value} evaluated on every call
+                (e.g. the export time). Never cached: prepended to cached
+                CSV/TSV output; other formats are built with it, uncached.
+        """
+        if stamp is not None:
+            if fmt not in ('CSV', 'TSV'):
+                return export_table(df, fmt, metadata={**stamp(), **(metadata or {})},
+                                    extra_sheets=extra_sheets)
+            header = "".join(f"# {k}: {v}\n" for k, v in stamp().items()).encode()
+            return header + self.get(df, fmt, signature, metadata, extra_sheets, version)
+
+        key = (
+            version if version is not None else data_version(),
+            signature if signature is not None else frame_signature(df),
+            fmt,
+            json.dumps(metadata, sort_keys=True, default=str) if metadata else None,
+        )
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        data = export_table(df, fmt, metadata=metadata, extra_sheets=extra_sheets)
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = data
+                self._size += len(data)
+            while self._size > self.max_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+    def deferred(self, df, fmt, **kwargs):
+        """Zero-argument callable producing the export (for st.download_button data)"""
+        return lambda: self.get(df, fmt, **kwargs)
+
+
+@st.cache_resource
+def get_table_exporter():
+    """Get cached table exporter instance"""
+    return TableExporter()
+
+
+def table_download_button(df, filename, fmt, label=None, key=None, target=None, **export_kwargs):
+    """
+    Download button whose file is generated only when clicked.
+    Extra keyword arguments are passed to TableExporter.get.
+    """
+    ext, mime = TABLE_FORMATS[fmt]
+    return (target or st).download_button(
+        label or fmt,
+        get_table_exporter().deferred(df, fmt, **export_kwargs),
+        f"{filename}.{ext}",
+        mime,
+        key=key,
+        on_click="ignore",
+        use_container_width=True
+    )
@@ -0,0 +1,172 @@
+"""
+Temporal Comparison Engine
+Vectorized THEN/NOW computations for the Temporal Comparison page.
+
+Periods are either a single year (point-in-time) or an inclusive (start, end)
+year range (period average). Everything is computed for all selected
+countries x indicators at once from the long-format curated dataset.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.persistent_cache import persistent_cache
+
+
+def _period_mask(years, period):
+    """Boolean mask of rows inside a year or (start, end) range"""
+    if isinstance(period, (tuple, list)):
+        return years.between(*period).to_numpy()
+    return (years == period).to_numpy()
+
+
+def period_matrices(df, indicators, countries=None, then=None, now=None):
+    """
+    THEN, NOW and change matrices (countries x indicators) in one aggregation.
+
+    Args:
+        df: Long-format data with country, country_code, indicator, year, value
+        indicators: Indicators to include (matrix columns, in this order)
+        countries: Optional country codes to keep (all countries otherwise)
+        then, now: A year (point-in-time value) or a (start, end) range (period mean)
+
+    Returns:
+        (then_matrix, now_matrix, delta_matrix): DataFrames indexed by country
+        name with one column per indicator; missing combinations are NaN.
+    """
+    mask = df['indicator'].isin(indicators).to_numpy()
+    if countries is not None:
+        # Match on names: sources disagree on ISO2 vs ISO3 country codes
+        names = sorted(df.loc[df['country_code'].isin(countries), 'country'].unique())
+        mask = mask & df['country'].isin(names).to_numpy()
+    sub = df.loc[mask, ['country', 'indicator', 'year', 'value']]
+
+    in_then = _period_mask(sub['year'], then)
+    in_now = _period_mask(sub['year'], now)
+    # Label each row with its period (a row can fall in both when ranges overlap)
+    labelled = pd.concat([
+        sub[in_then].assign(period='then'),
+        sub[in_now].assign(period='now'),
+    ], ignore_index=True)
+
+    cube = labelled.groupby(['period', 'country', 'indicator'], sort=False)['value'].mean()
+    cube = cube.unstack('indicator')
+
+    if countries is None:
+        names = sorted(sub['country'].unique())
+    then_matrix = _period_slice(cube, 'then', names, indicators)
+    now_matrix = _period_slice(cube, 'now', names, indicators)
+    return then_matrix, now_matrix, now_matrix - then_matrix
+
+
+def _period_slice(cube, period, countries, indicators):
+    if period in cube.index.get_level_values('period'):
+        matrix = cube.xs(period, level='period')
+    else:
+        matrix = pd.DataFrame(dtype=float)
+    matrix = matrix.reindex(index=countries, columns=list(indicators)).astype(float)
+    matrix.index.name = 'Country'
+    matrix.columns.name = None
+    return matrix
+
+
+# ═══════════════════════════════════════════════════════════════════
+# RESAMPLING SIGNIFICANCE TESTS
+# ═══════════════════════════════════════════════════════════════════
+
+# Enumerate every sign pattern (exact test) up to this many countries
+EXACT_PERMUTATION_MAX_N = 12
+# Bootstrap resamples evaluated per batch
+_BOOTSTRAP_BLOCK = 2000
+
+
+def _compact_changes(then, now):
+    """
+    Paired changes as a (countries x indicators) array with each column's
+    valid values moved to the top, plus the per-column count of valid pairs
+    """
+    changes = np.asarray(now, dtype=float) - np.asarray(then, dtype=float)
+    if changes.ndim == 1:
+        changes = changes[:, None]
+    valid = ~np.isnan(changes)
+    order = np.argsort(~valid, axis=0, kind='stable')
+    compact = np.take_along_axis(np.where(valid, changes, 0.0), order, axis=0)
+    return compact, valid.sum(axis=0)
+
+
+def _sign_patterns(n, n_resamples, rng):
+    """(M, n) array of +/-1 signs: all 2^n patterns when small, else random"""
+    if n <= EXACT_PERMUTATION_MAX_N:
+        bits = (np.arange(2 ** n)[:, None] >> np.arange(n)[None, :]) & 1
+        return 1.0 - 2.0 * bits
+    return rng.choice([-1.0, 1.0], size=(n_resamples, n))
+
+
+@persistent_cache(versioned=False)
+def significance_tests(then, now, n_resamples=10000, confidence=0.95, seed=0):
+    """
+    Robust paired significance tests for THEN -> NOW changes, batched over
+    indicators (resamples x countries x indicators in single NumPy calls).
+
+    - Paired bootstrap: percentile CI of the mean change (countries resampled)
+    - Sign-flip permutation: two-sided p-value for "mean change = 0"; exact
+      (all 2^n sign patterns) for up to EXACT_PERMUTATION_MAX_N countries
+    - Wilcoxon signed-rank: two-sided p-value on the changes
+
+    Args:
+        then, now: (countries x indicators) matrices or 1-D arrays of paired
+            values; NaN marks a missing pair (dropped per indicator)
+        n_resamples: Bootstrap resamples (and random sign flips for large n)
+        confidence: Bootstrap CI level
+        seed: RNG seed, so repeated runs on a selection are reproducible
+
+    Returns:
+        DataFrame (one row per indicator) with columns n, mean_change,
+        ci_low, ci_high, p_permutation, p_wilcoxon
+    """
+    from scipy.stats import wilcoxon
+
+    columns = then.columns if isinstance(then, pd.DataFrame) else None
+    compact, n = _compact_changes(then, now)
+    n_max, k = compact.shape
+    rng = np.random.default_rng(seed)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_change = compact.sum(axis=0) / n
+
+        # Bootstrap: positions drawn uniformly among each column's n valid rows,
+        # in blocks so the (resamples x countries x indicators) tensor stays small
+        in_sample = np.arange(n_max)[None, :, None] < n[None, None, :]
+        boot_means = np.empty((n_resamples, k))
+        for start in range(0, n_resamples, _BOOTSTRAP_BLOCK):
+            size = min(_BOOTSTRAP_BLOCK, n_resamples - start)
+            draws = (rng.random((size, n_max, 1)) * n[None, None, :]).astype(int)
+            draws = np.minimum(draws, np.maximum(n - 1, 0))
+            samples = np.take_along_axis(np.broadcast_to(compact, (size, n_max, k)), draws, axis=1)
+            boot_means[start:start + size] = (samples * in_sample).sum(axis=1) / n
+        tail = (1 - confidence) / 2 * 100
+        ci_low, ci_high = np.percentile(boot_means, [tail, 100 - tail], axis=0)
+
+        # Sign flips: padding rows are zero, so they never change a column's sum
+        signs = _sign_patterns(n_max, n_resamples, rng)
+        flipped = np.abs(signs @ compact) / n
+        observed = np.abs(mean_change)
+        p_permutation = (flipped >= observed[None, :] - 1e-12).mean(axis=0)
+
+    p_wilcoxon = np.full(k, np.nan)
+    testable = (n >= 2) & (np.abs(compact).sum(axis=0) > 0)
+    if testable.any():
+        padded = np.where(np.arange(n_max)[:, None] < n[None, :], compact, np.nan)[:, testable]
+        p_wilcoxon[testable] = wilcoxon(padded, axis=0, nan_policy='omit').pvalue
+
+    result = pd.DataFrame({
+        'n': n,
+        'mean_change': mean_change,
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'p_permutation': p_permutation,
+        'p_wilcoxon': p_wilcoxon,
+    }, index=columns)
+    # Fewer than two pairs cannot support any test
+    result.loc[result['n'] < 2, ['ci_low', 'ci_high', 'p_permutation', 'p_wilcoxon']] = np.nan
+    return result
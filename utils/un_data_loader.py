@@ -1,238 +1,286 @@
 """
 UN Data API Loader
 Fetches Human Development Index (HDI) and social indicators from UN databases
+
+Series are read once from the UNDP Human Development Report composite-indices
+time-series CSV (one row per country, one column per index and year, e.g.
+``hdi_2022``, ``gii_2022``, ``le_2022``). The first available source wins:
+- HDR_PATH: a local HDR time-series file
+- HDR_URL:  an HDR time-series file to download (cached under data/cache)
+- data/raw/hdr_composite_indices_extract.csv: the bundled extract (2023 values)
+
+Values are held in one typed array (country x index x year), so any mix of
+countries, indices and years is answered by a single slice. ``cube_frame``
+exposes the series for the shared filled cube (utils/imputation.py).
 """
 
-import streamlit as st
-import requests
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
 import pandas as pd
-from typing import Optional, List, Dict
-import json
+import requests
+import streamlit as st
+
+from utils.forecasting import artifact_version
+from utils.profiling import profiled
+
+DATA_DIR = Path(__file__).parent.parent / 'data'
+HDR_EXTRACT_PATH = DATA_DIR / 'raw' / 'hdr_composite_indices_extract.csv'
+HDR_DOWNLOAD_PATH = DATA_DIR / 'cache' / 'hdr_composite_indices.csv'
+
+# HDR column prefix -> (indicator, source)
+HDR_INDICES = {
+    'hdi': ('HDI', 'UNDP'),
+    'gii': ('GII', 'UNDP'),
+    'ei': ('Education Index', 'UNDP'),
+    'le': ('Life Expectancy', 'UN/WHO'),
+}
+# Education index goalposts (HDR technical notes), used when the file only
+# has expected / mean years of schooling
+EXPECTED_SCHOOLING_MAX = 18
+MEAN_SCHOOLING_MAX = 15
+
+_YEAR_COLUMN = re.compile(r'^([a-z_]+?)_(\d{4})$')
+
+
+# ═══════════════════════════════════════════════════════════════════
+# HDR TIME-SERIES FILE
+# ═══════════════════════════════════════════════════════════════════
+
+def hdr_source():
+    """Path of the HDR file to read (see module docstring for the order)"""
+    if os.environ.get('HDR_PATH'):
+        return Path(os.environ['HDR_PATH'])
+    url = os.environ.get('HDR_URL')
+    if url:
+        if not HDR_DOWNLOAD_PATH.exists():
+            _download(url, HDR_DOWNLOAD_PATH)
+        return HDR_DOWNLOAD_PATH
+    return HDR_EXTRACT_PATH
+
+
+def _download(url, dest):
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix('.tmp')
+    tmp.write_bytes(response.content)
+    os.replace(tmp, dest)
+
+
+@profiled("un.read_hdr")
+def read_hdr(path, isos):
+    """
+    Parse an HDR composite-indices time-series file.
+
+    Args:
+        path: HDR CSV (wide: iso3, country, ..., <index>_<year> columns)
+        isos: ISO3 codes to keep
+
+    Returns:
+        {index prefix: DataFrame indexed by iso3 with one float column per year}
+        for the prefixes in HDR_INDICES (education index derived from
+        eys / mys when the file has no ei columns)
+    """
+    raw = pd.read_csv(path, encoding='latin-1')
+    raw = raw[raw['iso3'].isin(isos)].set_index('iso3')
+
+    by_prefix = {}
+    for column in raw.columns:
+        match = _YEAR_COLUMN.match(column)
+        if match:
+            by_prefix.setdefault(match.group(1), {})[int(match.group(2))] = column
+
+    def block(prefix):
+        columns = by_prefix[prefix]
+        frame = raw[list(columns.values())].apply(pd.to_numeric, errors='coerce')
+        frame.columns = list(columns)
+        return frame
+
+    tables = {prefix: block(prefix) for prefix in HDR_INDICES if prefix in by_prefix}
+    if 'ei' not in tables and {'eys', 'mys'} <= by_prefix.keys():
+        eys, mys = block('eys'), block('mys')
+        tables['ei'] = ((eys.clip(upper=EXPECTED_SCHOOLING_MAX) / EXPECTED_SCHOOLING_MAX
+                         + mys.clip(upper=MEAN_SCHOOLING_MAX) / MEAN_SCHOOLING_MAX) / 2)
+    return tables
+
+
+# ═══════════════════════════════════════════════════════════════════
+# LOADER
+# ═══════════════════════════════════════════════════════════════════
 
 class UNDataLoader:
     """
     Loader for UN databases (UNDP, UNData)
     Provides HDI, Gender Inequality Index, education, health indicators
     """
-    
-    def __init__(self):
-        # UN Data API endpoint
-        self.base_url = "https://data.un.org/ws/rest/data"
-        self.hdi_endpoint = "http://hdr.undp.org/sites/default/files/2021-22_HDR/HDR21-22_Statistical_Annex_HDI_Table.csv"
-        self.timeout = 30
-        
-    def get_hdi_data(self, countries: List[str]) -> pd.DataFrame:
+
+    COUNTRY_MAP = {
+        "Afghanistan": "AFG",
+        "Bangladesh": "BGD",
+        "Bhutan": "BTN",
+        "India": "IND",
+        "Maldives": "MDV",
+        "Nepal": "NPL",
+        "Pakistan": "PAK",
+        "Sri Lanka": "LKA"
+    }
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else hdr_source()
+        self.countries = list(self.COUNTRY_MAP)
+        self.indicators = [label for label, _ in HDR_INDICES.values()]
+        self.sources = np.array([source for _, source in HDR_INDICES.values()], dtype=object)
+
+        tables = read_hdr(self.path, list(self.COUNTRY_MAP.values())) if self.path.exists() else {}
+        years = sorted({year for table in tables.values() for year in table.columns})
+        self.years = np.array(years, dtype=int)
+
+        # values[c, i, y]: country x index x year
+        self.values = np.full((len(self.countries), len(self.indicators), len(self.years)), np.nan)
+        isos = list(self.COUNTRY_MAP.values())
+        for i, prefix in enumerate(HDR_INDICES):
+            if prefix in tables:
+                table = tables[prefix].reindex(index=isos, columns=years)
+                self.values[:, i, :] = table.to_numpy(dtype=float)
+
+    def _axes(self, countries, indicators):
+        if isinstance(countries, str):
+            countries = [countries]
+        countries = [c for c in countries if c in self.COUNTRY_MAP]
+        indicators = self.indicators if indicators is None else indicators
+        return (countries,
+                np.array([self.countries.index(c) for c in countries], dtype=int),
+                np.array([self.indicators.index(i) for i in indicators], dtype=int))
+
+    def get_indicators(self, countries: List[str], indicators: Optional[List[str]] = None,
+                       years=None) -> pd.DataFrame:
         """
-        Fetch Human Development Index (HDI) data
-        
+        Any countries x indices x years in one slice.
+
         Args:
-            countries: List of country names
-            
+            countries: Country names
+            indicators: Index names (default: all of HDI, GII, Education Index, Life Expectancy)
+            years: Optional (start, end) range
+
         Returns:
-            DataFrame with HDI data
+            DataFrame with country, year, indicator, value, source (available cells only)
         """
-        # Country name mapping
-        country_mapping = {
-            'Afghanistan': 'Afghanistan',
-            'Bangladesh': 'Bangladesh',
-            'Bhutan': 'Bhutan',
-            'India': 'India',
-            'Maldives': 'Maldives',
-            'Nepal': 'Nepal',
-            'Pakistan': 'Pakistan',
-            'Sri Lanka': 'Sri Lanka'
-        }
-        
-        # Simulated HDI data (2023 estimates)
-        # In production, this would fetch from actual UN API
-        hdi_data = {
-            'Afghanistan': 0.478,
-            'Bangladesh': 0.661,
-            'Bhutan': 0.666,
-            'India': 0.633,
-            'Maldives': 0.747,
-            'Nepal': 0.602,
-            'Pakistan': 0.544,
-            'Sri Lanka': 0.782
-        }
-        
-        results = []
-        for country in countries:
-            if country in hdi_data:
-                results.append({
-                    'country': country,
-                    'year': 2023,
-                    'indicator': 'HDI',
-                    'value': hdi_data[country],
-                    'category': self._get_hdi_category(hdi_data[country]),
-                    'source': 'UNDP'
-                })
-        
-        return pd.DataFrame(results)
-    
-    def get_gender_inequality_index(self, countries: List[str]) -> pd.DataFrame:
+        countries, c, i = self._axes(countries, indicators)
+        y = np.ones(len(self.years), dtype=bool) if years is None else \
+            (self.years >= years[0]) & (self.years <= years[1])
+        block = self.values[np.ix_(c, i, np.flatnonzero(y))]
+        ci, ii, yi = np.nonzero(np.isfinite(block))
+        return pd.DataFrame({
+            'country': np.array(countries, dtype=object)[ci],
+            'year': self.years[y][yi],
+            'indicator': np.array(self.indicators, dtype=object)[i[ii]],
+            'value': block[ci, ii, yi],
+            'source': self.sources[i[ii]],
+        })
+
+    def latest(self, countries: List[str], indicators: Optional[List[str]] = None) -> pd.DataFrame:
+        """Each country's latest available value per index (same columns as get_indicators)"""
+        countries, c, i = self._axes(countries, indicators)
+        block = self.values[np.ix_(c, i)] if len(self.years) else np.empty((len(c), len(i), 0))
+        available = np.isfinite(block)
+        last = np.where(available, np.arange(block.shape[2]), -1).max(axis=2, initial=-1)
+        ci, ii = np.nonzero(last >= 0)
+        yi = last[ci, ii]
+        return pd.DataFrame({
+            'country': np.array(countries, dtype=object)[ci],
+            'year': self.years[yi],
+            'indicator': np.array(self.indicators, dtype=object)[i[ii]],
+            'value': block[ci, ii, yi],
+            'source': self.sources[i[ii]],
+        })
+
+    @profiled("un.hdi")
+    def get_hdi_data(self, countries: List[str]) -> pd.DataFrame:
         """
-        Fetch Gender Inequality Index (GII)
-        
+        Fetch Human Development Index (HDI) data
+
         Args:
             countries: List of country names
-            
+
         Returns:
-            DataFrame with GII data
+            DataFrame with each country's latest HDI and its category
         """
-        # Simulated GII data (2023 estimates)
-        # Lower values indicate less inequality
-        gii_data = {
-            'Afghanistan': 0.655,  # High inequality
-            'Bangladesh': 0.537,
-            'Bhutan': 0.420,
-            'India': 0.490,
-            'Maldives': 0.258,  # Lower inequality
-            'Nepal': 0.452,
-            'Pakistan': 0.538,
-            'Sri Lanka': 0.380
-        }
-        
-        results = []
-        for country in countries:
-            if country in gii_data:
-                results.append({
-                    'country': country,
-                    'year': 2023,
-                    'indicator': 'GII',
-                    'value': gii_data[country],
-                    'source': 'UNDP'
-                })
-        
-        return pd.DataFrame(results)
-    
+        hdi = self.latest(countries, ['HDI'])
+        hdi.insert(4, 'category', self._get_hdi_category(hdi['value'].to_numpy()))
+        return hdi
+
+    @profiled("un.gender_inequality")
+    def get_gender_inequality_index(self, countries: List[str]) -> pd.DataFrame:
+        """Latest Gender Inequality Index (GII); lower values indicate less inequality"""
+        return self.latest(countries, ['GII'])
+
+    @profiled("un.education_index")
     def get_education_index(self, countries: List[str]) -> pd.DataFrame:
-        """
-        Fetch Education Index component of HDI
-        
-        Args:
-            countries: List of country names
-            
-        Returns:
-            DataFrame with education index data
-        """
-        # Simulated education index data
-        edu_data = {
-            'Afghanistan': 0.395,
-            'Bangladesh': 0.581,
-            'Bhutan': 0.608,
-            'India': 0.551,
-            'Maldives': 0.677,
-            'Nepal': 0.548,
-            'Pakistan': 0.440,
-            'Sri Lanka': 0.716
-        }
-        
-        results = []
-        for country in countries:
-            if country in edu_data:
-                results.append({
-                    'country': country,
-                    'year': 2023,
-                    'indicator': 'Education Index',
-                    'value': edu_data[country],
-                    'source': 'UNDP'
-                })
-        
-        return pd.DataFrame(results)
-    
+        """Latest Education Index component of HDI"""
+        return self.latest(countries, ['Education Index'])
+
+    @profiled("un.life_expectancy")
     def get_life_expectancy(self, countries: List[str]) -> pd.DataFrame:
-        """
-        Fetch life expectancy atbirth
-        
-        Args:
-            countries: List of country names
-            
-        Returns:
-            DataFrame with life expectancy data
-        """
-        # Simulated life expectancy data (years)
-        life_exp_data = {
-            'Afghanistan': 62.0,
-            'Bangladesh': 72.6,
-            'Bhutan': 71.8,
-            'India': 67.2,
-            'Maldives': 79.9,
-            'Nepal': 70.2,
-            'Pakistan': 66.1,
-            'Sri Lanka': 76.4
-        }
-        
-        results = []
-        for country in countries:
-            if country in life_exp_data:
-                results.append({
-                    'country': country,
-                    'year': 2023,
-                    'indicator': 'Life Expectancy',
-                    'value': life_exp_data[country],
-                    'source': 'UN/WHO'
-                })
-        
-        return pd.DataFrame(results)
-    
+        """Latest life expectancy at birth (years)"""
+        return self.latest(countries, ['Life Expectancy'])
+
     def get_comprehensive_indicators(self, country: str) -> Dict:
         """
         Get all available UN indicators for a country
-        
+
         Args:
             country: Country name
-            
+
         Returns:
             Dictionary with all indicators
         """
-        hdi = self.get_hdi_data([country])
-        gii = self.get_gender_inequality_index([country])
-        edu = self.get_education_index([country])
-        life_exp = self.get_life_expectancy([country])
-        
+        values = self.latest([country]).set_index('indicator')
         summary = {
             'country': country,
-            'year': 2023,
+            'year': int(values['year'].max()) if not values.empty else None,
             'hdi': None,
             'hdi_category': None,
             'gii': None,
             'education_index': None,
             'life_expectancy': None,
-            'data_available': False
+            'data_available': 'HDI' in values.index
         }
-        
-        if not hdi.empty:
-            summary['hdi'] = hdi['value'].iloc[0]
-            summary['hdi_category'] = hdi['category'].iloc[0]
-            summary['data_available'] = True
-            
-        if not gii.empty:
-            summary['gii'] = gii['value'].iloc[0]
-            
-        if not edu.empty:
-            summary['education_index'] = edu['value'].iloc[0]
-            
-        if not life_exp.empty:
-            summary['life_expectancy'] = life_exp['value'].iloc[0]
-        
+        for key, indicator in (('hdi', 'HDI'), ('gii', 'GII'), ('education_index', 'Education Index'),
+                               ('life_expectancy', 'Life Expectancy')):
+            if indicator in values.index:
+                summary[key] = float(values.at[indicator, 'value'])
+        if summary['hdi'] is not None:
+            summary['hdi_category'] = self._get_hdi_category(np.array([summary['hdi']]))[0]
         return summary
-    
-    def _get_hdi_category(self, hdi_value: float) -> str:
-        """Classify HDI value into category"""
-        if hdi_value >= 0.800:
-            return "Very High"
-        elif hdi_value >= 0.700:
-            return "High"
-        elif hdi_value >= 0.550:
-            return "Medium"
-        else:
-            return "Low"
-
-
-@st.cache_resource
+
+    def cube_frame(self) -> pd.DataFrame:
+        """Every available value as long rows for the shared filled cube (adds country_code)"""
+        rows = self.get_indicators(self.countries)
+        rows.insert(1, 'country_code', rows['country'].map(self.COUNTRY_MAP))
+        return rows
+
+    def _get_hdi_category(self, hdi_values):
+        """Classify HDI values into categories"""
+        return np.select(
+            [hdi_values >= 0.800, hdi_values >= 0.700, hdi_values >= 0.550],
+            ["Very High", "High", "Medium"],
+            "Low",
+        ).astype(object)
+
+
+@st.cache_resource(max_entries=2)
+def _un_loader(path, file_version):
+    return UNDataLoader(path)
+
+
 def get_un_loader():
     """
-    Returns a cached instance of the UN Data API loader
+    Returns a cached instance of the UN Data API loader, rebuilt when the
+    HDR file changes
     """
-    return UNDataLoader()
+    path = hdr_source()
+    return _un_loader(str(path), artifact_version(path))
@@ -1,16 +1,14 @@
 
 import streamlit as st
-from supabase import create_client, Client
 import pandas as pd
-import json
 from datetime import datetime
 
-from .database import db
+from .database import get_persistence
 
 class UserManager:
     def __init__(self):
-        self.client = db.get_client()
-        self.is_connected = self.client is not None
+        self.store = get_persistence()
+        self.is_connected = self.store.available
 
     def _sanitize_config(self, config):
         """
@@ -32,8 +30,8 @@ class UserManager:
 
     def save_user_profile(self, email, age_group, occupation, config):
         """
-        Saves user profile and configuration to Supabase.
-        Upserts based on email.
+        Saves user profile and configuration (upsert by email).
+        The write is queued and flushed in the background.
         """
         if not self.is_connected:
             return False
@@ -50,8 +48,7 @@ class UserManager:
         }
 
         try:
-            # Using upsert to handle both new users and updates
-            self.client.table("user_configs").upsert(data).execute()
+            self.store.save_user_profile(data)
             return True
         except Exception as e:
             st.error(f"Failed to save profile: {e}")
@@ -65,10 +62,7 @@ class UserManager:
             return None
 
         try:
-            response = self.client.table("user_configs").select("config").eq("email", email).execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]['config']
-            return None
+            return self.store.get_user_config(email)
         except Exception as e:
             print(f"Failed to fetch config: {e}")
             return None